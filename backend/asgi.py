@@ -10,7 +10,22 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import re_path
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-application = get_asgi_application()
+# Initialise Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from notifications.routing import http_urlpatterns as notification_http_urlpatterns  # noqa: E402
+
+# Django's handler only streams asynchronous bodies; views with streamed
+# responses (downloads, bulk upload progress) adapt them through
+# documents.streaming so they aren't buffered here.
+application = ProtocolTypeRouter({
+    # Long-lived streams go to Channels consumers, everything else to Django
+    "http": URLRouter(notification_http_urlpatterns + [
+        re_path(r"", django_asgi_app),
+    ]),
+})
@@ -82,6 +82,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "backend.wsgi.application"
 
+ASGI_APPLICATION = "backend.asgi.application"
+
+# In-process channel layer used to fan notifications out to SSE streams.
+# Run with a shared layer (e.g. channels_redis) when serving from several processes.
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -145,7 +155,8 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Rest Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt, but request.user is built from token claims (users/authentication.py)
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -162,6 +173,74 @@ import os
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Original-file downloads: None streams them from Django; "x-accel" (nginx) or
+# "x-sendfile" (Apache / lighttpd) hands the transfer to the web server after
+# the access check. With x-accel, FILE_DOWNLOAD_ACCEL_PREFIX must be an
+# internal location aliased to MEDIA_ROOT.
+FILE_DOWNLOAD_OFFLOAD = None
+FILE_DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+
+# Resumable uploads (documents/uploads.py). Staging files live in MEDIA_ROOT/uploads
+# so finalizing is a rename; run `manage.py purge_uploads` to drop abandoned ones.
+CHUNKED_UPLOADS = {
+    "CHUNK_SIZE": 8 * 1024 * 1024,
+    "MAX_SIZE": 500 * 1024 * 1024,
+    "EXPIRY_HOURS": 24,
+}
+
+# Bulk ingest (documents/bulk.py). WORKERS sizes the text-extraction process
+# pool; None uses one process per CPU.
+BULK_UPLOAD = {
+    "MAX_FILES": 1000,
+    "MAX_FILE_SIZE": 100 * 1024 * 1024,
+    "MAX_TOTAL_SIZE": 2 * 1024 * 1024 * 1024,
+    "WORKERS": None,
+}
+
+# Batch analysis (documents/batch_analysis.py): nlp.pipe batch size and
+# worker processes, and how many texts go into one summarization request.
+# Texts are parsed in sentence-aligned windows of at most WINDOW_CHARS, so
+# memory per worker is bounded by BATCH_SIZE * WINDOW_CHARS. The API analyzes
+# at most MAX_DOCUMENTS inside the request; `manage.py analyze_documents`
+# handles larger sets CHUNK_SIZE documents at a time.
+BATCH_ANALYSIS = {
+    "BATCH_SIZE": 32,
+    "N_PROCESS": 1,
+    "SUMMARY_BATCH_SIZE": 8,
+    "MAX_DOCUMENTS": 20,
+    "CHUNK_SIZE": 500,
+    "WINDOW_CHARS": 100000,
+}
+
+# Re-analysis parses only paragraphs it hasn't seen; results per paragraph
+# are kept in this cache alias. Use a shared cache (Redis, Memcached) so all
+# workers benefit.
+INCREMENTAL_ANALYSIS = {
+    "ENABLED": True,
+    "CACHE": "default",
+    "TIMEOUT": 7 * 24 * 3600,
+}
+
+# Stored spaCy parses (documents/parses.py), one DocBin per distinct text under
+# MEDIA_ROOT/parses, read by analysis. Fill them in with
+# `manage.py parse_documents`; with INCREMENTAL_ANALYSIS on, analysis doesn't
+# save them itself.
+PARSE_CACHE = {
+    "ENABLED": True,
+}
+
+# Version text storage (documents/versioning.py): texts are deduplicated by
+# hash and stored as deltas against the previous version, at most MAX_CHAIN
+# deep. Changes spanning more than DELTA_MAX_LINES lines are stored in full.
+# Reconstructed texts are cached for CACHE_TTL seconds. Run
+# `manage.py gc_version_contents` to drop texts of deleted versions.
+VERSION_STORAGE = {
+    "MAX_CHAIN": 10,
+    "DELTA_MAX_RATIO": 0.5,
+    "DELTA_MAX_LINES": 5000,
+    "CACHE_TTL": 3600,
+}
+
 # AWS S3 Settings
 AWS_ACCESS_KEY_ID = 'your-aws-access-key'
 AWS_SECRET_ACCESS_KEY = 'your-aws-secret-key'
@@ -184,8 +263,13 @@ AWS_QUERYSTRING_AUTH = False
 SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
+    "TOKEN_REFRESH_SERIALIZER": "users.authentication.UserTokenRefreshSerializer",
 }
 
+# Seconds a user's auth_version is cached before token claims are re-checked
+# (only with SHARED_CACHE; otherwise it is read on every request)
+AUTH_VERSION_CACHE_TTL = 60
+
 
 
 # EMAIL SETTINGS (DEV)
@@ -195,4 +279,36 @@ DEFAULT_FROM_EMAIL = 'noreply@legaldoc.com'
 
 from dotenv import load_dotenv
 
-load_dotenv()
\ No newline at end of file
+load_dotenv()
+
+# Cache shared by every worker process. Without REDIS_URL each process keeps
+# its own in-memory cache, so state other workers must see (unread counters,
+# see notifications/counters.py; auth versions, see users/authentication.py)
+# is read from the database instead. Set SHARED_CACHE when CACHES points at a
+# shared backend some other way (e.g. Memcached).
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        },
+    }
+SHARED_CACHE = bool(REDIS_URL)
+
+# Notification / activity log writer (see notifications/sink.py)
+EVENT_SINK = {
+    "MODE": "buffered",     # "sync" writes every row inside the request
+    "BATCH_SIZE": 100,
+    "FLUSH_INTERVAL": 2.0,  # seconds
+    "MAX_PENDING": 10000,   # rows held for retry while the database is unavailable
+}
+
+# Retention for notifications and activity logs (see notifications/retention.py)
+RETENTION = {
+    "ARCHIVE_DIR": os.path.join(BASE_DIR, 'archive'),
+    "ACTIVITY_LOG_DAYS": 90,
+    "NOTIFICATION_DAYS": 180,
+    "READ_NOTIFICATION_TTL_DAYS": 30,
+    "BATCH_SIZE": 1000,
+}
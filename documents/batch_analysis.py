@@ -0,0 +1,111 @@
+# documents/batch_analysis.py
+"""
+Analyze many documents in one pass.
+
+Texts go through ml_models.process_documents (nlp.pipe plus batched
+summaries) and the results are written back with one bulk_update for the
+documents and one bulk_create for their new versions.
+
+Both this and the single-document analysis view use the per-paragraph
+result cache (ml_models.incremental) unless INCREMENTAL_ANALYSIS disables
+it, so re-analysis after an edit parses only the edited paragraphs.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ml_models.nlp_pipeline import process_documents
+
+from .indexing import index_analyses
+from .models import Document, DocumentVersion
+from .parses import parse_store
+from .versioning import latest_contents, store_content
+
+DEFAULTS = {
+    "BATCH_SIZE": 32,           # texts per nlp.pipe batch
+    "N_PROCESS": 1,             # spaCy worker processes
+    "SUMMARY_BATCH_SIZE": 8,    # texts per summarization request
+    "MAX_DOCUMENTS": 20,        # per API request, which runs synchronously; use analyze_documents for more
+    "CHUNK_SIZE": 500,          # documents loaded and saved per round by manage.py analyze_documents
+    "WINDOW_CHARS": 100000,     # long texts are parsed in windows of this size
+}
+
+
+INCREMENTAL_DEFAULTS = {
+    "ENABLED": True,
+    "CACHE": "default",         # cache alias holding per-paragraph results
+    "TIMEOUT": 7 * 24 * 3600,
+}
+
+
+def get_batch_settings():
+    return {**DEFAULTS, **getattr(settings, "BATCH_ANALYSIS", {})}
+
+
+def pipeline_options():
+    """
+    Keyword arguments for ml_models.process_document(s): the window size
+    and, unless turned off, the stored-parse store and the per-paragraph
+    result cache.
+    """
+    options = {"window_chars": get_batch_settings()["WINDOW_CHARS"], "parse_store": parse_store()}
+    config = {**INCREMENTAL_DEFAULTS, **getattr(settings, "INCREMENTAL_ANALYSIS", {})}
+    if config["ENABLED"]:
+        options.update(paragraph_cache=caches[config["CACHE"]], cache_timeout=config["TIMEOUT"])
+    return options
+
+
+def analyze_documents(documents, generate_summary_flag=True, batch_size=None, n_process=None):
+    """
+    Run the NLP pipeline over `documents` (which must have extracted text),
+    save the results and a new DocumentVersion for each. Returns the documents.
+    """
+    config = get_batch_settings()
+    documents = list(documents)
+    if not documents:
+        return documents
+
+    results = process_documents(
+        [doc.extracted_text for doc in documents],
+        generate_summary_flag=generate_summary_flag,
+        batch_size=batch_size or config["BATCH_SIZE"],
+        n_process=n_process or config["N_PROCESS"],
+        summary_batch_size=config["SUMMARY_BATCH_SIZE"],
+        **pipeline_options(),
+    )
+
+    now = timezone.now()
+    for doc, result in zip(documents, results):
+        doc.clauses_found = result.get("clauses_found") or {}
+        doc.risk_score = result.get("risk_score", doc.risk_score)
+        if generate_summary_flag:
+            doc.summary = result.get("summary", doc.summary)
+        doc.analyzed_at = now
+        doc.status = "analyzed"
+
+    with transaction.atomic():
+        last_versions = dict(
+            DocumentVersion.objects.filter(document__in=documents)
+            .values("document")
+            .annotate(last=Max("version_number"))
+            .values_list("document", "last")
+        )
+        bases = latest_contents(documents)
+        DocumentVersion.objects.bulk_create([
+            DocumentVersion(
+                document=doc,
+                version_number=last_versions.get(doc.id, 0) + 1,
+                content_ref=store_content(doc.extracted_text, base=bases.get(doc.id)),
+            )
+            for doc in documents
+        ])
+        Document.objects.bulk_update(
+            documents,
+            ["clauses_found", "risk_score", "summary", "analyzed_at", "status"],
+            batch_size=200,
+        )
+        index_analyses(list(zip(documents, results)))
+
+    return documents
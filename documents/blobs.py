@@ -0,0 +1,168 @@
+# documents/blobs.py
+"""
+Content-addressed file storage.
+
+Uploaded files are stored once per SHA-256 under MEDIA_ROOT/blobs/ and shared
+by every Document with the same contents. Document.file points at the blob,
+so code that reads document.file.path is unchanged. A blob's ref_count is
+updated under a row lock, and the file is removed when the last Document
+referencing it is deleted.
+
+A reference is taken before its Document is saved, so garbage collection
+leaves blobs referenced within GC_GRACE alone.
+"""
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Document, StoredBlob
+
+GC_GRACE = timedelta(hours=6)
+
+
+def blob_name(sha256, ext):
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext.lower()}"
+
+
+def _tmp_path():
+    directory = default_storage.path("blobs/tmp")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, uuid.uuid4().hex)
+
+
+def _place(path, name):
+    destination = default_storage.path(name)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(path, destination)
+
+
+def adopt_file(path, sha256, ext):
+    """
+    Take ownership of the file at `path`, whose hash is already known.
+    Returns (blob, created): the blob holding it with one more reference,
+    and whether `path` became its file. If the contents are already stored,
+    `path` is discarded.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                blob = StoredBlob.objects.select_for_update().filter(sha256=sha256).first()
+                if blob is None:
+                    name = blob_name(sha256, ext)
+                    size = os.path.getsize(path)
+                    _place(path, name)
+                    blob = StoredBlob.objects.create(
+                        sha256=sha256, file=name, size=size, ref_count=1, referenced_at=timezone.now(),
+                    )
+                    return blob, True
+
+                if os.path.exists(blob.file.path):
+                    os.remove(path)
+                else:
+                    # The file went missing (e.g. a release that failed to commit); restore it
+                    _place(path, blob.file.name)
+
+                blob.referenced_at = timezone.now()
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1, referenced_at=blob.referenced_at)
+                blob.ref_count += 1
+                return blob, False
+        except IntegrityError:
+            # A concurrent upload of the same contents created the row first
+            if attempt:
+                raise
+
+
+def store_chunks(chunks, ext):
+    """Hash and store an iterable of byte chunks in one pass, returning its blob (with a reference taken)."""
+    hasher = hashlib.sha256()
+    path = _tmp_path()
+    try:
+        with open(path, "wb") as f:
+            for chunk in chunks:
+                hasher.update(chunk)
+                f.write(chunk)
+        return adopt_file(path, hasher.hexdigest(), ext)[0]
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def store_upload(uploaded_file):
+    return store_chunks(uploaded_file.chunks(), os.path.splitext(uploaded_file.name)[1])
+
+
+def release_blob(blob_id, recount_before=None):
+    """
+    Drop one reference; delete the blob and its file when none are left.
+    Returns True if deleted.
+
+    With `recount_before`, ref_count is instead recomputed from the Documents
+    pointing at the blob, unless a reference was taken after that time (its
+    Document may not be saved yet).
+    """
+    with transaction.atomic():
+        blob = StoredBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None:
+            return False
+
+        if recount_before is None:
+            refs = blob.ref_count - 1
+        elif blob.referenced_at >= recount_before:
+            return False
+        else:
+            refs = Document.objects.filter(blob_id=blob.pk).count()
+
+        if refs > 0:
+            if refs != blob.ref_count:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=refs)
+            return False
+
+        # Removed while the row is still locked, so a concurrent upload of the
+        # same contents waits and then stores a fresh copy.
+        path = blob.file.path
+        blob.delete()
+        if os.path.exists(path):
+            os.remove(path)
+        return True
+
+
+def _extracted(documents):
+    # An empty text is what a failed or image-only extraction leaves; try those again
+    return documents.filter(extracted_text__isnull=False).exclude(extracted_text="")
+
+
+def known_extracted_text(sha256):
+    """Text already extracted from a file with this hash, or None."""
+    if not sha256:
+        return None
+    return _extracted(Document.objects.filter(sha256=sha256)).values_list("extracted_text", flat=True).first()
+
+
+def known_extracted_texts(hashes):
+    """{sha256: extracted text} for the hashes that have been extracted before."""
+    texts = {}
+    rows = _extracted(Document.objects.filter(sha256__in=set(hashes))).values_list("sha256", "extracted_text")
+    for sha256, text in rows.iterator():
+        texts.setdefault(sha256, text)
+    return texts
+
+
+def collect_garbage(grace=GC_GRACE):
+    """
+    Reconcile ref_count with the Documents that actually point at each blob
+    (deletions that bypassed release_blob, e.g. cascades from a deleted user)
+    and delete blobs nothing refers to. Blobs referenced within `grace` are
+    skipped. Returns the number of blobs deleted.
+    """
+    cutoff = timezone.now() - grace
+    deleted = 0
+    for blob_id in StoredBlob.objects.filter(referenced_at__lt=cutoff).values_list("pk", flat=True).iterator():
+        if release_blob(blob_id, recount_before=cutoff):
+            deleted += 1
+    return deleted
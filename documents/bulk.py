@@ -0,0 +1,204 @@
+# documents/bulk.py
+"""
+Bulk ingest: a ZIP archive or several files in one request.
+
+Each file is streamed into blob storage (documents/blobs.py) and all the
+Documents are created with a single bulk_create. Text extraction then runs
+across a process pool, once per distinct file contents, and each finished
+file is reported as one progress event.
+"""
+import multiprocessing
+import os
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+from .blobs import known_extracted_texts, store_chunks
+from .models import Document
+from .sections import index_sections
+from .utils import extract_text, file_type_for
+
+DEFAULTS = {
+    "MAX_FILES": 1000,
+    "MAX_FILE_SIZE": 100 * 1024 * 1024,
+    "MAX_TOTAL_SIZE": 2 * 1024 * 1024 * 1024,
+    "WORKERS": None,            # None: one per CPU
+    "UPDATE_BATCH_SIZE": 50,
+}
+
+READ_BLOCK = 64 * 1024
+
+
+class BulkUploadError(Exception):
+    pass
+
+
+def get_bulk_settings():
+    return {**DEFAULTS, **getattr(settings, "BULK_UPLOAD", {})}
+
+
+def _limited(chunks, limit, name):
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if total > limit:
+            raise BulkUploadError(f"{name} is larger than {limit} bytes")
+        yield chunk
+
+
+def _member_chunks(zf, info):
+    try:
+        with zf.open(info) as member:
+            yield from iter(lambda: member.read(READ_BLOCK), b"")
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as e:
+        # Corrupt or truncated data, an unsupported compression method, or
+        # (RuntimeError) an encrypted member
+        raise BulkUploadError(f"{info.filename} could not be read: {e}")
+
+
+def iter_members(archive=None, files=()):
+    """
+    Yield (name, chunks) for every file to ingest. ZIP members are read
+    straight from the archive, and the sizes they declare are checked before
+    anything is extracted.
+    """
+    config = get_bulk_settings()
+
+    if archive is not None:
+        try:
+            zf = zipfile.ZipFile(archive)
+        except zipfile.BadZipFile:
+            raise BulkUploadError("Invalid ZIP archive")
+
+        with zf:
+            members = [
+                info for info in zf.infolist()
+                if not info.is_dir()
+                and not info.filename.startswith("__MACOSX/")
+                and not os.path.basename(info.filename).startswith(".")
+            ]
+            if len(members) > config["MAX_FILES"]:
+                raise BulkUploadError(f"Archive holds more than {config['MAX_FILES']} files")
+            if sum(info.file_size for info in members) > config["MAX_TOTAL_SIZE"]:
+                raise BulkUploadError("Archive expands beyond the allowed total size")
+
+            for info in members:
+                name = os.path.basename(info.filename)
+                # Sizes in the archive can lie, so the bytes are counted too
+                yield name, _limited(_member_chunks(zf, info), config["MAX_FILE_SIZE"], name)
+        return
+
+    if len(files) > config["MAX_FILES"]:
+        raise BulkUploadError(f"More than {config['MAX_FILES']} files")
+    for uploaded in files:
+        yield uploaded.name, _limited(uploaded.chunks(), config["MAX_FILE_SIZE"], uploaded.name)
+
+
+def ingest(user, archive=None, files=()):
+    """
+    Store every supported file and create its Document. Returns (documents,
+    skipped); skipped lists {"name", "error"} for files that were not ingested.
+    Text already extracted for identical contents is reused straight away.
+    """
+    documents, skipped = [], []
+
+    for name, chunks in iter_members(archive=archive, files=files):
+        file_type = file_type_for(name)
+        if not file_type:
+            skipped.append({"name": name, "error": "Unsupported file type"})
+            continue
+
+        try:
+            blob = store_chunks(chunks, os.path.splitext(name)[1])
+        except BulkUploadError as e:
+            skipped.append({"name": name, "error": str(e)})
+            continue
+
+        documents.append(Document(
+            user=user,
+            title=name,
+            file=blob.file.name,
+            file_type=file_type,
+            sha256=blob.sha256,
+            blob=blob,
+            status='pending',
+        ))
+
+    known = known_extracted_texts(doc.sha256 for doc in documents)
+    for doc in documents:
+        doc.extracted_text = known.get(doc.sha256)
+
+    documents = Document.objects.bulk_create(documents)
+    index_sections([doc for doc in documents if doc.extracted_text is not None])
+    return documents, skipped
+
+
+def extract_pending(documents, workers=None):
+    """
+    Extract text for the documents that still need it and save it with
+    bulk_update. Yields one progress event per document as results come in;
+    texts already extracted are saved even if the generator is closed early.
+    """
+    config = get_bulk_settings()
+    workers = workers if workers is not None else config["WORKERS"] or os.cpu_count() or 1
+    total = len(documents)
+    done = 0
+
+    by_hash = {}
+    for doc in documents:
+        if doc.extracted_text is None:
+            by_hash.setdefault(doc.sha256, []).append(doc)
+        else:
+            done += 1
+            yield {"event": "file", "name": doc.title, "document_id": doc.id, "status": "reused", "done": done, "total": total}
+
+    pending_updates = []
+
+    def flush():
+        Document.objects.bulk_update(pending_updates, ["extracted_text"])
+        index_sections(pending_updates)
+        pending_updates.clear()
+
+    def finished(docs, text, error):
+        nonlocal done
+        for doc in docs:
+            done += 1
+            event = {"event": "file", "name": doc.title, "document_id": doc.id, "done": done, "total": total}
+            if error:
+                # Left without text so a later upload of the same file tries again
+                event.update({"status": "failed", "error": error})
+            else:
+                doc.extracted_text = text or ""
+                pending_updates.append(doc)
+                event["status"] = "extracted"
+            yield event
+        if len(pending_updates) >= config["UPDATE_BATCH_SIZE"]:
+            flush()
+
+    jobs = [(docs[0].file.path, docs[0].file_type, docs) for docs in by_hash.values()]
+
+    try:
+        if workers <= 1 or len(jobs) <= 1:
+            for path, file_type, docs in jobs:
+                try:
+                    text, error = extract_text(path, file_type), None
+                except Exception as e:
+                    text, error = None, str(e)
+                yield from finished(docs, text, error)
+        else:
+            # spawn, not fork: the children only run the extractors and must not
+            # inherit the parent's database connections
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+                futures = {pool.submit(extract_text, path, file_type): docs for path, file_type, docs in jobs}
+                for future in as_completed(futures):
+                    try:
+                        text, error = future.result(), None
+                    except Exception as e:
+                        text, error = None, str(e)
+                    yield from finished(futures[future], text, error)
+    finally:
+        if pending_updates:
+            flush()
@@ -0,0 +1,201 @@
+# documents/diffing.py
+"""
+Paragraph-level diffs between two document versions.
+
+Both texts are split into paragraphs and each paragraph is hashed. The
+hash sequences are aligned patience-style: paragraphs that occur exactly
+once on both sides are anchors, the longest in-order run of anchors is kept,
+and the gaps between anchors are aligned the same way. Only the paragraphs
+left unmatched are compared character by character, so the cost follows the
+size of the change rather than the size of the contract.
+"""
+import bisect
+import hashlib
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+
+from django.core.cache import cache
+
+from .versioning import get_version_settings
+
+# A paragraph ends at a blank line; the separator stays with the paragraph
+# before it so that paragraphs tile the text exactly.
+_PARAGRAPH_END_RE = re.compile(r"\n[ \t]*\n\s*")
+
+# Gaps with no anchors are handed to SequenceMatcher when at most this many
+# paragraphs long; in larger ones paragraphs are paired up by position.
+SMALL_GAP = 64
+# Paragraph pairs longer than this (combined) get no character-level diff
+INLINE_MAX_CHARS = 20000
+# Below this similarity a changed paragraph is treated as replaced
+INLINE_MIN_RATIO = 0.3
+
+DIFF_FORMAT = 1
+
+
+def split_paragraphs(text):
+    """[(start, end)] of each paragraph, covering the whole text."""
+    spans, start = [], 0
+    for match in _PARAGRAPH_END_RE.finditer(text or ""):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text or ""):
+        spans.append((start, len(text)))
+    return spans
+
+
+def _trim(text, span):
+    start, end = span
+    chunk = text[start:end]
+    return start + len(chunk) - len(chunk.lstrip()), start + len(chunk.rstrip())
+
+
+def paragraph_hash(text):
+    # Surrounding whitespace is not part of a paragraph's identity
+    return hashlib.blake2b(text.strip().encode("utf-8"), digest_size=16).digest()
+
+
+# ============================================================
+#   ALIGNMENT
+# ============================================================
+def _longest_increasing(pairs):
+    """Longest subsequence of (i, j) pairs (sorted by i) whose j also increases."""
+    tails, tail_index, previous = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        at = bisect.bisect_left(tails, j)
+        if at == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[at] = j
+            tail_index[at] = k
+        previous[k] = tail_index[at - 1] if at else None
+
+    chain, k = [], tail_index[-1] if tail_index else None
+    while k is not None:
+        chain.append(pairs[k])
+        k = previous[k]
+    return chain[::-1]
+
+
+def align(a, b):
+    """Matched (i, j) index pairs between hash lists `a` and `b`, in order."""
+    matches = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+
+        while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+            matches.append((a_lo, b_lo))
+            a_lo += 1
+            b_lo += 1
+        while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+            a_hi -= 1
+            b_hi -= 1
+            matches.append((a_hi, b_hi))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        a_counts = Counter(a[a_lo:a_hi])
+        b_positions = {}
+        for j in range(b_lo, b_hi):
+            b_positions.setdefault(b[j], []).append(j)
+        anchors = _longest_increasing([
+            (i, b_positions[a[i]][0])
+            for i in range(a_lo, a_hi)
+            if a_counts[a[i]] == 1 and len(b_positions.get(a[i], ())) == 1
+        ])
+
+        if not anchors:
+            if a_hi - a_lo <= SMALL_GAP and b_hi - b_lo <= SMALL_GAP:
+                matcher = SequenceMatcher(None, a[a_lo:a_hi], b[b_lo:b_hi], autojunk=False)
+                for i, j, size in matcher.get_matching_blocks():
+                    matches += [(a_lo + i + k, b_lo + j + k) for k in range(size)]
+            continue
+
+        matches += anchors
+        bounds = [(a_lo - 1, b_lo - 1), *anchors, (a_hi, b_hi)]
+        for (i1, j1), (i2, j2) in zip(bounds, bounds[1:]):
+            if i2 - i1 > 1 or j2 - j1 > 1:
+                stack.append((i1 + 1, i2, j1 + 1, j2))
+
+    return sorted(matches)
+
+
+# ============================================================
+#   DIFF
+# ============================================================
+def inline_diff(old, new):
+    """Character-level [op, text] segments, or None when the paragraphs are too large or too different."""
+    if len(old) + len(new) > INLINE_MAX_CHARS:
+        return None
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    if matcher.quick_ratio() < INLINE_MIN_RATIO or matcher.ratio() < INLINE_MIN_RATIO:
+        return None
+
+    segments = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            segments.append(["equal", old[i1:i2]])
+            continue
+        if i2 > i1:
+            segments.append(["delete", old[i1:i2]])
+        if j2 > j1:
+            segments.append(["insert", new[j1:j2]])
+    return segments
+
+
+def diff_texts(old, new):
+    """
+    Changes turning `old` into `new`, paragraph by paragraph. Offsets are
+    character offsets into the respective texts; unchanged paragraphs are
+    only counted, and whitespace between paragraphs is ignored.
+    """
+    # Separators are left out of the reported spans
+    old_spans = [_trim(old, span) for span in split_paragraphs(old)]
+    new_spans = [_trim(new, span) for span in split_paragraphs(new)]
+    old_hashes = [paragraph_hash(old[s:e]) for s, e in old_spans]
+    new_hashes = [paragraph_hash(new[s:e]) for s, e in new_spans]
+
+    changes = []
+    stats = {"unchanged": 0, "changed": 0, "inserted": 0, "deleted": 0}
+
+    def change(op, old_span, new_span, **extra):
+        entry = {"op": op}
+        if old_span:
+            entry.update(old_start=old_span[0], old_end=old_span[1], old_text=old[old_span[0]:old_span[1]])
+        if new_span:
+            entry.update(new_start=new_span[0], new_end=new_span[1], new_text=new[new_span[0]:new_span[1]])
+        entry.update(extra)
+        changes.append(entry)
+        stats[op] += 1
+
+    i = j = 0
+    for mi, mj in [*align(old_hashes, new_hashes), (len(old_spans), len(new_spans))]:
+        # Unmatched paragraphs between two matches are paired up in order
+        removed, added = old_spans[i:mi], new_spans[j:mj]
+        for old_span, new_span in zip(removed, added):
+            change(
+                "changed", old_span, new_span,
+                inline=inline_diff(old[old_span[0]:old_span[1]], new[new_span[0]:new_span[1]]),
+            )
+        for old_span in removed[len(added):]:
+            change("deleted", old_span, None)
+        for new_span in added[len(removed):]:
+            change("inserted", None, new_span)
+        if mi < len(old_spans):
+            stats["unchanged"] += 1
+        i, j = mi + 1, mj + 1
+
+    return {"stats": stats, "changes": changes}
+
+
+def diff_versions(old_version, new_version):
+    """diff_texts() of two DocumentVersions; versions never change, so the result is cached per pair."""
+    key = f"documents:version_diff:{DIFF_FORMAT}:{old_version.pk}:{new_version.pk}"
+    result = cache.get(key)
+    if result is None:
+        result = diff_texts(old_version.text, new_version.text)
+        cache.set(key, result, get_version_settings()["CACHE_TTL"])
+    return result
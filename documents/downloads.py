@@ -0,0 +1,124 @@
+# documents/downloads.py
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .streaming import streaming
+
+CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat):
+    return quote_etag(f"{stat.st_size:x}-{int(stat.st_mtime):x}")
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE", ""))
+    return since is not None and int(mtime) <= since
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single "bytes=" range, None if there is no
+    usable range (serve the whole file), or False if it can't be satisfied.
+    Multi-range requests get the whole file, which HTTP allows.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if size == 0:
+        # No byte range of an empty file can be satisfied
+        return False
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def iter_file_range(path, start, end, chunk_size=CHUNK_SIZE):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, filename):
+    """
+    Respond with the file at `path`: honours conditional requests (ETag /
+    Last-Modified) and single byte ranges, streams the body in chunks, and
+    with FILE_DOWNLOAD_OFFLOAD set hands the transfer to the front-end web
+    server instead (which then also deals with ranges).
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+    def with_headers(response):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+        response["Accept-Ranges"] = "bytes"
+        response["Cache-Control"] = "private, max-age=0, must-revalidate"
+        response["Content-Disposition"] = content_disposition_header(True, filename)
+        return response
+
+    if not_modified(request, etag, stat.st_mtime):
+        return with_headers(HttpResponse(status=304))
+
+    offload = getattr(settings, "FILE_DOWNLOAD_OFFLOAD", None)
+    if offload == "x-accel":
+        response = HttpResponse(content_type=content_type)
+        relative = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+        response["X-Accel-Redirect"] = settings.FILE_DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + relative
+        return with_headers(response)
+    if offload == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = path
+        return with_headers(response)
+
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range is None or if_range.strip() in (etag, http_date(stat.st_mtime)):
+        byte_range = parse_range(request.META.get("HTTP_RANGE"), stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return with_headers(response)
+
+    if byte_range is None:
+        # FileResponse streams in blocks and lets a WSGI server use sendfile()
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        return streaming(request, with_headers(response))
+
+    start, end = byte_range
+    response = StreamingHttpResponse(iter_file_range(path, start, end), status=206, content_type=content_type)
+    response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    response["Content-Length"] = str(end - start + 1)
+    return streaming(request, with_headers(response))
@@ -0,0 +1,92 @@
+# documents/indexing.py
+"""
+Normalized copies of analysis results, written next to the Document fields
+whenever a document is analyzed, so portfolio-wide questions can be answered
+from indexed tables.
+"""
+import re
+from collections import Counter
+
+from django.db import transaction
+
+from .models import DocumentClause, DocumentEntity
+
+MAX_OFFSETS_PER_ENTITY = 100
+MAX_SPANS_PER_CLAUSE = 200
+
+_SPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCT = " \t\n.,;:'\"()[]{}"
+
+
+def normalize_entity(text):
+    """Lookup key for an entity mention: case-folded, single-spaced, without edge punctuation or a leading "the"."""
+    text = _SPACE_RE.sub(" ", text or "").strip(_EDGE_PUNCT).casefold()
+    if text.startswith("the "):
+        text = text[4:]
+    return text[:255]
+
+
+def index_analysis(document, result):
+    index_analyses([(document, result)])
+
+
+def index_analyses(pairs):
+    """Replace each document's clause and entity rows with those of its new analysis result."""
+    documents = [document for document, _ in pairs]
+
+    clause_rows, entity_rows = [], []
+    for document, result in pairs:
+        offsets = result.get("clause_offsets") or {}
+        spans = result.get("clause_spans") or {}
+        clause_rows += [
+            DocumentClause(
+                document=document,
+                clause_key=key,
+                present=bool(present),
+                first_offset=offsets.get(key),
+                spans=(spans.get(key) or [])[:MAX_SPANS_PER_CLAUSE],
+            )
+            for key, present in (result.get("clauses_found") or {}).items()
+        ]
+        entity_rows += entity_rows_for(document, result.get("entities") or [])
+
+    with transaction.atomic():
+        DocumentClause.objects.filter(document__in=documents).delete()
+        DocumentClause.objects.bulk_create(clause_rows)
+        DocumentEntity.objects.filter(document__in=documents).delete()
+        DocumentEntity.objects.bulk_create(entity_rows, batch_size=500)
+
+
+def entity_rows_for(document, entities):
+    """Collapse NER mentions into one DocumentEntity per (label, normalized text)."""
+    grouped = {}
+    for ent in entities:
+        normalized = normalize_entity(ent.get("text"))
+        if not normalized:
+            continue
+        entry = grouped.setdefault((ent.get("label", "")[:20], normalized), {"forms": Counter(), "offsets": [], "count": 0})
+        entry["forms"][ent["text"].strip()] += 1
+        entry["count"] += 1
+        if len(entry["offsets"]) < MAX_OFFSETS_PER_ENTITY and ent.get("start_char") is not None:
+            entry["offsets"].append([ent["start_char"], ent["end_char"]])
+
+    return [
+        DocumentEntity(
+            document=document,
+            label=label,
+            normalized=normalized,
+            text=entry["forms"].most_common(1)[0][0][:255],
+            count=entry["count"],
+            offsets=entry["offsets"],
+        )
+        for (label, normalized), entry in grouped.items()
+    ]
+
+
+def report_entities(document):
+    """The document's stored entities in the shape documents.reports expects, most mentioned first."""
+    return list(
+        DocumentEntity.objects.filter(document=document)
+        .order_by("-count", "label", "normalized")
+        .values("text", "label", "count")
+    )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.batch_analysis import analyze_documents, get_batch_settings
+from documents.models import Document
+
+
+class Command(BaseCommand):
+    help = "Analyze documents in batches (nlp.pipe and batched summarization). Does not use subscription quota."
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Document ids to analyze.")
+        parser.add_argument("--user", type=int, help="Analyze the documents of this user id.")
+        parser.add_argument("--pending", action="store_true", help="Only documents that were never analyzed.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Texts per nlp.pipe batch.")
+        parser.add_argument("--n-process", type=int, default=None, help="spaCy worker processes.")
+        parser.add_argument("--chunk", type=int, default=None, help="Documents loaded and saved per round.")
+        parser.add_argument("--no-summary", action="store_true", help="Skip summarization.")
+
+    def handle(self, *args, **options):
+        if not options["ids"] and not options["user"] and not options["pending"]:
+            raise CommandError("Give document ids, --user or --pending.")
+
+        documents = Document.objects.exclude(extracted_text__isnull=True).exclude(extracted_text="")
+        if options["ids"]:
+            documents = documents.filter(pk__in=options["ids"])
+        if options["user"]:
+            documents = documents.filter(user_id=options["user"])
+        if options["pending"]:
+            documents = documents.filter(status="pending")
+
+        chunk = options["chunk"] or get_batch_settings()["CHUNK_SIZE"]
+        ids = list(documents.order_by("pk").values_list("pk", flat=True))
+
+        for i in range(0, len(ids), chunk):
+            batch = Document.objects.filter(pk__in=ids[i:i + chunk]).order_by("pk")
+            analyze_documents(
+                batch,
+                generate_summary_flag=not options["no_summary"],
+                batch_size=options["batch_size"],
+                n_process=options["n_process"],
+            )
+            self.stdout.write(f"Analyzed {min(i + chunk, len(ids))}/{len(ids)} document(s).")
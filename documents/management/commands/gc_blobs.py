@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from documents.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Fix blob reference counts and delete stored files no document uses."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {collect_garbage()} unreferenced blob(s).")
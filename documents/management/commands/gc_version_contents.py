@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from documents.versioning import collect_contents
+
+
+class Command(BaseCommand):
+    help = "Delete stored version texts that no document version uses any more."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {collect_contents()} unused version content(s).")
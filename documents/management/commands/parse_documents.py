@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from documents.batch_analysis import get_batch_settings
+from documents.models import Document
+from documents.parses import parse_documents, prune_parses
+
+
+class Command(BaseCommand):
+    help = "Store spaCy parses of document texts that don't have one, so later analyses can skip parsing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Document ids to parse (default: all).")
+        parser.add_argument("--n-process", type=int, default=None, help="spaCy worker processes.")
+        parser.add_argument("--chunk", type=int, default=100, help="Documents loaded per round.")
+        parser.add_argument("--prune", action="store_true", help="Also delete parses no document's text needs.")
+
+    def handle(self, *args, **options):
+        config = get_batch_settings()
+        documents = Document.objects.exclude(extracted_text__isnull=True).exclude(extracted_text="")
+        if options["ids"]:
+            documents = documents.filter(pk__in=options["ids"])
+
+        ids = list(documents.order_by("pk").values_list("pk", flat=True))
+        chunk = options["chunk"]
+        parsed = 0
+        for i in range(0, len(ids), chunk):
+            parsed += parse_documents(
+                Document.objects.filter(pk__in=ids[i:i + chunk]).only("pk", "extracted_text"),
+                window_chars=config["WINDOW_CHARS"],
+                n_process=options["n_process"] or config["N_PROCESS"],
+            )
+            self.stdout.write(f"Checked {min(i + chunk, len(ids))}/{len(ids)} document(s), parsed {parsed}.")
+
+        if options["prune"]:
+            self.stdout.write(f"Deleted {prune_parses()} unused parse(s).")
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from documents.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete expired resumable uploads and their staging files."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Purged {purge_expired_sessions()} expired upload(s).")
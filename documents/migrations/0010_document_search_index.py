@@ -0,0 +1,100 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:05
+#
+# Full-text index over Document.title and Document.extracted_text, maintained
+# by database triggers so every write path (including bulk_create and
+# bulk_update) keeps it current. PostgreSQL gets a weighted tsvector column
+# with a GIN index; SQLite an external-content FTS5 table. The column and
+# table are not part of the Django model; documents/search.py queries them.
+
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE documents_document ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION documents_document_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.english', left(coalesce(NEW.extracted_text, ''), 1000000)), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER documents_document_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, extracted_text ON documents_document
+    FOR EACH ROW EXECUTE FUNCTION documents_document_search_vector_update()
+    """,
+    # Fires the trigger for existing rows
+    "UPDATE documents_document SET title = title",
+    "CREATE INDEX documents_document_search_idx ON documents_document USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS documents_document_search_idx",
+    "DROP TRIGGER IF EXISTS documents_document_search_vector_trigger ON documents_document",
+    "DROP FUNCTION IF EXISTS documents_document_search_vector_update()",
+    "ALTER TABLE documents_document DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE documents_document_fts USING fts5(
+        title, extracted_text,
+        content='documents_document', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER documents_document_fts_insert AFTER INSERT ON documents_document BEGIN
+        INSERT INTO documents_document_fts(rowid, title, extracted_text)
+        VALUES (new.id, new.title, coalesce(new.extracted_text, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER documents_document_fts_delete AFTER DELETE ON documents_document BEGIN
+        INSERT INTO documents_document_fts(documents_document_fts, rowid, title, extracted_text)
+        VALUES ('delete', old.id, old.title, coalesce(old.extracted_text, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER documents_document_fts_update AFTER UPDATE OF title, extracted_text ON documents_document BEGIN
+        INSERT INTO documents_document_fts(documents_document_fts, rowid, title, extracted_text)
+        VALUES ('delete', old.id, old.title, coalesce(old.extracted_text, ''));
+        INSERT INTO documents_document_fts(rowid, title, extracted_text)
+        VALUES (new.id, new.title, coalesce(new.extracted_text, ''));
+    END
+    """,
+    "INSERT INTO documents_document_fts(documents_document_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS documents_document_fts_update",
+    "DROP TRIGGER IF EXISTS documents_document_fts_delete",
+    "DROP TRIGGER IF EXISTS documents_document_fts_insert",
+    "DROP TABLE IF EXISTS documents_document_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_FORWARD, "sqlite": SQLITE_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_REVERSE, "sqlite": SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0009_storedblob"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
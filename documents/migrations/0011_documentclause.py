@@ -0,0 +1,76 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_clause_index(apps, schema_editor):
+    # Offsets were never stored before, so backfilled rows have none
+    Document = apps.get_model("documents", "Document")
+    DocumentClause = apps.get_model("documents", "DocumentClause")
+
+    last_id = 0
+    while True:
+        batch = list(
+            Document.objects.filter(id__gt=last_id, clauses_found__isnull=False)
+            .order_by("id")
+            .values_list("id", "clauses_found")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        rows = [
+            DocumentClause(document_id=doc_id, clause_key=key[:50], present=bool(present))
+            for doc_id, clauses in batch
+            if isinstance(clauses, dict)
+            for key, present in clauses.items()
+        ]
+        DocumentClause.objects.bulk_create(rows, ignore_conflicts=True)
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0010_document_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentClause",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("clause_key", models.CharField(max_length=50)),
+                ("present", models.BooleanField()),
+                ("first_offset", models.IntegerField(blank=True, null=True)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="clause_index",
+                        to="documents.document",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["clause_key", "present", "document"],
+                        name="documentclause_key_present_idx",
+                    )
+                ],
+                "unique_together": {("document", "clause_key")},
+            },
+        ),
+        migrations.RunPython(backfill_clause_index, migrations.RunPython.noop),
+    ]
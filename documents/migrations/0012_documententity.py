@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0011_documentclause"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentEntity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("label", models.CharField(max_length=20)),
+                ("text", models.CharField(max_length=255)),
+                ("normalized", models.CharField(max_length=255)),
+                ("count", models.PositiveIntegerField(default=1)),
+                ("offsets", models.JSONField(default=list)),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="entities",
+                        to="documents.document",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["normalized", "label"],
+                        name="documententity_normalized_idx",
+                    )
+                ],
+                "unique_together": {("document", "label", "normalized")},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0012_documententity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="documentclause",
+            name="spans",
+            field=models.JSONField(default=list),
+        ),
+    ]
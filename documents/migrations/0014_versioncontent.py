@@ -0,0 +1,123 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:10
+
+import hashlib
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 200
+
+
+def move_version_content(apps, schema_editor):
+    # Existing texts become deduplicated full copies; new versions may delta against them
+    DocumentVersion = apps.get_model("documents", "DocumentVersion")
+    VersionContent = apps.get_model("documents", "VersionContent")
+
+    last_id = 0
+    while True:
+        batch = list(
+            DocumentVersion.objects.filter(id__gt=last_id, content_ref__isnull=True)
+            .order_by("id")
+            .only("id", "content")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for version in batch:
+            sha256 = hashlib.sha256(version.content.encode("utf-8")).hexdigest()
+            content, _ = VersionContent.objects.get_or_create(
+                sha256=sha256,
+                defaults={
+                    "kind": "full",
+                    "size": len(version.content),
+                    "data": zlib.compress(version.content.encode("utf-8")),
+                },
+            )
+            version.content_ref = content
+            version.content = ""
+        DocumentVersion.objects.bulk_update(batch, ["content_ref", "content"])
+        last_id = batch[-1].id
+
+
+def restore_version_content(apps, schema_editor):
+    DocumentVersion = apps.get_model("documents", "DocumentVersion")
+    VersionContent = apps.get_model("documents", "VersionContent")
+
+    def rebuild(content):
+        # Same format as documents.versioning: a full zlib text or a JSON line delta
+        if content.kind == "full":
+            return zlib.decompress(content.data).decode("utf-8")
+        lines = rebuild(VersionContent.objects.get(pk=content.base_id)).splitlines(
+            keepends=True
+        )
+        ops = json.loads(zlib.decompress(content.data))
+        return "".join(
+            op if isinstance(op, str) else "".join(lines[op[0] : op[1]]) for op in ops
+        )
+
+    for version in (
+        DocumentVersion.objects.filter(content_ref__isnull=False)
+        .select_related("content_ref")
+        .iterator()
+    ):
+        version.content = rebuild(version.content_ref)
+        version.save(update_fields=["content"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0013_documentclause_spans"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VersionContent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, unique=True)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("full", "Full"), ("delta", "Delta")], max_length=10
+                    ),
+                ),
+                ("chain_length", models.PositiveSmallIntegerField(default=0)),
+                ("size", models.PositiveIntegerField()),
+                ("data", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "base",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="documents.versioncontent",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="documentversion",
+            name="content_ref",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="versions",
+                to="documents.versioncontent",
+            ),
+        ),
+        migrations.RunPython(move_version_content, restore_version_content),
+    ]
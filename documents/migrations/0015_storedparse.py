@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0014_versioncontent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StoredParse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("text_sha256", models.CharField(max_length=64)),
+                ("model", models.CharField(max_length=100)),
+                ("file", models.FileField(max_length=255, upload_to="parses/")),
+                ("size", models.BigIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "unique_together": {("text_sha256", "model")},
+            },
+        ),
+    ]
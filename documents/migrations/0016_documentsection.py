@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0015_storedparse"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentSection",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField()),
+                ("number", models.CharField(blank=True, max_length=30)),
+                ("title", models.CharField(blank=True, max_length=255)),
+                ("level", models.PositiveSmallIntegerField()),
+                ("start", models.IntegerField()),
+                ("end", models.IntegerField()),
+                (
+                    "document",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sections",
+                        to="documents.document",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position"],
+                "unique_together": {("document", "position")},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("documents", "0016_documentsection"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storedblob",
+            name="referenced_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
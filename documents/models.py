@@ -1,5 +1,43 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
+
+class StoredBlob(models.Model):
+    """
+    One stored file, keyed by its SHA-256. Documents with identical contents
+    share a blob; ref_count tracks how many of them point at it.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='blobs/', max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # When a reference was last taken; its Document may not exist yet
+    referenced_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} refs)"
+
+
+class StoredParse(models.Model):
+    """
+    A serialized spaCy parse (DocBin) of one text, keyed by the text's
+    SHA-256 and the pipeline that produced it (see documents/parses.py).
+    """
+    text_sha256 = models.CharField(max_length=64)
+    model = models.CharField(max_length=100)
+    file = models.FileField(upload_to='parses/', max_length=255)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("text_sha256", "model")
+
+    def __str__(self):
+        return f"{self.text_sha256[:12]} ({self.model})"
+
 
 class Document(models.Model):
     FILE_TYPES = [
@@ -39,6 +77,10 @@ class Document(models.Model):
     # Summarization
     summary = models.TextField(blank=True, null=True)
 
+    # SHA-256 of the uploaded file, when known
+    sha256 = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    blob = models.ForeignKey(StoredBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='documents')
+
     def __str__(self):
         return f"{self.title} - {self.user.username}"
 
@@ -64,6 +106,29 @@ class DocumentComment(models.Model):
         return f"Comment by {self.user} on {self.document.title} at {self.created_at}"
 
 
+class VersionContent(models.Model):
+    """
+    Version text, stored once per SHA-256 and zlib-compressed: either the
+    full text or a line delta against `base` (see documents/versioning.py).
+    """
+    KIND_CHOICES = [
+        ('full', 'Full'),
+        ('delta', 'Delta'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    base = models.ForeignKey("self", on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+    # Deltas to apply on top of the nearest full text
+    chain_length = models.PositiveSmallIntegerField(default=0)
+    size = models.PositiveIntegerField()   # length of the reconstructed text
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.kind}, chain {self.chain_length})"
+
+
 class DocumentVersion(models.Model):
     document = models.ForeignKey(
         "documents.Document",
@@ -71,9 +136,18 @@ class DocumentVersion(models.Model):
         related_name="versions"
     )
     version_number = models.IntegerField()
+    # Only set on versions created before content_ref existed
     content = models.TextField(blank=True)
+    content_ref = models.ForeignKey(VersionContent, on_delete=models.PROTECT, null=True, blank=True, related_name="versions")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    @property
+    def text(self):
+        if self.content_ref_id is None:
+            return self.content
+        from .versioning import load_content
+        return load_content(self.content_ref)
+
     class Meta:
         unique_together = ("document", "version_number")
         ordering = ["-version_number"]
@@ -82,6 +156,74 @@ class DocumentVersion(models.Model):
         return f"{self.document.title} v{self.version_number}"
     
 
+class DocumentClause(models.Model):
+    """
+    One row per (document, clause) from the latest analysis, so clause
+    questions are index lookups rather than scans of clauses_found.
+    """
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="clause_index")
+    clause_key = models.CharField(max_length=50)
+    present = models.BooleanField()
+    # Character offset of the first match in extracted_text, when known
+    first_offset = models.IntegerField(null=True, blank=True)
+    # [[start, end], ...] of every match, capped per clause
+    spans = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ("document", "clause_key")
+        indexes = [
+            models.Index(fields=["clause_key", "present", "document"], name="documentclause_key_present_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.document_id} {self.clause_key}={self.present}"
+
+
+class DocumentEntity(models.Model):
+    """
+    A named entity from the latest analysis, one row per distinct
+    (label, normalized text) in the document.
+    """
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="entities")
+    label = models.CharField(max_length=20)
+    text = models.CharField(max_length=255)        # most frequent surface form
+    normalized = models.CharField(max_length=255)  # see documents.indexing.normalize_entity
+    count = models.PositiveIntegerField(default=1)
+    # [[start, end], ...] character spans in extracted_text, capped per entity
+    offsets = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ("document", "label", "normalized")
+        indexes = [
+            models.Index(fields=["normalized", "label"], name="documententity_normalized_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.text} ({self.label}) x{self.count}"
+
+
+class DocumentSection(models.Model):
+    """
+    One heading-delimited section of extracted_text (see documents/sections.py).
+    A section runs from its heading to the next heading of any level; text
+    before the first heading is a level-0 section with no number or title.
+    """
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name="sections")
+    position = models.PositiveIntegerField()
+    number = models.CharField(max_length=30, blank=True)   # "4.2", "IV", "Schedule A"
+    title = models.CharField(max_length=255, blank=True)
+    level = models.PositiveSmallIntegerField()
+    start = models.IntegerField()
+    end = models.IntegerField()
+
+    class Meta:
+        unique_together = ("document", "position")
+        ordering = ["position"]
+
+    def __str__(self):
+        return f"{self.number} {self.title}".strip() or f"Section {self.position}"
+
+
 class SharedDocument(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -102,3 +244,36 @@ class SharedDocument(models.Model):
 
     def __str__(self):
         return f"{self.document} shared with {self.client} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """A resumable upload: chunks are appended in order to a staging file."""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    title = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=10, choices=Document.FILE_TYPES)
+    total_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    document = models.ForeignKey(Document, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    @property
+    def chunk_count(self):
+        return max(1, -(-self.total_size // self.chunk_size))
+
+    @property
+    def next_chunk(self):
+        return self.received_bytes // self.chunk_size
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.filename})"
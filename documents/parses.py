@@ -0,0 +1,104 @@
+# documents/parses.py
+"""
+Stored spaCy parses of document text.
+
+Parses are DocBin files under MEDIA_ROOT/parses/<model>/, one per distinct
+text and pipeline, so documents with the same text share one. Analysis
+reads them instead of re-parsing (see ml_models.parse_cache).
+`manage.py parse_documents` fills them in across the corpus; analysis
+only saves them itself when the paragraph cache is off, since with it on
+a text is parsed paragraph by paragraph, not as a whole.
+"""
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+
+from ml_models.nlp_pipeline import analyze_texts
+from ml_models.parse_cache import MODEL_TAG, text_sha256
+
+from .models import Document, StoredParse
+
+DEFAULTS = {
+    "ENABLED": True,
+}
+
+
+def get_parse_settings():
+    return {**DEFAULTS, **getattr(settings, "PARSE_CACHE", {})}
+
+
+def parse_name(sha256, model):
+    return f"parses/{model}/{sha256[:2]}/{sha256}.spacy"
+
+
+class ParseStore:
+    """The parse_store interface of ml_models.parse_cache, backed by StoredParse."""
+
+    def load(self, sha256, model):
+        name = StoredParse.objects.filter(text_sha256=sha256, model=model).values_list("file", flat=True).first()
+        if name is None:
+            return None
+        try:
+            with default_storage.open(name, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            StoredParse.objects.filter(text_sha256=sha256, model=model).delete()
+            return None
+
+    def save(self, sha256, model, data):
+        name = parse_name(sha256, model)
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        try:
+            with transaction.atomic():
+                StoredParse.objects.update_or_create(
+                    text_sha256=sha256, model=model, defaults={"file": name, "size": len(data)},
+                )
+        except IntegrityError:
+            # Saved concurrently; both wrote the same file
+            pass
+
+
+def parse_store():
+    """A ParseStore, or None when PARSE_CACHE is disabled."""
+    return ParseStore() if get_parse_settings()["ENABLED"] else None
+
+
+def parse_documents(documents, window_chars=None, batch_size=4, n_process=1):
+    """Store parses for the documents' texts that don't have one yet. Returns how many were parsed."""
+    texts = {}
+    for document in documents:
+        if document.extracted_text:
+            texts.setdefault(text_sha256(document.extracted_text), document.extracted_text)
+
+    stored = set(
+        StoredParse.objects.filter(text_sha256__in=list(texts), model=MODEL_TAG).values_list("text_sha256", flat=True)
+    )
+    missing = [text for sha256, text in texts.items() if sha256 not in stored]
+    if missing:
+        options = {"window_chars": window_chars} if window_chars else {}
+        analyze_texts(missing, batch_size=batch_size, n_process=n_process, parse_store=ParseStore(), **options)
+    return len(missing)
+
+
+def prune_parses():
+    """Delete parses made by another pipeline or of texts no document has any more. Returns how many."""
+    current = set()
+    for text in Document.objects.exclude(extracted_text__isnull=True).values_list("extracted_text", flat=True).iterator(chunk_size=200):
+        current.add(text_sha256(text))
+
+    deleted = 0
+    for parse in StoredParse.objects.iterator():
+        if parse.model == MODEL_TAG and parse.text_sha256 in current:
+            continue
+        default_storage.delete(parse.file.name)
+        parse.delete()
+        deleted += 1
+    return deleted
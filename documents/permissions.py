@@ -1,5 +1,7 @@
+from django.db.models import Q
 from rest_framework.permissions import BasePermission
 from users.models import ClientAssignment
+from .models import Document
 
 class IsLawyer(BasePermission):
     def has_permission(self, request, view):
@@ -41,4 +43,20 @@ class IsDocumentParticipant(BasePermission):
             # check accepted assignment exists
             return ClientAssignment.objects.filter(lawyer=user, client_id=obj.user_id, status="accepted").exists()
 
-        return False
\ No newline at end of file
+        return False
+
+
+def accessible_documents(user, queryset=None):
+    """
+    Documents the user may read, as a queryset: everything for admins,
+    otherwise their own, those shared with them and accepted, and, for
+    lawyers, those of their accepted clients.
+    """
+    queryset = Document.objects.all() if queryset is None else queryset
+    if getattr(user, "role", None) == "admin" or user.is_superuser:
+        return queryset
+
+    allowed = Q(user=user) | Q(pk__in=user.shared_documents_as_client.filter(status="accepted").values("document"))
+    if getattr(user, "role", None) == "lawyer":
+        allowed |= Q(user_id__in=ClientAssignment.objects.filter(lawyer=user, status="accepted").values("client_id"))
+    return queryset.filter(allowed)
@@ -0,0 +1,174 @@
+# documents/reports.py
+import glob
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from xml.sax.saxutils import escape
+
+RISK_COLORS = {
+    "Low": "#2e7d32",
+    "Medium": "#f9a825",
+    "High": "#c62828",
+}
+
+
+def reports_dir():
+    return os.path.join(settings.MEDIA_ROOT, "reports")
+
+
+# ============================================================
+#   CACHE
+# ============================================================
+def analysis_fingerprint(document, entities=None):
+    """
+    Identifies one analysis of a document. Any change to what the report
+    shows (new analysis, regenerated summary, ...) yields a new fingerprint.
+    """
+    payload = json.dumps(
+        [
+            document.title,
+            document.analyzed_at.isoformat() if document.analyzed_at else None,
+            document.risk_score,
+            document.summary,
+            document.clauses_found,
+            entities or [],
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def get_or_build_report(document, version_number=None, entities=None):
+    """
+    Return the path of the PDF report for the document's current analysis,
+    rendering it only if this analysis version has no cached artifact yet.
+    """
+    name = f"{document.id}_v{version_number or 0}_{analysis_fingerprint(document, entities)}.pdf"
+    directory = reports_dir()
+    path = os.path.join(directory, name)
+
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        pdf = render_report_pdf(document, version_number=version_number, entities=entities)
+
+        # A unique temp file per writer: threads of one process render concurrently too
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+            f.write(pdf)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.remove(f.name)
+            raise
+
+        # Older analyses of this document are never served again
+        for old in glob.glob(os.path.join(directory, f"{document.id}_v*.pdf")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    return path
+
+
+def open_report(document, version_number=None, entities=None):
+    """
+    get_or_build_report, opened for reading. The file can be removed between
+    the two by a request that rendered a newer analysis; it is then rendered
+    again once.
+    """
+    try:
+        return open(get_or_build_report(document, version_number=version_number, entities=entities), "rb")
+    except FileNotFoundError:
+        return open(get_or_build_report(document, version_number=version_number, entities=entities), "rb")
+
+
+def delete_cached_reports(document_id):
+    for path in glob.glob(os.path.join(reports_dir(), f"{document_id}_v*.pdf")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ============================================================
+#   RENDERING
+# ============================================================
+def render_report_pdf(document, version_number=None, entities=None):
+    styles = getSampleStyleSheet()
+    body = styles["BodyText"]
+    buffer = io.BytesIO()
+
+    pdf = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        title=f"{document.title} - Analysis Report",
+        leftMargin=2 * cm,
+        rightMargin=2 * cm,
+        topMargin=2 * cm,
+        bottomMargin=2 * cm,
+    )
+
+    story = [
+        Paragraph("Document Analysis Report", styles["Title"]),
+        Paragraph(f"<b>Title:</b> {escape(document.title)}", body),
+        Paragraph(f"<b>Analyzed:</b> {document.analyzed_at:%Y-%m-%d %H:%M} UTC" if document.analyzed_at else "<b>Analyzed:</b> not yet", body),
+    ]
+    if version_number:
+        story.append(Paragraph(f"<b>Version:</b> {version_number}", body))
+
+    risk = document.risk_score or "Unknown"
+    story += [
+        Paragraph(f'<b>Risk Level:</b> <font color="{RISK_COLORS.get(risk, "#000000")}">{escape(risk)}</font>', body),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Summary", styles["Heading2"]),
+        Paragraph(escape(document.summary or "No summary available."), body),
+        Spacer(1, 0.5 * cm),
+        Paragraph("Clauses", styles["Heading2"]),
+    ]
+
+    clauses = document.clauses_found or {}
+    if clauses:
+        rows = [["Clause", "Present"]] + [
+            [key.replace("_", " ").title(), "Yes" if present else "No"]
+            for key, present in clauses.items()
+        ]
+        table = Table(rows, colWidths=[10 * cm, 4 * cm])
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]))
+        story.append(table)
+    else:
+        story.append(Paragraph("No clause analysis available.", body))
+
+    story += [Spacer(1, 0.5 * cm), Paragraph("Entities", styles["Heading2"])]
+    if entities:
+        rows = [["Entity", "Type", "Mentions"]] + [
+            [Paragraph(escape(str(e.get("text", ""))), body), e.get("label", ""), str(e.get("count", 1))]
+            for e in entities
+        ]
+        table = Table(rows, colWidths=[9 * cm, 3 * cm, 2 * cm], repeatRows=1)
+        table.setStyle(TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ]))
+        story.append(table)
+    else:
+        story.append(Paragraph("No entities recorded for this analysis.", body))
+
+    pdf.build(story)
+    return buffer.getvalue()
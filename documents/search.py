@@ -0,0 +1,199 @@
+# documents/search.py
+"""
+Full-text search over document titles and extracted text.
+
+The index is built by migration 0010 and kept current by database
+triggers: a weighted tsvector column with a GIN index on PostgreSQL, an FTS5
+table on SQLite (tests and local runs). Other databases fall back to a
+substring scan without ranking.
+
+Queries use web-search syntax on every backend: words are ANDed, "quoted
+text" is a phrase, OR between terms is a disjunction and -word excludes.
+"""
+import re
+from html import escape
+
+from django.db import connection, connections
+from django.db.models import Q
+
+# Marker characters put around matches by the database; the snippet is
+# HTML-escaped afterwards and the markers become <mark> tags.
+_START, _STOP = "\x02", "\x03"
+
+_TOKEN_RE = re.compile(r'(-?)"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+SNIPPET_CHARS = 300
+
+# Recreated by ensure_search_index() if a table rebuild dropped them
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_document_fts_insert AFTER INSERT ON documents_document BEGIN
+        INSERT INTO documents_document_fts(rowid, title, extracted_text)
+        VALUES (new.id, new.title, coalesce(new.extracted_text, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_document_fts_delete AFTER DELETE ON documents_document BEGIN
+        INSERT INTO documents_document_fts(documents_document_fts, rowid, title, extracted_text)
+        VALUES ('delete', old.id, old.title, coalesce(old.extracted_text, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_document_fts_update AFTER UPDATE OF title, extracted_text ON documents_document BEGIN
+        INSERT INTO documents_document_fts(documents_document_fts, rowid, title, extracted_text)
+        VALUES ('delete', old.id, old.title, coalesce(old.extracted_text, ''));
+        INSERT INTO documents_document_fts(rowid, title, extracted_text)
+        VALUES (new.id, new.title, coalesce(new.extracted_text, ''));
+    END
+    """,
+]
+
+
+def parse_query(query):
+    """
+    Split a web-search style query into OR-groups of terms. Each term is
+    (words, negated); a phrase is a term with several words.
+    """
+    groups, current = [], []
+    for match in _TOKEN_RE.finditer(query or ""):
+        negated, phrase, bare = match.groups()
+        if bare is not None:
+            if bare == "OR":
+                if current:
+                    groups.append(current)
+                current = []
+                continue
+            negated = "-" if bare.startswith("-") else ""
+            phrase = bare.lstrip("-")
+        words = _WORD_RE.findall(phrase)
+        if words:
+            current.append((words, bool(negated)))
+    if current:
+        groups.append(current)
+    # A group of only exclusions matches nothing useful
+    return [group for group in groups if any(not negated for _, negated in group)]
+
+
+def to_fts5_query(groups):
+    def term(words):
+        return '"' + " ".join(words) + '"'
+
+    clauses = []
+    for group in groups:
+        positive = " AND ".join(term(words) for words, negated in group if not negated)
+        negative = "".join(f" NOT {term(words)}" for words, negated in group if negated)
+        clauses.append(f"({positive}{negative})")
+    return " OR ".join(clauses)
+
+
+def highlight(snippet):
+    return escape(snippet or "").replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+def _access_subquery(documents):
+    return documents.values("pk").query.sql_with_params()
+
+
+def search_documents(documents, query, limit=20, offset=0):
+    """
+    Search within the `documents` queryset (the caller's accessible
+    documents). Returns a list of {"id", "rank", "highlight"}, best first.
+    """
+    groups = parse_query(query)
+    if not groups:
+        return []
+
+    if connection.vendor == "postgresql":
+        return _search_postgres(documents, query, limit, offset)
+    if connection.vendor == "sqlite":
+        return _search_sqlite(documents, groups, limit, offset)
+    return _search_fallback(documents, groups, limit, offset)
+
+
+def _search_postgres(documents, query, limit, offset):
+    access_sql, access_params = _access_subquery(documents)
+    headline_options = (
+        f"StartSel={_START}, StopSel={_STOP}, MaxFragments=3, "
+        "MaxWords=35, MinWords=15, FragmentDelimiter=\" … \""
+    )
+    # Rank with the index first; ts_headline reparses the text, so it only
+    # runs on the page of results that is returned.
+    sql = f"""
+        WITH q AS (SELECT websearch_to_tsquery('pg_catalog.english', %s) AS query),
+        hits AS (
+            SELECT d.id, ts_rank_cd(d.search_vector, q.query) AS rank
+            FROM documents_document d, q
+            WHERE d.search_vector @@ q.query AND d.id IN ({access_sql})
+            ORDER BY rank DESC, d.id DESC
+            LIMIT %s OFFSET %s
+        )
+        SELECT hits.id, hits.rank,
+               ts_headline('pg_catalog.english', coalesce(d.extracted_text, ''), q.query, %s)
+        FROM hits JOIN documents_document d ON d.id = hits.id, q
+        ORDER BY hits.rank DESC, hits.id DESC
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, *access_params, limit, offset, headline_options])
+        rows = cursor.fetchall()
+    return [{"id": id_, "rank": float(rank), "highlight": highlight(snippet)} for id_, rank, snippet in rows]
+
+
+def _search_sqlite(documents, groups, limit, offset):
+    access_sql, access_params = _access_subquery(documents)
+    sql = f"""
+        SELECT f.rowid, bm25(documents_document_fts, 10.0, 1.0) AS rank,
+               snippet(documents_document_fts, -1, %s, %s, ' … ', 32)
+        FROM documents_document_fts f
+        WHERE documents_document_fts MATCH %s AND f.rowid IN ({access_sql})
+        ORDER BY rank, f.rowid DESC
+        LIMIT %s OFFSET %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_START, _STOP, to_fts5_query(groups), *access_params, limit, offset])
+        rows = cursor.fetchall()
+    # bm25() is lower-is-better; flip it so higher means more relevant everywhere
+    return [{"id": id_, "rank": -rank, "highlight": highlight(snippet)} for id_, rank, snippet in rows]
+
+
+def _search_fallback(documents, groups, limit, offset):
+    condition = Q()
+    for group in groups:
+        clause = Q()
+        for words, negated in group:
+            term = Q(extracted_text__icontains=" ".join(words)) | Q(title__icontains=" ".join(words))
+            clause &= ~term if negated else term
+        condition |= clause
+
+    results = []
+    for id_, text in documents.filter(condition).order_by("-id").values_list("id", "extracted_text")[offset:offset + limit]:
+        phrase = " ".join(next(words for words, negated in groups[0] if not negated))
+        at = (text or "").lower().find(phrase.lower())
+        start = max(at - SNIPPET_CHARS // 2, 0) if at >= 0 else 0
+        snippet = (text or "")[start:start + SNIPPET_CHARS]
+        if at >= 0:
+            local = at - start
+            snippet = snippet[:local] + _START + snippet[local:local + len(phrase)] + _STOP + snippet[local + len(phrase):]
+        results.append({"id": id_, "rank": None, "highlight": highlight(snippet)})
+    return results
+
+
+def ensure_search_index(using=None, **kwargs):
+    """
+    post_migrate hook. SQLite drops a table's triggers when a migration
+    rebuilds it, so recreate any that are missing and reindex.
+    """
+    conn = connections[using or "default"]
+    if conn.vendor != "sqlite":
+        return
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = 'documents_document_fts'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'documents_document_fts_%'")
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return
+        for sql in SQLITE_TRIGGERS:
+            cursor.execute(sql)
+        cursor.execute("INSERT INTO documents_document_fts(documents_document_fts) VALUES ('rebuild')")
@@ -0,0 +1,180 @@
+# documents/sections.py
+"""
+Section index over extracted_text.
+
+Headings are detected line by line: numbered headings ("4.2 Payment
+Terms", "Section 7. Termination", "ARTICLE IV - INDEMNITY", "Schedule A")
+and short all-caps lines ("GOVERNING LAW"). Each heading starts a
+DocumentSection that runs to the next heading, so the table tiles the text
+and a section's text can be read with one Substr. The index is rebuilt
+whenever text is extracted, and built on first use for older documents.
+"""
+import bisect
+import re
+
+from django.db import transaction
+from django.db.models.functions import Substr
+
+from .models import Document, DocumentClause, DocumentSection
+
+MAX_SECTIONS = 2000
+MAX_TITLE_WORDS = 12
+
+_WORD_HEADING_RE = re.compile(
+    r"^[ \t]*(?P<word>article|section|clause|part|schedule|annex|exhibit|appendix)[ \t]+"
+    r"(?P<number>\d{1,3}(?:\.\d{1,3}){0,4}|[IVXLC]{1,7}|[A-Z])\b[.):]?"
+    r"(?:[ \t]*[-–—:][ \t]*|[ \t]+|$)(?P<title>[^\n]*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_NUMBERED_HEADING_RE = re.compile(
+    r"^[ \t]*(?P<number>\d{1,3}(?:\.\d{1,3}){0,4}|[IVXLC]{1,7}(?=\.))[.)]?[ \t]+(?P<title>[^\n]+)$",
+    re.MULTILINE,
+)
+_CAPS_HEADING_RE = re.compile(r"^[ \t]*(?P<title>[A-Z][A-Z0-9 &,'’/()-]{2,80}?)[ \t]*:?[ \t]*$", re.MULTILINE)
+_INLINE_TITLE_RE = re.compile(r"^(?P<title>[^.;:]{1,80}?)[.:][ \t]+\S")
+
+
+def _title(text, numbered_word=False):
+    """The heading title in a heading line's remainder, or None if the line reads like a sentence."""
+    text = text.strip()
+    if not text:
+        # "Section 7" alone on its line is still a heading
+        return "" if numbered_word else None
+    if not (text[0].isupper() or text[0].isdigit()):
+        return None
+
+    inline = _INLINE_TITLE_RE.match(text)
+    if inline and len(inline.group("title").split()) <= 6:
+        # "4.2 Payment Terms. Customer shall pay ..." - the heading runs into the body
+        return inline.group("title").strip()
+
+    words = text.split()
+    if len(words) > MAX_TITLE_WORDS:
+        return None
+    if text[-1] in ".;," and len(words) > 4 and not numbered_word:
+        # A numbered list item, not a heading
+        return None
+    return text.rstrip(" .:-–—")
+
+
+def _level(number, word):
+    if word and word.lower() in ("article", "part", "schedule", "annex", "exhibit", "appendix"):
+        return 1
+    return number.count(".") + 1
+
+
+def detect_sections(text):
+    """
+    Sections of `text` as dicts with number, title, level, start and end, in
+    text order. Without any headings the whole text is one section.
+    """
+    text = text or ""
+    # Keyed by where the heading text starts, past any indentation
+    headings = {}
+    for match in _WORD_HEADING_RE.finditer(text):
+        title = _title(match.group("title"), numbered_word=True)
+        if title is not None:
+            number = f"{match.group('word').title()} {match.group('number').upper()}"
+            headings[match.start("word")] = (number, title, _level(match.group("number"), match.group("word")))
+    for match in _NUMBERED_HEADING_RE.finditer(text):
+        title = _title(match.group("title"))
+        if title is not None:
+            headings.setdefault(match.start("number"), (match.group("number"), title, _level(match.group("number"), None)))
+    for match in _CAPS_HEADING_RE.finditer(text):
+        title = match.group("title").strip()
+        if len(title.split()) <= 10 and re.search(r"[A-Z]{3}", title):
+            headings.setdefault(match.start("title"), ("", title, 1))
+
+    starts = sorted(headings)[:MAX_SECTIONS]
+    sections = []
+    if text and (not starts or text[:starts[0]].strip()):
+        sections.append({"number": "", "title": "", "level": 0, "start": 0})
+    for start in starts:
+        number, title, level = headings[start]
+        sections.append({"number": number[:30], "title": title[:255], "level": level, "start": start})
+
+    if sections:
+        # Whitespace before the first heading belongs to it
+        sections[0]["start"] = 0
+    for section, following in zip(sections, sections[1:] + [None]):
+        section["end"] = following["start"] if following else len(text)
+    return sections
+
+
+# ============================================================
+#   INDEX
+# ============================================================
+def index_sections(documents):
+    """Replace the section rows of each document from its current extracted_text."""
+    documents = list(documents)
+    rows = [
+        DocumentSection(document=document, position=position, **section)
+        for document in documents
+        for position, section in enumerate(detect_sections(document.extracted_text))
+    ]
+    with transaction.atomic():
+        DocumentSection.objects.filter(document__in=documents).delete()
+        DocumentSection.objects.bulk_create(rows, batch_size=500)
+
+
+def document_sections(document):
+    """The document's sections, indexing them first if that never happened."""
+    sections = list(DocumentSection.objects.filter(document=document))
+    if not sections:
+        text = Document.objects.filter(pk=document.pk).values_list("extracted_text", flat=True).first()
+        if text:
+            document.extracted_text = text
+            index_sections([document])
+            sections = list(DocumentSection.objects.filter(document=document))
+    return sections
+
+
+def section_range(sections, position, subsections=False):
+    """(start, end) of the section at `position`, extended over its subsections if asked."""
+    index = next((i for i, section in enumerate(sections) if section.position == position), None)
+    if index is None:
+        return None
+    section = sections[index]
+    end = section.end
+    if subsections:
+        for following in sections[index + 1:]:
+            if following.level <= section.level:
+                break
+            end = following.end
+    return section.start, end
+
+
+def read_range(document, start, end):
+    """extracted_text[start:end], reading only that part from the database (Substr is 1-based)."""
+    return Document.objects.filter(pk=document.pk).values_list(
+        Substr("extracted_text", start + 1, end - start), flat=True
+    ).first() or ""
+
+
+def clauses_by_section(document, sections):
+    """{position: sorted clause keys matched inside that section}, from the stored clause spans."""
+    starts = [section.start for section in sections]
+    found = {}
+    for key, spans in DocumentClause.objects.filter(document=document, present=True).values_list("clause_key", "spans"):
+        for start, _ in spans or []:
+            index = bisect.bisect_right(starts, start) - 1
+            if index >= 0:
+                found.setdefault(sections[index].position, set()).add(key)
+    return {position: sorted(keys) for position, keys in found.items()}
+
+
+def rebase_result(result, offset):
+    """Shift the offsets of a process_document result for a section to offsets in the whole document."""
+    result["clause_spans"] = {
+        key: [[start + offset, end + offset] for start, end in spans]
+        for key, spans in (result.get("clause_spans") or {}).items()
+    }
+    result["clause_offsets"] = {
+        key: None if first is None else first + offset
+        for key, first in (result.get("clause_offsets") or {}).items()
+    }
+    result["entities"] = [
+        {**ent, "start_char": ent["start_char"] + offset, "end_char": ent["end_char"] + offset}
+        for ent in result.get("entities") or []
+    ]
+    return result
@@ -68,6 +68,8 @@ class DocumentVersionListSerializer(serializers.ModelSerializer):
 
 
 class DocumentVersionDetailSerializer(serializers.ModelSerializer):
+    content = serializers.CharField(source="text", read_only=True)
+
     class Meta:
         model = DocumentVersion
         fields = ["id", "version_number", "content", "created_at"]
@@ -0,0 +1,42 @@
+# documents/streaming.py
+"""
+Streaming responses under both WSGI and ASGI.
+
+Django's ASGI handler can only stream asynchronous iterators; a synchronous
+one is read to the end with sync_to_async(list) before the first byte goes
+out, which turns a progress stream or a ranged download into one buffered
+response. Under WSGI an asynchronous iterator has the same problem the other
+way round, so views keep their synchronous iterators and `streaming` adapts
+the response to the server that is serving it.
+"""
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+_DONE = object()
+
+
+def served_by_asgi(request):
+    # DRF wraps the HttpRequest
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+async def iterate_in_thread(iterator):
+    """Yield from a synchronous iterator, running each step in the request's sync thread."""
+    iterator = iter(iterator)
+    try:
+        while True:
+            chunk = await sync_to_async(next)(iterator, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming(request, response):
+    """Make a streaming response's body asynchronous when serving ASGI, so it is sent as it is produced."""
+    if response.streaming and not response.is_async and served_by_asgi(request):
+        response.streaming_content = iterate_in_thread(response.streaming_content)
+    return response
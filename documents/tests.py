@@ -1,3 +1,1039 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ml_models import incremental
+from ml_models.clause_patterns import PATTERNS as CLAUSE_PATTERNS
+from ml_models.nlp_pipeline import analyze_texts
+from notifications.models import ActivityLog, Notification
+from payments.models import Subscription
+from payments.quota import reserve_analysis
+from users.authentication import UserRefreshToken
+from users.models import ClientAssignment, User
+
+from . import uploads
+from .blobs import collect_garbage, known_extracted_text, release_blob, store_chunks
+from .batch_analysis import analyze_documents
+from .diffing import INLINE_MAX_CHARS, diff_texts, diff_versions
+from .downloads import parse_range
+from .indexing import index_analysis, normalize_entity
+from .models import Document, DocumentClause, DocumentEntity, DocumentSection, DocumentVersion, SharedDocument, StoredBlob, StoredParse, VersionContent
+from .parses import ParseStore, parse_documents
+from .reports import get_or_build_report, open_report
+from .search import _search_fallback, ensure_search_index, parse_query
+from .sections import detect_sections, rebase_result, section_range
+from .streaming import streaming
+from .uploads import UploadError, create_session, finalize_session, staging_path, write_chunk
+from .versioning import collect_contents, encode_delta, load_content, store_content
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+
+class BlobStorageTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+
+    def document(self, blob, **fields):
+        return Document.objects.create(
+            user=self.user, title="nda.txt", file=blob.file.name, file_type="text",
+            sha256=blob.sha256, blob=blob, **fields,
+        )
+
+    def test_identical_contents_share_one_blob(self):
+        first = store_chunks([b"same ", b"bytes"], ".txt")
+        second = store_chunks([b"same bytes"], ".txt")
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(StoredBlob.objects.get(pk=first.pk).ref_count, 2)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "blobs", "tmp")), [])
+
+    def test_file_removed_with_last_reference(self):
+        blob = store_chunks([b"contents"], ".txt")
+        store_chunks([b"contents"], ".txt")
+        path = blob.file.path
+
+        self.assertFalse(release_blob(blob.pk))
+        self.assertTrue(os.path.exists(path))
+        self.assertTrue(release_blob(blob.pk))
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredBlob.objects.filter(pk=blob.pk).exists())
+
+    def test_gc_leaves_recently_referenced_blob_alone(self):
+        # Reference taken, Document not created yet
+        blob = store_chunks([b"in flight"], ".txt")
+
+        self.assertEqual(collect_garbage(), 0)
+        self.assertTrue(os.path.exists(blob.file.path))
+        self.assertEqual(StoredBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+    def test_gc_recounts_references_after_grace(self):
+        blob = store_chunks([b"shared"], ".txt")
+        store_chunks([b"shared"], ".txt")
+        kept = self.document(blob)
+        # Deleted without release_blob, like a cascade from a deleted user
+        Document.objects.filter(pk=self.document(blob).pk).delete()
+        StoredBlob.objects.filter(pk=blob.pk).update(referenced_at=blob.referenced_at - timedelta(days=1))
+
+        self.assertEqual(collect_garbage(), 0)
+        self.assertEqual(StoredBlob.objects.get(pk=blob.pk).ref_count, 1)
+
+        kept.delete()
+        self.assertEqual(collect_garbage(), 1)
+        self.assertFalse(os.path.exists(blob.file.path))
+
+    def test_empty_text_from_failed_extraction_is_not_reused(self):
+        blob = store_chunks([b"%PDF scanned"], ".pdf")
+        self.document(blob, extracted_text="")
+        self.assertIsNone(known_extracted_text(blob.sha256))
+
+        self.document(blob, extracted_text="1. Definitions")
+        self.assertEqual(known_extracted_text(blob.sha256), "1. Definitions")
+
+
+@override_settings(EVENT_SINK={"MODE": "sync"}, BULK_UPLOAD={"WORKERS": 1})
+class BulkUploadTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def archive(self, members, corrupt=None):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        data = buffer.getvalue()
+        if corrupt:
+            # Same length, different bytes: the member's CRC no longer matches
+            data = data.replace(corrupt, corrupt.upper())
+        return SimpleUploadedFile("batch.zip", data, content_type="application/zip")
+
+    def test_unreadable_member_is_skipped(self):
+        response = self.client.post("/api/documents/bulk-upload/", {
+            "archive": self.archive({"good.txt": b"Governing law.", "bad.txt": b"broken member"}, corrupt=b"broken member"),
+        })
+        self.assertEqual(response.status_code, 201)
+
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([doc["name"] for doc in events[0]["documents"]], ["good.txt"])
+        self.assertEqual(events[0]["skipped"][0]["name"], "bad.txt")
+        self.assertIn("could not be read", events[0]["skipped"][0]["error"])
+        self.assertEqual(events[-1]["event"], "complete")
+
+    def test_disconnect_still_saves_texts_and_notifies(self):
+        response = self.client.post("/api/documents/bulk-upload/", {
+            "files": [
+                SimpleUploadedFile("a.txt", b"Limitation of liability."),
+                SimpleUploadedFile("b.txt", b"Termination for convenience."),
+            ],
+        })
+        accepted = json.loads(next(iter(response.streaming_content)))
+        # The client goes away after the first event
+        response.close()
+
+        texts = dict(Document.objects.filter(user=self.user).values_list("title", "extracted_text"))
+        self.assertEqual(texts, {"a.txt": "Limitation of liability.", "b.txt": "Termination for convenience."})
+        self.assertEqual(accepted["total"], 2)
+        self.assertTrue(Notification.objects.filter(user=self.user, message__contains="2 documents").exists())
+        self.assertTrue(ActivityLog.objects.filter(user=self.user, type="upload").exists())
+
+
+@override_settings(CHUNKED_UPLOADS={"CHUNK_SIZE": 4})
+class ChunkedUploadTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.body = b"Indemnity clause"
+        self.session = create_session(self.user, "c.txt", len(self.body), "txt")
+
+    def send_all(self):
+        for index in range(self.session.chunk_count):
+            chunk = self.body[index * 4:(index + 1) * 4]
+            write_chunk(self.session.id, self.user, index, io.BytesIO(chunk))
+
+    def test_chunks_assemble_into_document(self):
+        self.send_all()
+        session, document, created = finalize_session(self.session.id, self.user)
+
+        self.assertTrue(created)
+        with document.file.open("rb") as f:
+            self.assertEqual(f.read(), self.body)
+        self.assertEqual(os.listdir(os.path.dirname(staging_path(session))), [])
+
+    def test_retried_chunk_is_stored_once(self):
+        write_chunk(self.session.id, self.user, 0, io.BytesIO(b"Inde"))
+        session = write_chunk(self.session.id, self.user, 0, io.BytesIO(b"Inde"))
+        self.assertEqual(session.received_bytes, 4)
+
+    def test_wrong_size_chunk_is_rejected(self):
+        with self.assertRaises(UploadError):
+            write_chunk(self.session.id, self.user, 0, io.BytesIO(b"Indemnity"))
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received_bytes, 0)
+        self.assertEqual(os.path.getsize(staging_path(self.session)), 0)
+
+    def test_failed_finalize_leaves_no_blob_and_can_be_retried(self):
+        self.send_all()
+        with mock.patch("documents.uploads.Document.objects.create", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                finalize_session(self.session.id, self.user)
+
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertEqual([files for _, _, files in os.walk(os.path.join(self.media_root, "blobs")) if files], [])
+
+        session, document, created = finalize_session(self.session.id, self.user)
+        self.assertTrue(created)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_finalize_on_another_worker_rehashes_staging_file(self):
+        self.send_all()
+        # Another worker never saw the chunks
+        with mock.patch.dict(uploads._hashers, clear=True):
+            session, document, created = finalize_session(self.session.id, self.user)
+
+        self.assertEqual(session.sha256, hashlib.sha256(self.body).hexdigest())
+        self.assertEqual(document.sha256, session.sha256)
+
+    def test_hashers_of_expired_sessions_are_dropped(self):
+        write_chunk(self.session.id, self.user, 0, io.BytesIO(b"Inde"))
+        self.assertIn(self.session.id, uploads._hashers)
+
+        with override_settings(CHUNKED_UPLOADS={"EXPIRY_HOURS": 48}):
+            other = create_session(self.user, "d.txt", 4, "txt")
+        later = timezone.now() + timedelta(hours=30)
+        with mock.patch("documents.uploads.timezone.now", return_value=later):
+            write_chunk(other.id, self.user, 0, io.BytesIO(b"Term"))
+
+        self.assertNotIn(self.session.id, uploads._hashers)
+        self.assertIn(other.id, uploads._hashers)
+
+
+@override_settings(VERSION_STORAGE={"MAX_CHAIN": 10, "DELTA_MAX_RATIO": 0.5, "DELTA_MAX_LINES": 50})
+class VersionStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.base_text = "".join(f"{n}. Clause {n} applies to the parties.\n" for n in range(200))
+
+    def version(self, document, number, content):
+        return DocumentVersion.objects.create(document=document, version_number=number, content_ref=content)
+
+    def test_small_change_is_stored_as_delta(self):
+        base = store_content(self.base_text)
+        changed = self.base_text.replace("Clause 7 applies", "Clause 7 no longer applies")
+        content = store_content(changed, base=base)
+
+        self.assertEqual(content.kind, "delta")
+        self.assertEqual(store_content(changed, base=base).pk, content.pk)
+        cache.clear()
+        self.assertEqual(load_content(VersionContent.objects.get(pk=content.pk)), changed)
+
+    def test_large_change_is_stored_in_full(self):
+        rewritten = "".join(f"{n}. Rewritten clause {n}.\n" for n in range(200))
+        self.assertIsNone(encode_delta(self.base_text, rewritten, max_lines=50))
+
+        content = store_content(rewritten, base=store_content(self.base_text))
+        self.assertEqual(content.kind, "full")
+
+    def test_contents_of_deleted_versions_are_collected(self):
+        document = Document.objects.create(user=self.user, title="nda.txt", file_type="text")
+        base = store_content(self.base_text)
+        delta = store_content(self.base_text + "Signed.\n", base=base)
+        shared = Document.objects.create(user=self.user, title="copy.txt", file_type="text")
+        self.version(document, 1, base)
+        self.version(document, 2, delta)
+        self.version(shared, 1, delta)
+
+        document.delete()
+        # The other document's version still needs the delta, and so its base
+        self.assertEqual(collect_contents(), 0)
+
+        shared.delete()
+        self.assertEqual(collect_contents(), 2)
+        self.assertFalse(VersionContent.objects.exists())
+
+
+@mock.patch("ml_models.nlp_pipeline.generate_summaries", lambda texts, **kwargs: [f"Summary of {t[:9]}" for t in texts])
+@mock.patch("ml_models.nlp_pipeline.generate_summary", lambda text, **kwargs: f"Summary of {text[:9]}")
+class BatchAnalysisTests(TestCase):
+    texts = [
+        "Acme Corp pays the fees.\n\nLimitation of liability applies.\n",
+        "Governing law is Delaware.\n\nEither party may terminate.\n",
+        "Confidential information stays confidential.\n",
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Subscription.objects.update_or_create(user=self.user, defaults={"plan": "free", "analysis_count": 0})
+        self.documents = [
+            Document.objects.create(user=self.user, title=f"doc{n}.txt", file_type="text", extracted_text=text)
+            for n, text in enumerate(self.texts)
+        ]
+
+    def analyze_batch(self, documents):
+        return self.client.post(
+            "/api/documents/analyze/batch/", {"document_ids": [doc.id for doc in documents]}, format="json",
+        )
+
+    def analysis_count(self):
+        return Subscription.objects.get(user=self.user).analysis_count
+
+    @override_settings(BATCH_ANALYSIS={"MAX_DOCUMENTS": 2})
+    def test_request_size_is_capped(self):
+        response = self.client.post("/api/documents/analyze/batch/", {"document_ids": [1, 2, 3]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("At most 2", response.data["error"])
+
+    def test_batch_reserves_quota_once(self):
+        with mock.patch("documents.views.reserve_analysis", wraps=reserve_analysis) as reserve:
+            response = self.analyze_batch(self.documents)
+
+        self.assertEqual(response.status_code, 200)
+        reserve.assert_called_once_with(self.user, 3)
+        self.assertEqual(self.analysis_count(), 3)
+
+    def test_batch_over_quota_is_refused_whole(self):
+        Subscription.objects.filter(user=self.user).update(analysis_count=1)
+        response = self.analyze_batch(self.documents)
+
+        self.assertEqual(response.status_code, 402)
+        self.assertEqual(self.analysis_count(), 1)
+        self.assertFalse(DocumentVersion.objects.exists())
+
+    def test_failed_batch_releases_quota(self):
+        with mock.patch("documents.batch_analysis.process_documents", side_effect=RuntimeError("model down")):
+            response = self.analyze_batch(self.documents)
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(self.analysis_count(), 0)
+        self.assertFalse(DocumentVersion.objects.exists())
+
+    def test_batch_matches_single_document_analysis(self):
+        Subscription.objects.filter(user=self.user).update(plan="premium")
+        fields = ["clauses_found", "risk_score", "summary", "status"]
+        # Analyzed twice so the version chain is stored the same way on both paths
+        for _ in range(2):
+            for document in self.documents:
+                self.assertEqual(self.client.post(f"/api/documents/{document.id}/analyze/").status_code, 200)
+        singles = {
+            doc.extracted_text: (
+                [getattr(doc, field) for field in fields],
+                [(v.version_number, load_content(v.content_ref)) for v in doc.versions.order_by("version_number")],
+            )
+            for doc in Document.objects.filter(pk__in=[d.pk for d in self.documents])
+        }
+
+        copies = [
+            Document.objects.create(user=self.user, title=f"copy{n}.txt", file_type="text", extracted_text=text)
+            for n, text in enumerate(self.texts)
+        ]
+        for _ in range(2):
+            self.assertEqual(self.analyze_batch(copies).status_code, 200)
+
+        for doc in Document.objects.filter(pk__in=[d.pk for d in copies]):
+            with self.subTest(document=doc.title):
+                self.assertIsNotNone(doc.analyzed_at)
+                self.assertEqual(doc.summary, f"Summary of {doc.extracted_text[:9]}")
+                self.assertEqual(
+                    ([getattr(doc, field) for field in fields],
+                     [(v.version_number, load_content(v.content_ref)) for v in doc.versions.order_by("version_number")]),
+                    singles[doc.extracted_text],
+                )
+
+
+class IncrementalAnalysisTests(SimpleTestCase):
+    def setUp(self):
+        self.paragraph_cache = caches["default"]
+        self.paragraph_cache.clear()
+        self.paragraphs = [
+            "Acme Corp pays the fees.",
+            "Limitation of liability applies to both parties.",
+            "Governing law is Delaware.",
+        ]
+
+    def analyze(self, paragraphs):
+        """(result, texts of the paragraphs that had to be parsed)"""
+        with mock.patch("ml_models.incremental._analyze_paragraph", wraps=incremental._analyze_paragraph) as parsed:
+            result = analyze_texts(["\n\n".join(paragraphs)], paragraph_cache=self.paragraph_cache)[0]
+        return result, [call.args[0].text.strip() for call in parsed.call_args_list]
+
+    def test_only_edited_paragraph_is_reparsed(self):
+        _, parsed = self.analyze(self.paragraphs)
+        self.assertEqual(parsed, self.paragraphs)
+
+        # A longer first paragraph moves everything after it
+        edited = ["Acme Corp and its affiliates pay all of the fees.", *self.paragraphs[1:]]
+        text = "\n\n".join(edited)
+        result, parsed = self.analyze(edited)
+
+        self.assertEqual(parsed, [edited[0]])
+        self.assertEqual(result, analyze_texts([text])[0])
+        spans, entities = result
+        self.assertTrue(spans["jurisdiction"])
+        self.assertEqual(
+            [text[e["start_char"]:e["end_char"]] for e in entities],
+            [e["text"] for e in entities],
+        )
+        self.assertIn("Delaware", [e["text"] for e in entities])
+
+    def test_new_analysis_tag_invalidates_cache(self):
+        self.analyze(self.paragraphs)
+        self.assertEqual(self.analyze(self.paragraphs)[1], [])
+
+        with mock.patch("ml_models.incremental.ANALYSIS_TAG", "other-model"):
+            self.assertEqual(self.analyze(self.paragraphs)[1], self.paragraphs)
+
+
+class WindowedAnalysisTests(SimpleTestCase):
+    def setUp(self):
+        # No sentence or line breaks, so windows are cut between words
+        words = []
+        for n in range(400):
+            words.append(["alpha", "beta", "gamma", "delta"][n % 4])
+            if n % 7 == 3:
+                words.append("limitation of liability")
+            if n % 11 == 5:
+                words.append("governing law")
+        self.text = " ".join(words)
+        self.whole = analyze_texts([self.text], window_chars=10 ** 6)[0][0]
+
+    def test_phrases_across_window_edges_are_found_once(self):
+        for size in (300, 500, 700):
+            with self.subTest(size=size):
+                self.assertEqual(analyze_texts([self.text], window_chars=size)[0][0], self.whole)
+
+    def test_paragraph_cache_path_matches_too(self):
+        paragraph_cache = caches["default"]
+        paragraph_cache.clear()
+        spans = analyze_texts([self.text], paragraph_cache=paragraph_cache, window_chars=500)[0][0]
+        self.assertEqual(spans, self.whole)
+        self.assertEqual(len(self.whole["jurisdiction"]), 36)
+
+
+class StoredParseTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.text = "Acme Corp pays the fees.\n\nGoverning law is Delaware.\n"
+        for title in ("a.txt", "b.txt"):
+            Document.objects.create(user=user, title=title, file_type="text", extracted_text=self.text)
+
+    def test_one_parse_per_distinct_text(self):
+        self.assertEqual(parse_documents(Document.objects.all()), 1)
+        self.assertEqual(StoredParse.objects.count(), 1)
+        self.assertEqual(parse_documents(Document.objects.all()), 0)
+
+    def test_analysis_reads_stored_parse(self):
+        expected = analyze_texts([self.text])[0]
+        parse_documents(Document.objects.all())
+
+        paragraph_cache = caches["default"]
+        paragraph_cache.clear()
+        with mock.patch("ml_models.nlp_pipeline.analyze_paragraphs", side_effect=AssertionError("parsed")):
+            analyzed = analyze_texts([self.text], paragraph_cache=paragraph_cache, parse_store=ParseStore())[0]
+        self.assertEqual(analyzed, expected)
+
+
+class StreamingTests(SimpleTestCase):
+    def chunks(self, produced):
+        for n in range(3):
+            produced.append(n)
+            yield f"chunk {n}\n".encode()
+
+    def test_wsgi_response_is_left_alone(self):
+        response = StreamingHttpResponse(self.chunks([]))
+        self.assertFalse(streaming(RequestFactory().get("/"), response).is_async)
+
+    async def test_asgi_response_is_sent_as_produced(self):
+        produced = []
+        response = streaming(AsyncRequestFactory().get("/"), StreamingHttpResponse(self.chunks(produced)))
+        self.assertTrue(response.is_async)
+
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b"chunk 0\n")
+        # Nothing read ahead of what was sent
+        self.assertEqual(produced, [0])
+        self.assertEqual([chunk async for chunk in content], [b"chunk 1\n", b"chunk 2\n"])
+
+
+class FileDownloadTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.body = b"".join(f"{n:04d} ".encode() for n in range(5000))
+        upload = self.client.post("/api/documents/upload/", {"file": SimpleUploadedFile("nda.txt", self.body)})
+        self.url = f"/api/documents/{upload.data['id']}/file/"
+
+    def test_range_request(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.body)}")
+        self.assertEqual(b"".join(response.streaming_content), self.body[100:200])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.body)}-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_ranges_of_empty_file_are_unsatisfiable(self):
+        for header in ("bytes=-10", "bytes=0-", "bytes=0-0"):
+            with self.subTest(header=header):
+                self.assertIs(parse_range(header, 0), False)
+        self.assertEqual(parse_range("bytes=-10", 4), (0, 3))
+
+    async def test_range_request_streams_under_asgi(self):
+        token = await sync_to_async(lambda: str(UserRefreshToken.for_user(self.user).access_token))()
+        response = await self.async_client.get(self.url, headers={"Authorization": f"Bearer {token}", "Range": "bytes=100-199"})
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]), self.body[100:200])
+
+
+class ReportCacheTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.document = Document.objects.create(user=self.user, title="NDA", file_type="text", risk_score="Low")
+
+    def test_concurrent_renders_share_one_report(self):
+        with mock.patch("documents.reports.render_report_pdf", return_value=b"%PDF-1.4 report"):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                paths = set(pool.map(lambda _: get_or_build_report(self.document), range(8)))
+
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(os.listdir(os.path.dirname(paths.pop())), [os.path.basename(get_or_build_report(self.document))])
+
+    def test_report_removed_before_open_is_rendered_again(self):
+        gone = os.path.join(self.media_root, "reports", "gone.pdf")
+        with mock.patch("documents.reports.get_or_build_report", side_effect=[gone, get_or_build_report(self.document)]):
+            with open_report(self.document) as report:
+                self.assertTrue(report.read().startswith(b"%PDF"))
+
+    def test_download(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f"/api/documents/{self.document.pk}/download/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.other = User.objects.create_user("other", "other@example.com", "pw-12345", role="lawyer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+        self.nda = self.document("nda.txt", "The parties keep strict confidentiality. Termination requires notice.")
+        self.lease = self.document("lease.txt", "Termination of the lease for convenience.")
+        self.policy = self.document(
+            "Confidentiality policy", "Confidentiality covers client data. Confidentiality survives the term.",
+        )
+        self.foreign = self.document("foreign.txt", "Confidentiality and termination.", user=self.other)
+
+    def document(self, title, text, user=None):
+        return Document.objects.create(user=user or self.owner, title=title, file_type="text", extracted_text=text)
+
+    def search(self, query):
+        response = self.client.get("/api/documents/search/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def ids(self, query):
+        return {result["id"] for result in self.search(query)}
+
+    def test_query_syntax(self):
+        self.assertEqual(
+            parse_query('"exact phrase" -draft OR fees'),
+            [[(["exact", "phrase"], False), (["draft"], True)], [(["fees"], False)]],
+        )
+        self.assertEqual(parse_query("-draft"), [])
+
+    def test_words_are_combined(self):
+        self.assertEqual(self.ids("confidentiality termination"), {self.nda.pk})
+
+    def test_phrase(self):
+        self.assertEqual(self.ids('"termination of the lease"'), {self.lease.pk})
+        self.assertEqual(self.ids('"lease termination"'), set())
+
+    def test_or_and_exclusion(self):
+        self.assertEqual(self.ids("lease OR policy"), {self.lease.pk, self.policy.pk})
+        self.assertEqual(self.ids("confidentiality -termination"), {self.policy.pk})
+
+    def test_title_and_repeated_matches_rank_first(self):
+        results = self.search("confidentiality")
+        self.assertEqual([result["id"] for result in results], [self.policy.pk, self.nda.pk])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+
+    def test_highlight_is_escaped(self):
+        document = self.document("markup.txt", "Fees < 5 & <b>indemnity</b> applies.")
+        highlight = next(result["highlight"] for result in self.search("indemnity") if result["id"] == document.pk)
+        self.assertIn("<mark>indemnity</mark>", highlight)
+        self.assertIn("&lt;b&gt;", highlight)
+        self.assertNotIn("<b>", highlight)
+
+    def test_index_follows_updates_and_deletes(self):
+        Document.objects.filter(pk=self.lease.pk).update(extracted_text="Arbitration in London.")
+        self.assertEqual(self.ids("convenience"), set())
+        self.assertEqual(self.ids("arbitration"), {self.lease.pk})
+
+        self.nda.delete()
+        self.assertEqual(self.ids("termination"), set())
+
+    @skipUnless(connection.vendor == "sqlite", "SQLite drops triggers when it rebuilds a table")
+    def test_dropped_trigger_is_recreated(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER documents_document_fts_insert")
+        ensure_search_index()
+
+        document = self.document("sla.txt", "Uptime credits apply.")
+        self.assertEqual(self.ids("uptime"), {document.pk})
+
+    def test_other_users_documents_only_once_shared(self):
+        self.assertNotIn(self.foreign.pk, self.ids("termination"))
+
+        share = SharedDocument.objects.create(document=self.foreign, lawyer=self.other, client=self.owner)
+        self.assertNotIn(self.foreign.pk, self.ids("termination"))
+        share.status = "accepted"
+        share.save()
+        self.assertIn(self.foreign.pk, self.ids("termination"))
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get("/api/documents/search/", {"q": " "}).status_code, 400)
+
+    def test_substring_fallback(self):
+        documents = Document.objects.filter(user=self.owner)
+        results = _search_fallback(documents, parse_query("confidentiality -termination OR lease"), 20, 0)
+        self.assertEqual({result["id"] for result in results}, {self.lease.pk, self.policy.pk})
+        self.assertIn("<mark>Confidentiality</mark>", next(r["highlight"] for r in results if r["id"] == self.policy.pk))
+
+
+class DiffTests(TestCase):
+    def setUp(self):
+        self.paragraphs = [f"Clause {n}. The parties agree to obligation number {n}." for n in range(10)]
+        self.text = "\n\n".join(self.paragraphs)
+
+    def edited(self, paragraphs):
+        return "\n\n".join(paragraphs)
+
+    def test_identical_texts(self):
+        result = diff_texts(self.text, self.text)
+        self.assertEqual(result["changes"], [])
+        self.assertEqual(result["stats"], {"unchanged": 10, "changed": 0, "inserted": 0, "deleted": 0})
+
+    def test_inserted_and_deleted_paragraphs(self):
+        paragraphs = self.paragraphs[:3] + ["Clause X. A new warranty."] + self.paragraphs[3:]
+        del paragraphs[8]
+        new = self.edited(paragraphs)
+        result = diff_texts(self.text, new)
+
+        self.assertEqual(result["stats"], {"unchanged": 9, "changed": 0, "inserted": 1, "deleted": 1})
+        inserted, deleted = sorted(result["changes"], key=lambda change: change["op"], reverse=True)
+        self.assertEqual(inserted["new_text"], "Clause X. A new warranty.")
+        self.assertEqual(new[inserted["new_start"]:inserted["new_end"]], inserted["new_text"])
+        self.assertEqual(deleted["old_text"], self.paragraphs[7])
+        self.assertEqual(self.text[deleted["old_start"]:deleted["old_end"]], deleted["old_text"])
+
+    def test_moved_paragraph_leaves_the_rest_unchanged(self):
+        new = self.edited(self.paragraphs[1:] + self.paragraphs[:1])
+        result = diff_texts(self.text, new)
+
+        self.assertEqual(result["stats"], {"unchanged": 9, "changed": 0, "inserted": 1, "deleted": 1})
+        self.assertEqual({change.get("old_text") or change.get("new_text") for change in result["changes"]}, {self.paragraphs[0]})
+
+    def test_modified_paragraph_has_inline_segments(self):
+        paragraphs = list(self.paragraphs)
+        paragraphs[5] = paragraphs[5].replace("agree to", "agree promptly to")
+        result = diff_texts(self.text, self.edited(paragraphs))
+
+        [change] = result["changes"]
+        self.assertEqual(change["op"], "changed")
+        segments = change["inline"]
+        self.assertEqual("".join(text for op, text in segments if op != "insert"), self.paragraphs[5])
+        self.assertEqual("".join(text for op, text in segments if op != "delete"), paragraphs[5])
+        self.assertIn(["insert", "promptly "], segments)
+
+    def test_no_inline_diff_for_huge_or_unrelated_paragraphs(self):
+        huge = "word " * (INLINE_MAX_CHARS // 8)
+        [change] = diff_texts(huge + "old", huge + "new")["changes"]
+        self.assertEqual(change["op"], "changed")
+        self.assertIsNone(change["inline"])
+
+        [change] = diff_texts("Confidential information.", "2026-01-01 / $9,000")["changes"]
+        self.assertIsNone(change["inline"])
+
+    def test_repeated_paragraphs(self):
+        old = self.edited(["Reserved.", "Clause A.", "Reserved.", "Clause B.", "Reserved."])
+        new = self.edited(["Reserved.", "Clause A.", "Reserved.", "Clause C.", "Reserved."])
+        result = diff_texts(old, new)
+        self.assertEqual(result["stats"], {"unchanged": 4, "changed": 1, "inserted": 0, "deleted": 0})
+
+    def test_version_diff_is_cached_per_pair(self):
+        owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        document = Document.objects.create(user=owner, title="nda.txt", file_type="text")
+        old = DocumentVersion.objects.create(document=document, version_number=1, content_ref=store_content(self.text))
+        new = DocumentVersion.objects.create(
+            document=document, version_number=2, content_ref=store_content(self.text + "\n\nSigned."),
+        )
+        cache.clear()
+
+        with mock.patch("documents.diffing.diff_texts", wraps=diff_texts) as computed:
+            first = diff_versions(old, new)
+            self.assertEqual(diff_versions(old, new), first)
+            self.assertEqual(computed.call_count, 1)
+            diff_versions(new, old)
+            self.assertEqual(computed.call_count, 2)
+
+
+class DocumentVersionDiffViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.document = Document.objects.create(user=self.owner, title="nda.txt", file_type="text")
+        for number, text in enumerate(["Clause 1.\n\nClause 2.", "Clause 1.\n\nClause 2 amended.", "Clause 1."], 1):
+            DocumentVersion.objects.create(document=self.document, version_number=number, content_ref=store_content(text))
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f"/api/documents/{self.document.pk}/versions/diff/"
+        cache.clear()
+
+    def test_defaults_to_the_last_two_versions(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["from"]["version_number"], response.data["to"]["version_number"]), (2, 3))
+        self.assertEqual(response.data["stats"]["deleted"], 1)
+
+    def test_explicit_versions(self):
+        response = self.client.get(self.url, {"from": 1, "to": 2})
+        self.assertEqual(response.data["stats"]["changed"], 1)
+        self.assertEqual(self.client.get(self.url, {"from": 9}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {"from": "first"}).status_code, 400)
+
+    def test_non_participants_are_refused(self):
+        stranger = User.objects.create_user("stranger", "stranger@example.com", "pw-12345", role="lawyer")
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ClauseIndexTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.other = User.objects.create_user("other", "other@example.com", "pw-12345")
+        self.nda = self.document(self.owner, "nda.txt", "Confidentiality applies. Either party may terminate.")
+        self.invoice = self.document(self.owner, "invoice.txt", "Fees are due on receipt of the invoice.")
+        self.foreign = self.document(self.other, "foreign.txt", "Confidentiality applies.")
+        analyze_documents([self.nda, self.invoice, self.foreign], generate_summary_flag=False)
+        # Never analyzed, so never listed
+        self.document(self.owner, "draft.txt", "Confidentiality applies.")
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def document(self, user, title, text):
+        return Document.objects.create(user=user, title=title, file_type="text", extracted_text=text)
+
+    def filtered(self, **params):
+        response = self.client.get("/api/documents/clauses/", params)
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data["results"]]
+
+    def test_rows_are_replaced_on_reanalysis(self):
+        self.assertTrue(DocumentClause.objects.get(document=self.nda, clause_key="confidentiality").present)
+
+        self.nda.extracted_text = "Payment is due monthly."
+        self.nda.save()
+        analyze_documents([self.nda], generate_summary_flag=False)
+
+        rows = {row.clause_key: row for row in DocumentClause.objects.filter(document=self.nda)}
+        self.assertEqual(len(rows), len(CLAUSE_PATTERNS))
+        self.assertFalse(rows["confidentiality"].present)
+        self.assertTrue(rows["payment_terms"].present)
+        self.assertEqual(rows["payment_terms"].first_offset, 0)
+
+    def test_present_and_missing_filters(self):
+        self.assertEqual(self.filtered(present="confidentiality"), [self.nda.pk])
+        self.assertEqual(self.filtered(present="confidentiality", missing="payment_terms"), [self.nda.pk])
+        self.assertEqual(self.filtered(present="payment_terms", missing="confidentiality"), [self.invoice.pk])
+        self.assertEqual(self.filtered(present="confidentiality,payment_terms"), [])
+
+    def test_filters_respect_access(self):
+        self.assertNotIn(self.foreign.pk, self.filtered(present="confidentiality"))
+
+        lawyer = User.objects.create_user("lawyer", "lawyer@example.com", "pw-12345", role="lawyer")
+        ClientAssignment.objects.create(lawyer=lawyer, client=self.other, status="accepted")
+        self.client.force_authenticate(lawyer)
+        self.assertEqual(self.filtered(present="confidentiality"), [self.foreign.pk])
+        self.assertEqual(self.filtered(present="confidentiality", owner=str(self.owner.pk)), [])
+
+    def test_bad_filters(self):
+        self.assertEqual(self.client.get("/api/documents/clauses/").status_code, 400)
+        response = self.client.get("/api/documents/clauses/", {"present": "haiku"})
+        self.assertEqual((response.status_code, response.data["unknown"]), (400, ["haiku"]))
+
+    def test_summary_counts(self):
+        response = self.client.get("/api/documents/clauses/summary/")
+        self.assertEqual(response.data["confidentiality"], {"present": 1, "missing": 1})
+        self.assertEqual(response.data["payment_terms"], {"present": 1, "missing": 1})
+
+        admin = User.objects.create_user("admin", "admin@example.com", "pw-12345", role="admin")
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get("/api/documents/clauses/summary/").data["confidentiality"], {"present": 2, "missing": 1})
+
+
+class EntityIndexTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.other = User.objects.create_user("other", "other@example.com", "pw-12345")
+        self.msa = self.document(self.owner, "msa.txt", [
+            ("Acme Corp", "ORG", 0), ("ACME CORP.", "ORG", 40), ("the Acme Corp", "ORG", 80), ("Delaware", "GPE", 120),
+        ])
+        self.lease = self.document(self.owner, "lease.txt", [("Acme Corp", "PERSON", 10)])
+        self.foreign = self.document(self.other, "foreign.txt", [("Acme Corp", "ORG", 0)])
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def document(self, user, title, mentions):
+        document = Document.objects.create(user=user, title=title, file_type="text", extracted_text="...")
+        entities = [
+            {"text": text, "label": label, "start_char": start, "end_char": start + len(text)}
+            for text, label, start in mentions
+        ]
+        index_analysis(document, {"entities": entities})
+        return document
+
+    def lookup(self, **params):
+        response = self.client.get("/api/documents/entities/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_normalized_form(self):
+        self.assertEqual(normalize_entity("  The  ACME\nCorp.  "), "acme corp")
+
+    def test_mentions_are_grouped_per_label_and_form(self):
+        entity = DocumentEntity.objects.get(document=self.msa, label="ORG")
+        self.assertEqual((entity.normalized, entity.count), ("acme corp", 3))
+        self.assertEqual(entity.text, "Acme Corp")
+        self.assertEqual(entity.offsets, [[0, 9], [40, 50], [80, 93]])
+
+    def test_lookup_matches_any_spelling(self):
+        data = self.lookup(q="acme corp,")
+        self.assertEqual(data["query"], "acme corp")
+        self.assertEqual([row["document"] for row in data["results"]], [self.msa.pk, self.lease.pk])
+        self.assertEqual(data["results"][0]["count"], 3)
+
+    def test_lookup_label_filter(self):
+        data = self.lookup(q="Acme Corp", label="PERSON")
+        self.assertEqual([row["document"] for row in data["results"]], [self.lease.pk])
+
+    def test_lookup_respects_access(self):
+        self.assertNotIn(self.foreign.pk, [row["document"] for row in self.lookup(q="Acme Corp")["results"]])
+        self.assertEqual(self.client.get("/api/documents/entities/").status_code, 400)
+
+    def test_document_entities(self):
+        response = self.client.get(f"/api/documents/{self.msa.pk}/entities/", {"label": "GPE"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{"label": "GPE", "text": "Delaware", "count": 1, "offsets": [[120, 128]]}])
+
+        self.assertEqual(self.client.get(f"/api/documents/{self.foreign.pk}/entities/").status_code, 403)
+        self.assertEqual(self.client.get("/api/documents/999999/entities/").status_code, 404)
+
+
+class ClauseMatchesTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.text = "Confidentiality binds both parties. " + "Filler sentence. " * 20 + "Either party may terminate"
+        self.document = Document.objects.create(user=self.owner, title="nda.txt", file_type="text", extracted_text=self.text)
+        analyze_documents([self.document], generate_summary_flag=False)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f"/api/documents/{self.document.pk}/clauses/"
+
+    def matches(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["clauses"]
+
+    def test_windows_at_the_edges_of_the_text(self):
+        clauses = self.matches(clause="confidentiality,termination", window=10)
+        self.assertEqual(set(clauses), {"confidentiality", "termination"})
+
+        [first] = clauses["confidentiality"]["matches"]
+        self.assertEqual((first["start"], first["end"], first["window_start"]), (0, 15, 0))
+        self.assertEqual(first["text"], self.text[:25])
+
+        [last] = clauses["termination"]["matches"]
+        self.assertEqual(last["end"], len(self.text))
+        self.assertEqual(last["window_start"], last["start"] - 10)
+        self.assertEqual(last["text"], self.text[last["start"] - 10:])
+
+    def test_matches_follow_stored_spans(self):
+        stored = DocumentClause.objects.get(document=self.document, clause_key="termination").spans
+        clauses = self.matches(clause="termination", window=0)
+        matches = clauses["termination"]["matches"]
+
+        self.assertEqual([[m["start"], m["end"]] for m in matches], stored)
+        self.assertEqual([m["text"] for m in matches], [self.text[start:end] for start, end in stored])
+        self.assertEqual(clauses["termination"]["total"], len(stored))
+
+    def test_absent_clause_has_no_matches(self):
+        clauses = self.matches(clause="warranty")
+        self.assertEqual(clauses, {"warranty": {"present": False, "total": 0, "matches": []}})
+
+    def test_non_owners_are_refused(self):
+        stranger = User.objects.create_user("stranger", "stranger@example.com", "pw-12345")
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+SECTIONED_TEXT = """MASTER SERVICES AGREEMENT
+This agreement is made between the parties.
+
+1. Definitions
+Words used here have these meanings.
+
+1.1 Services
+The services are consulting work.
+
+1.2 Deliverables. Reports are delivered monthly.
+
+2. Payment Terms
+Fees are due within thirty days.
+
+Section 3 - Governing Law
+This agreement is governed by the law of Delaware.
+
+ARTICLE IV - INDEMNITY
+1. The supplier shall deliver the goods to the customer within thirty days of each order.
+"""
+
+
+class SectionDetectionTests(SimpleTestCase):
+    def setUp(self):
+        self.sections = detect_sections(SECTIONED_TEXT)
+
+    def headings(self):
+        return [(section["number"], section["title"], section["level"]) for section in self.sections]
+
+    def test_headings_and_levels(self):
+        self.assertEqual(self.headings(), [
+            ("", "MASTER SERVICES AGREEMENT", 1),
+            ("1", "Definitions", 1),
+            ("1.1", "Services", 2),
+            ("1.2", "Deliverables", 2),
+            ("2", "Payment Terms", 1),
+            ("Section 3", "Governing Law", 1),
+            ("Article IV", "INDEMNITY", 1),
+        ])
+
+    def test_sections_tile_the_text(self):
+        self.assertEqual(self.sections[0]["start"], 0)
+        self.assertEqual(self.sections[-1]["end"], len(SECTIONED_TEXT))
+        for section, following in zip(self.sections, self.sections[1:]):
+            self.assertEqual(section["end"], following["start"])
+        self.assertTrue(SECTIONED_TEXT[self.sections[5]["start"]:].startswith("Section 3"))
+
+    def test_text_without_headings_is_one_section(self):
+        text = "The parties agree to the terms below.\nPayment is due monthly."
+        self.assertEqual(detect_sections(text), [{"number": "", "title": "", "level": 0, "start": 0, "end": len(text)}])
+        self.assertEqual(detect_sections(""), [])
+
+    def test_text_before_the_first_heading_gets_its_own_section(self):
+        sections = detect_sections("Preamble text.\n\n1. Scope\nAll work.")
+        self.assertEqual([(s["number"], s["level"]) for s in sections], [("", 0), ("1", 1)])
+
+    def test_subsections_extend_the_range(self):
+        sections = [DocumentSection(position=position, **section) for position, section in enumerate(self.sections)]
+        definitions = sections[1]
+        self.assertEqual(section_range(sections, 1), (definitions.start, definitions.end))
+        self.assertEqual(section_range(sections, 1, subsections=True), (definitions.start, sections[3].end))
+        self.assertEqual(section_range(sections, 2, subsections=True), (sections[2].start, sections[2].end))
+        self.assertIsNone(section_range(sections, 99))
+
+    def test_rebase_result(self):
+        result = {
+            "clause_spans": {"jurisdiction": [[5, 11]]},
+            "clause_offsets": {"jurisdiction": 5, "warranty": None},
+            "entities": [{"text": "Delaware", "label": "GPE", "start_char": 20, "end_char": 28}],
+        }
+        rebased = rebase_result(result, 100)
+        self.assertEqual(rebased["clause_spans"], {"jurisdiction": [[105, 111]]})
+        self.assertEqual(rebased["clause_offsets"], {"jurisdiction": 105, "warranty": None})
+        self.assertEqual((rebased["entities"][0]["start_char"], rebased["entities"][0]["end_char"]), (120, 128))
+
+
+class SectionViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        # Created directly, like documents uploaded before sections were indexed
+        self.document = Document.objects.create(
+            user=self.owner, title="msa.txt", file_type="text", extracted_text=SECTIONED_TEXT,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f"/api/documents/{self.document.pk}/sections/"
+
+    def test_sections_are_indexed_on_first_read(self):
+        self.assertFalse(DocumentSection.objects.filter(document=self.document).exists())
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["sections"]), 7)
+        self.assertEqual(DocumentSection.objects.filter(document=self.document).count(), 7)
+
+    def test_section_text(self):
+        section = detect_sections(SECTIONED_TEXT)[1]
+        response = self.client.get(f"{self.url}1/")
+        self.assertEqual(response.data["text"], SECTIONED_TEXT[section["start"]:section["end"]])
+
+        nested = self.client.get(f"{self.url}1/", {"subsections": "1"}).data
+        self.assertTrue(nested["text"].startswith("1. Definitions"))
+        self.assertTrue(nested["text"].rstrip().endswith("Reports are delivered monthly."))
+        self.assertEqual(self.client.get(f"{self.url}99/").status_code, 404)
+
+    def test_section_analysis_offsets_point_into_the_document(self):
+        response = self.client.post(f"{self.url}5/analyze/")
+        self.assertEqual(response.status_code, 200)
+
+        spans = response.data["clause_spans"]["jurisdiction"]
+        self.assertTrue(spans)
+        self.assertGreaterEqual(spans[0][0], response.data["start"])
+        self.assertEqual([SECTIONED_TEXT[start:end].lower() for start, end in spans], ["governing law", "law of"])
+        self.assertEqual(response.data["clause_offsets"]["jurisdiction"], spans[0][0])
+
+    def test_sections_listed_with_their_clauses(self):
+        analyze_documents([self.document], generate_summary_flag=False)
+        sections = self.client.get(self.url).data["sections"]
+        self.assertIn("jurisdiction", sections[5]["clauses"])
+        self.assertIn("payment_terms", sections[4]["clauses"])
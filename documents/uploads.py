@@ -0,0 +1,301 @@
+# documents/uploads.py
+"""
+Resumable chunked uploads.
+
+init creates an UploadSession. Chunk N must start at offset N * chunk_size
+and is appended to a staging file while it is hashed. Re-sending a chunk that
+has already been stored is acknowledged without writing it again, and a
+client that lost track can GET the session to learn the next chunk. finalize
+hands the staging file to the content-addressed store (documents/blobs.py),
+which renames it into place.
+
+The running hash only lives in the worker that received the previous chunk.
+When the next chunk or finalize lands on another worker, that worker has to
+re-read the staging file (up to MAX_SIZE bytes) to rebuild it; finalize does
+this before locking the session row. Route requests for one upload id to
+the same worker (e.g. hash on the id in the load balancer) to avoid it.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .blobs import adopt_file, known_extracted_text
+from .models import Document, UploadSession
+
+DEFAULTS = {
+    "CHUNK_SIZE": 8 * 1024 * 1024,
+    "MAX_SIZE": 500 * 1024 * 1024,
+    "EXPIRY_HOURS": 24,
+}
+
+READ_BLOCK = 64 * 1024
+
+# session id -> (received_bytes, sha256 object, expires_at). hashlib state
+# can't be stored in the database, so the worker that received the previous
+# chunk keeps it; another worker rebuilds it from the staging file. Entries
+# of expired sessions are dropped whenever another one is stored.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+def get_upload_settings():
+    return {**DEFAULTS, **getattr(settings, "CHUNKED_UPLOADS", {})}
+
+
+def staging_dir():
+    return os.path.join(settings.MEDIA_ROOT, "uploads")
+
+
+def staging_path(session):
+    return os.path.join(staging_dir(), f"{session.id}.part")
+
+
+def _backup_path(session):
+    return os.path.join(staging_dir(), f"{session.id}.adopting")
+
+
+def create_session(user, filename, total_size, file_type, title=None):
+    config = get_upload_settings()
+    if total_size <= 0:
+        raise UploadError("File size must be positive")
+    if total_size > config["MAX_SIZE"]:
+        raise UploadError("File too large", status=413, max_size=config["MAX_SIZE"])
+
+    session = UploadSession.objects.create(
+        user=user,
+        filename=os.path.basename(filename),
+        title=title or filename,
+        file_type=file_type,
+        total_size=total_size,
+        chunk_size=config["CHUNK_SIZE"],
+        expires_at=timezone.now() + timedelta(hours=config["EXPIRY_HOURS"]),
+    )
+    os.makedirs(staging_dir(), exist_ok=True)
+    open(staging_path(session), "wb").close()
+    return session
+
+
+def session_state(session):
+    return {
+        "upload_id": str(session.id),
+        "status": session.status,
+        "chunk_size": session.chunk_size,
+        "chunk_count": session.chunk_count,
+        "total_size": session.total_size,
+        "received_bytes": session.received_bytes,
+        "next_chunk": session.next_chunk,
+        "sha256": session.sha256 or None,
+        "document_id": session.document_id,
+        "expires_at": session.expires_at,
+    }
+
+
+def _rehash(path, length):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _hasher_at(session, path):
+    with _hashers_lock:
+        cached = _hashers.get(session.id)
+    if cached and cached[0] == session.received_bytes:
+        return cached[1].copy()
+    return _rehash(path, session.received_bytes)
+
+
+def _remember_hasher(session, hasher):
+    now = timezone.now()
+    with _hashers_lock:
+        # Abandoned sessions are never finalized or discarded by this worker
+        for session_id in [sid for sid, entry in _hashers.items() if entry[2] <= now]:
+            del _hashers[session_id]
+        _hashers[session.id] = (session.received_bytes, hasher, session.expires_at)
+
+
+def _active_session(session_id, user, lock=False):
+    sessions = UploadSession.objects.select_for_update() if lock else UploadSession.objects
+    session = sessions.filter(id=session_id, user=user).first()
+    if session is None:
+        raise UploadError("Upload not found", status=404)
+    if session.status != "active":
+        raise UploadError("Upload already finalized", status=409)
+    if session.expires_at <= timezone.now():
+        raise UploadError("Upload expired", status=410)
+    return session
+
+
+def write_chunk(session_id, user, index, stream):
+    """
+    Append chunk `index` read from `stream` to the session's staging file.
+    Returns the updated session. The body is read into a file of its own
+    first; the session row is only locked to append it and record the new
+    offset, so concurrent retries of the same chunk cannot interleave and a
+    slow client doesn't hold the lock.
+    """
+    session = _active_session(session_id, user)
+    if index < 0 or index >= session.chunk_count:
+        raise UploadError("Chunk index out of range")
+
+    offset = index * session.chunk_size
+    if offset < session.received_bytes:
+        # Retry of a chunk that already arrived
+        return session
+    if offset > session.received_bytes:
+        raise UploadError("Chunk out of order", status=409, next_chunk=session.next_chunk)
+
+    expected = min(session.chunk_size, session.total_size - offset)
+    path = staging_path(session)
+    # Bytes below received_bytes never change, so this is safe without the lock
+    hasher = _hasher_at(session, path)
+    chunk_path = f"{path}.{uuid.uuid4().hex}.chunk"
+
+    try:
+        written = 0
+        with open(chunk_path, "wb") as f:
+            while written < expected:
+                block = stream.read(min(READ_BLOCK, expected - written))
+                if not block:
+                    break
+                f.write(block)
+                hasher.update(block)
+                written += len(block)
+        if written != expected or stream.read(1):
+            raise UploadError(f"Chunk {index} must be exactly {expected} bytes")
+
+        with transaction.atomic():
+            session = _active_session(session_id, user, lock=True)
+            if session.received_bytes > offset:
+                # A concurrent retry stored it first
+                return session
+            if session.received_bytes < offset:
+                raise UploadError("Chunk out of order", status=409, next_chunk=session.next_chunk)
+
+            with open(path, "r+b") as f, open(chunk_path, "rb") as chunk:
+                # Drop whatever a previously interrupted append left behind
+                f.truncate(offset)
+                f.seek(offset)
+                shutil.copyfileobj(chunk, f, READ_BLOCK)
+
+            session.received_bytes += written
+            session.save(update_fields=["received_bytes"])
+    finally:
+        if os.path.exists(chunk_path):
+            os.remove(chunk_path)
+
+    _remember_hasher(session, hasher)
+    return session
+
+
+def finalize_session(session_id, user):
+    """
+    Move the completed staging file into blob storage and create the
+    Document. Returns (session, document, created); finalizing twice returns
+    the same document with created=False.
+    """
+    session = UploadSession.objects.filter(id=session_id, user=user).first()
+    sha256 = None
+    if session is not None and session.status == "active" and session.received_bytes == session.total_size:
+        # A complete staging file no longer changes, so hash it (re-reading
+        # it if another worker took the chunks) before locking the row
+        try:
+            sha256 = _hasher_at(session, staging_path(session)).hexdigest()
+        except OSError:
+            # A concurrent finalize is moving it; hash under the lock below
+            pass
+
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().filter(id=session_id, user=user).first()
+        if session is None:
+            raise UploadError("Upload not found", status=404)
+        if session.status == "complete":
+            return session, session.document, False
+        if session.received_bytes != session.total_size:
+            raise UploadError("Upload incomplete", status=409, next_chunk=session.next_chunk)
+
+        path = staging_path(session)
+        session.sha256 = sha256 or _hasher_at(session, path).hexdigest()
+
+        # adopt_file moves or deletes the staging file before the Document
+        # exists; keep a link to the bytes so a failure can be retried
+        backup = _backup_path(session)
+        _link(path, backup)
+        blob, created_blob = None, False
+        try:
+            blob, created_blob = adopt_file(path, session.sha256, os.path.splitext(session.filename)[1])
+
+            document = Document.objects.create(
+                user=session.user,
+                title=session.title,
+                file=blob.file.name,
+                file_type=session.file_type,
+                sha256=session.sha256,
+                blob=blob,
+                extracted_text=known_extracted_text(session.sha256),
+                status='pending',
+            )
+            session.status = "complete"
+            session.document = document
+            session.save(update_fields=["sha256", "status", "document"])
+        except Exception:
+            # Everything rolls back, so a blob file placed here would belong to no row
+            if created_blob and os.path.exists(blob.file.path):
+                os.remove(blob.file.path)
+            os.replace(backup, path)
+            raise
+
+    os.remove(backup)
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    return session, document, True
+
+
+def _link(path, link):
+    if os.path.exists(link):
+        # Left by a finalize that died midway; it holds the same bytes
+        os.replace(link, path)
+    try:
+        os.link(path, link)
+    except OSError:
+        # No hard links on this filesystem
+        shutil.copyfile(path, link)
+
+
+def discard_session(session):
+    for path in (staging_path(session), _backup_path(session)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    with _hashers_lock:
+        _hashers.pop(session.id, None)
+    session.delete()
+
+
+def purge_expired_sessions():
+    """Delete unfinished sessions past their expiry along with their staging files."""
+    expired = list(UploadSession.objects.filter(status="active", expires_at__lte=timezone.now()))
+    for session in expired:
+        discard_session(session)
+    return len(expired)
@@ -1,17 +1,34 @@
 from django.urls import path
-from .views import DocumentListView, DocumentUploadView, DocumentDetailView, DocumentAnalysisView, DocumentReportView, DocumentDeleteView, IndividualDashboardView, AdminDashboardView, LawyerDashboardView, LawyerDashboardAnalyticsView, AdminDashboardAnalyticsView, DocumentDownloadView, DocumentCommentsView, DocumentCommentDeleteView, DocumentVersionListView, DocumentVersionDetailView, ShareDocumentView, AcceptSharedDocumentView, DeclineSharedDocumentView, LawyerSharedDocumentsList, ClientSharedDocumentsList
+from .views import DocumentListView, DocumentSearchView, ClauseFilterView, ClauseSummaryView, DocumentClauseMatchesView, DocumentEntitiesView, DocumentSectionsView, DocumentSectionDetailView, DocumentSectionAnalysisView, EntityLookupView, DocumentUploadView, BulkUploadView, ChunkedUploadInitView, ChunkedUploadDetailView, ChunkedUploadChunkView, ChunkedUploadFinalizeView, DocumentDetailView, DocumentAnalysisView, BatchDocumentAnalysisView, DocumentReportView, DocumentDeleteView, IndividualDashboardView, AdminDashboardView, LawyerDashboardView, LawyerDashboardAnalyticsView, AdminDashboardAnalyticsView, DocumentDownloadView, DocumentFileView, DocumentCommentsView, DocumentCommentDeleteView, DocumentVersionListView, DocumentVersionDetailView, DocumentVersionDiffView, ShareDocumentView, AcceptSharedDocumentView, DeclineSharedDocumentView, LawyerSharedDocumentsList, ClientSharedDocumentsList
 
 urlpatterns = [
     path('', DocumentListView.as_view(), name='document-list'),
+    path('search/', DocumentSearchView.as_view(), name='document-search'),
+    path('clauses/', ClauseFilterView.as_view(), name='document-clause-filter'),
+    path('clauses/summary/', ClauseSummaryView.as_view(), name='document-clause-summary'),
+    path('<int:pk>/clauses/', DocumentClauseMatchesView.as_view(), name='document-clause-matches'),
+    path('<int:pk>/sections/', DocumentSectionsView.as_view(), name='document-sections'),
+    path('<int:pk>/sections/<int:position>/', DocumentSectionDetailView.as_view(), name='document-section-detail'),
+    path('<int:pk>/sections/<int:position>/analyze/', DocumentSectionAnalysisView.as_view(), name='document-section-analyze'),
+    path('entities/', EntityLookupView.as_view(), name='entity-lookup'),
+    path('<int:pk>/entities/', DocumentEntitiesView.as_view(), name='document-entities'),
     path('upload/', DocumentUploadView.as_view(), name='document-upload'),
+    path('bulk-upload/', BulkUploadView.as_view(), name='document-bulk-upload'),
+    path('uploads/', ChunkedUploadInitView.as_view(), name='chunked-upload-init'),
+    path('uploads/<uuid:upload_id>/', ChunkedUploadDetailView.as_view(), name='chunked-upload-detail'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', ChunkedUploadChunkView.as_view(), name='chunked-upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', ChunkedUploadFinalizeView.as_view(), name='chunked-upload-finalize'),
     path('<int:pk>/',  DocumentDetailView.as_view(), name='document-detail'),
     path('<int:pk>/analyze/', DocumentAnalysisView.as_view(), name='document-analyze'),
+    path('analyze/batch/', BatchDocumentAnalysisView.as_view(), name='document-analyze-batch'),
     path('<int:pk>/report/', DocumentReportView.as_view(), name='document-report'),
     path("<int:pk>/download/", DocumentDownloadView.as_view(), name="document-download"),
+    path("<int:pk>/file/", DocumentFileView.as_view(), name="document-file"),
     path('<int:pk>/delete/', DocumentDeleteView.as_view(), name='document-delete'),
      path('<int:pk>/comments/', DocumentCommentsView.as_view(), name='document-comments'),
     path('comments/<int:comment_id>/', DocumentCommentDeleteView.as_view(), name='document-comment-delete'),
     path('<int:pk>/versions/', DocumentVersionListView.as_view(), name='document-versions-list'),
+    path('<int:pk>/versions/diff/', DocumentVersionDiffView.as_view(), name='document-version-diff'),
     path('versions/<int:version_id>/', DocumentVersionDetailView.as_view(), name='document-version-detail'),
     path("share/", ShareDocumentView.as_view(), name="share-document"),
     path("share/<int:share_id>/accept/", AcceptSharedDocumentView.as_view(), name="accept-shared-document"),
@@ -17,6 +17,24 @@ def extract_text_from_word(file_path):
 def extract_text_from_txt(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read().strip()
+
+def file_type_for(filename):
+    """Map an uploaded file name to a Document.file_type, or None if unsupported."""
+    name = filename.lower()
+    if name.endswith('.pdf'):
+        return 'pdf'
+    if name.endswith('.docx'):
+        return 'word'
+    if name.endswith('.txt'):
+        return 'text'
+    return None
+
+def extract_text(file_path, file_type):
+    if file_type == 'pdf':
+        return extract_text_from_pdf(file_path)
+    if file_type == 'word':
+        return extract_text_from_word(file_path)
+    return extract_text_from_txt(file_path)
     
 
 # Summaryp for phase 4:
@@ -0,0 +1,201 @@
+# documents/versioning.py
+"""
+Storage for DocumentVersion text.
+
+Each distinct text is stored once (keyed by SHA-256), so re-analyzing an
+unchanged document adds no content at all. A changed text is stored as a
+zlib-compressed line delta against the document's previous version when
+that is markedly smaller than the compressed full text; chains are capped
+at MAX_CHAIN deltas, after which a full copy starts a new chain. Read-back
+is cached per hash, and the text just written is cached too, so the latest
+version is normally served without touching the chain.
+
+Contents are shared between versions, so deleting a version leaves its
+content behind; collect_contents() deletes the ones nothing uses any more.
+"""
+import hashlib
+import json
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import DocumentVersion, VersionContent
+
+DEFAULTS = {
+    "MAX_CHAIN": 10,
+    "DELTA_MAX_RATIO": 0.5,     # store a delta only if it is at most this fraction of the full copy
+    "DELTA_MAX_LINES": 5000,    # changed region (in lines) beyond which no delta is computed
+    "CACHE_TTL": 3600,
+}
+
+
+class CorruptVersionContent(Exception):
+    pass
+
+
+def get_version_settings():
+    return {**DEFAULTS, **getattr(settings, "VERSION_STORAGE", {})}
+
+
+def _cache_key(sha256):
+    return f"documents:version_text:{sha256}"
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# ============================================================
+#   DELTAS
+# ============================================================
+def encode_delta(base, text, max_lines=None):
+    """
+    Line delta turning `base` into `text`: a list of [start, end] (copy those
+    base lines) and strings (insert verbatim). Returns None if the changed
+    region of either text is longer than `max_lines`, since matching it
+    costs quadratic time.
+    """
+    a = base.splitlines(keepends=True)
+    b = text.splitlines(keepends=True)
+
+    # Trim the common head and tail first; SequenceMatcher only sees the middle
+    head = 0
+    while head < len(a) and head < len(b) and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < len(a) - head and tail < len(b) - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+
+    if max_lines is not None and max(len(a), len(b)) - head - tail > max_lines:
+        return None
+
+    ops = [[0, head]] if head else []
+    matcher = SequenceMatcher(None, a[head:len(a) - tail], b[head:len(b) - tail], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([head + i1, head + i2])
+        elif j2 > j1:
+            ops.append("".join(b[head + j1:head + j2]))
+    if tail:
+        ops.append([len(a) - tail, len(a)])
+    return ops
+
+
+def apply_delta(base, ops):
+    lines = base.splitlines(keepends=True)
+    return "".join(op if isinstance(op, str) else "".join(lines[op[0]:op[1]]) for op in ops)
+
+
+# ============================================================
+#   STORE / LOAD
+# ============================================================
+def store_content(text, base=None):
+    """
+    Return the VersionContent holding `text`, creating it if needed. `base`
+    is the previous version's content, used as the delta base.
+
+    Call it inside the transaction that saves the version: an existing
+    content is locked until then so collect_contents() can't delete it.
+    """
+    config = get_version_settings()
+    text = text or ""
+    sha256 = text_sha256(text)
+
+    with transaction.atomic():
+        existing = VersionContent.objects.select_for_update().filter(sha256=sha256).first()
+    if existing is not None:
+        return existing
+
+    full = zlib.compress(text.encode("utf-8"))
+    fields = {"kind": "full", "base": None, "chain_length": 0, "data": full}
+
+    if base is not None and base.chain_length < config["MAX_CHAIN"]:
+        ops = encode_delta(load_content(base), text, max_lines=config["DELTA_MAX_LINES"])
+        delta = None if ops is None else zlib.compress(json.dumps(ops).encode("utf-8"))
+        if delta is not None and len(delta) <= len(full) * config["DELTA_MAX_RATIO"]:
+            fields = {"kind": "delta", "base": base, "chain_length": base.chain_length + 1, "data": delta}
+
+    try:
+        with transaction.atomic():
+            content = VersionContent.objects.create(sha256=sha256, size=len(text), **fields)
+    except IntegrityError:
+        # Stored concurrently by another request
+        content = VersionContent.objects.get(sha256=sha256)
+
+    cache.set(_cache_key(sha256), text, config["CACHE_TTL"])
+    return content
+
+
+def load_content(content):
+    """Reconstruct the text of a VersionContent, following at most MAX_CHAIN deltas."""
+    text = cache.get(_cache_key(content.sha256))
+    if text is not None:
+        return text
+
+    # Walk back to the nearest full copy, or to a base whose text is cached
+    chain = [content]
+    text = None
+    node = content
+    while node.kind == "delta":
+        node = VersionContent.objects.get(pk=node.base_id)
+        text = cache.get(_cache_key(node.sha256))
+        if text is not None:
+            break
+        chain.append(node)
+    else:
+        text = zlib.decompress(node.data).decode("utf-8")
+        chain.pop()
+
+    for node in reversed(chain):
+        text = apply_delta(text, json.loads(zlib.decompress(node.data)))
+
+    if text_sha256(text) != content.sha256:
+        raise CorruptVersionContent(f"Version content {content.pk} does not match its hash")
+
+    cache.set(_cache_key(content.sha256), text, get_version_settings()["CACHE_TTL"])
+    return text
+
+
+def latest_contents(documents):
+    """{document id: VersionContent of its latest version} for documents whose latest version has one."""
+    latest = {}
+    rows = (
+        DocumentVersion.objects.filter(document__in=documents)
+        .order_by("document_id", "-version_number")
+        .values_list("document_id", "content_ref_id")
+    )
+    for document_id, content_id in rows:
+        latest.setdefault(document_id, content_id)
+
+    contents = VersionContent.objects.in_bulk([pk for pk in latest.values() if pk])
+    return {document_id: contents[pk] for document_id, pk in latest.items() if pk}
+
+
+def _unused(contents):
+    return contents.filter(
+        ~Exists(DocumentVersion.objects.filter(content_ref=OuterRef("pk"))),
+        ~Exists(VersionContent.objects.filter(base=OuterRef("pk"))),
+    )
+
+
+def collect_contents(batch_size=500):
+    """
+    Delete contents no version refers to and no delta is based on. A delta
+    goes first and its base follows on a later pass. Returns how many were deleted.
+    """
+    deleted = 0
+    while True:
+        ids = list(_unused(VersionContent.objects.all()).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            # Lock, then recheck: store_content may have handed one out meanwhile
+            list(VersionContent.objects.select_for_update().filter(pk__in=ids).values_list("pk", flat=True))
+            count, _ = _unused(VersionContent.objects.filter(pk__in=ids)).delete()
+        if not count:
+            return deleted
+        deleted += count
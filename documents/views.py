@@ -6,7 +6,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied, NotFound
 from users.models import ClientAssignment, User
 from users.permissions import IsLawyer, IsClient, IsAdmin
-from .models import Document, DocumentComment, DocumentVersion, SharedDocument
+from .models import Document, DocumentClause, DocumentEntity, DocumentComment, DocumentVersion, SharedDocument, UploadSession
 from .serializers import (
     DocumentSerializer,
     CommentSerializer,
@@ -15,19 +15,37 @@ from .serializers import (
     DocumentVersionDetailSerializer,
     SharedDocumentSerializer,
 )
-from .utils import extract_text_from_pdf, extract_text_from_word, extract_text_from_txt
+from .utils import file_type_for, extract_text
 from .analysis import analyze_document_text
 from .summarizer import generate_summary
-from .permissions import IsDocumentParticipant
+from .reports import open_report, delete_cached_reports
+from .downloads import serve_file
+from .streaming import streaming
+from .blobs import store_upload, release_blob, known_extracted_text
+from .batch_analysis import analyze_documents, get_batch_settings, pipeline_options
+from .bulk import BulkUploadError, extract_pending, ingest
+from .uploads import UploadError, create_session, discard_session, finalize_session, session_state, write_chunk
+from .permissions import IsDocumentParticipant, accessible_documents
+from .search import search_documents
+from .indexing import index_analysis, normalize_entity, report_entities
+from .versioning import store_content
+from .diffing import diff_versions
+from .sections import clauses_by_section, document_sections, index_sections, read_range, rebase_result, section_range
 from notifications.utils import create_notification, log_activity
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Q, Max
+from django.db.models.functions import Substr
 from django.contrib.auth import get_user_model
 from notifications.models import ActivityLog
 from ml_models.nlp_pipeline import process_document
-from django.http import HttpResponse
+from ml_models.clause_patterns import PATTERNS as CLAUSE_PATTERNS
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from payments.models import Subscription as PaymentSubscription
+from payments.quota import reserve_analysis, release_analysis
+import io
+import json
 import os
 
 
@@ -93,37 +111,519 @@ class DocumentUploadView(APIView):
             return Response({"error": "No file uploaded"}, status=400)
 
         # File type detection
-        if file.name.endswith('.pdf'):
-            file_type = 'pdf'
-        elif file.name.endswith('.docx'):
-            file_type = 'word'
-        elif file.name.endswith('.txt'):
-            file_type = 'text'
-        else:
+        file_type = file_type_for(file.name)
+        if not file_type:
             return Response({"error": "Unsupported file type"}, status=400)
 
+        # Identical files are stored once and share their extracted text
+        blob = store_upload(file)
         document = Document.objects.create(
             user=request.user,
             title=title or file.name,
-            file=file,
+            file=blob.file.name,
             file_type=file_type,
+            sha256=blob.sha256,
+            blob=blob,
+            extracted_text=known_extracted_text(blob.sha256),
             status='pending'
         )
 
         # Extract text
-        file_path = document.file.path
-        if file_type == 'pdf':
-            extracted_text = extract_text_from_pdf(file_path)
-        elif file_type == 'word':
-            extracted_text = extract_text_from_word(file_path)
-        else:
-            extracted_text = extract_text_from_txt(file_path)
-
-        document.extracted_text = extracted_text or ""
-        document.save()
+        if document.extracted_text is None:
+            document.extracted_text = extract_text(document.file.path, file_type) or ""
+            document.save(update_fields=["extracted_text"])
+        index_sections([document])
 
         create_notification(request.user, f"Document '{document.title}' uploaded successfully.")
-        log_activity(request.user, "Uploaded document", {"document_id": document.id})
+        log_activity(request.user, "Uploaded document", {"document_id": document.id}, activity_type="upload")
+
+        return Response(DocumentSerializer(document).data, status=201)
+
+
+# ============================================================
+#   FULL-TEXT SEARCH
+# ============================================================
+class DocumentSearchView(APIView):
+    """GET ?q=... with web-search syntax ("exact phrase", OR, -exclude); optional limit, offset."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = (request.query_params.get("q") or "").strip()
+        if not query:
+            return Response({"error": "q is required"}, status=400)
+
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=400)
+
+        hits = search_documents(accessible_documents(request.user), query, limit=limit, offset=offset)
+
+        documents = Document.objects.only(
+            "id", "title", "file_type", "uploaded_at", "status", "risk_score"
+        ).in_bulk([hit["id"] for hit in hits])
+
+        results = []
+        for hit in hits:
+            doc = documents.get(hit["id"])
+            if doc is None:
+                continue
+            results.append({
+                "id": doc.id,
+                "title": doc.title,
+                "file_type": doc.file_type,
+                "uploaded_at": doc.uploaded_at,
+                "status": doc.status,
+                "risk_score": doc.risk_score,
+                "rank": hit["rank"],
+                "highlight": hit["highlight"],
+            })
+
+        return Response({"query": query, "limit": limit, "offset": offset, "results": results})
+
+
+# ============================================================
+#   CLAUSE FILTERS
+# ============================================================
+def _clause_keys(value):
+    return [key.strip() for key in (value or "").split(",") if key.strip()]
+
+
+class ClauseFilterView(APIView):
+    """
+    Analyzed documents the caller can access, filtered by clause presence:
+    ?present=confidentiality,termination&missing=liability[&owner=<user id>]
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        present = _clause_keys(request.query_params.get("present"))
+        missing = _clause_keys(request.query_params.get("missing"))
+        if not present and not missing:
+            return Response({"error": "Give present and/or missing clause keys"}, status=400)
+
+        unknown = sorted(set(present + missing) - set(CLAUSE_PATTERNS))
+        if unknown:
+            return Response({"error": "Unknown clause keys", "unknown": unknown, "known": list(CLAUSE_PATTERNS)}, status=400)
+
+        try:
+            limit = min(max(int(request.query_params.get("limit", 50)), 1), 500)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=400)
+
+        documents = accessible_documents(request.user).filter(status="analyzed")
+        owner = request.query_params.get("owner")
+        if owner:
+            if not owner.isdigit():
+                return Response({"error": "owner must be a user id"}, status=400)
+            documents = documents.filter(user_id=owner)
+
+        for key in present:
+            documents = documents.filter(pk__in=DocumentClause.objects.filter(clause_key=key, present=True).values("document"))
+        for key in missing:
+            documents = documents.filter(pk__in=DocumentClause.objects.filter(clause_key=key, present=False).values("document"))
+
+        rows = documents.order_by("-analyzed_at", "-id").values(
+            "id", "title", "user", "risk_score", "analyzed_at"
+        )[offset:offset + limit]
+
+        return Response({"limit": limit, "offset": offset, "results": list(rows)})
+
+
+class ClauseSummaryView(APIView):
+    """Per clause, how many of the caller's accessible analyzed documents have it. Optional ?owner=<user id>."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        documents = accessible_documents(request.user).filter(status="analyzed")
+        owner = request.query_params.get("owner")
+        if owner:
+            if not owner.isdigit():
+                return Response({"error": "owner must be a user id"}, status=400)
+            documents = documents.filter(user_id=owner)
+
+        counts = (
+            DocumentClause.objects.filter(document__in=documents)
+            .values("clause_key")
+            .annotate(with_clause=Count("id", filter=Q(present=True)), without_clause=Count("id", filter=Q(present=False)))
+            .order_by("clause_key")
+        )
+        return Response({
+            row["clause_key"]: {"present": row["with_clause"], "missing": row["without_clause"]}
+            for row in counts
+        })
+
+
+class DocumentClauseMatchesView(APIView):
+    """
+    Where each clause matched in the document, with a window of text around
+    every match: ?clause=liability,termination&window=150&limit=20.
+    Only the windows are read from the database, not the whole text.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_WINDOW = 1000
+    MAX_MATCHES = 100
+
+    def get(self, request, pk):
+        try:
+            document = Document.objects.only("id", "user").get(pk=pk)
+        except Document.DoesNotExist:
+            return Response({"error": "Document not found"}, status=404)
+
+        if not user_has_access_to_document(request, document):
+            return Response({"error": "Not allowed"}, status=403)
+
+        try:
+            window = min(max(int(request.query_params.get("window", 150)), 0), self.MAX_WINDOW)
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), self.MAX_MATCHES)
+        except ValueError:
+            return Response({"error": "window and limit must be integers"}, status=400)
+
+        rows = DocumentClause.objects.filter(document=document).order_by("clause_key")
+        keys = _clause_keys(request.query_params.get("clause"))
+        if keys:
+            rows = rows.filter(clause_key__in=keys)
+
+        # (clause_key, start, end, window_start, window_end) for each match returned
+        wanted = []
+        clauses = {}
+        for row in rows:
+            clauses[row.clause_key] = {"present": row.present, "total": len(row.spans), "matches": []}
+            for start, end in row.spans[:limit]:
+                if len(wanted) < self.MAX_MATCHES:
+                    wanted.append((row.clause_key, start, end, max(start - window, 0), end + window))
+
+        # Substr is 1-based
+        windows = {}
+        if wanted:
+            windows = Document.objects.filter(pk=document.pk).values(**{
+                f"w{i}": Substr("extracted_text", window_start + 1, window_end - window_start)
+                for i, (_, _, _, window_start, window_end) in enumerate(wanted)
+            }).first() or {}
+
+        for i, (key, start, end, window_start, _) in enumerate(wanted):
+            clauses[key]["matches"].append({
+                "start": start,
+                "end": end,
+                "window_start": window_start,
+                "text": windows.get(f"w{i}") or "",
+            })
+
+        return Response({"document": document.id, "clauses": clauses})
+
+
+# ============================================================
+#   SECTIONS
+# ============================================================
+def _section_payload(section, start, end):
+    return {
+        "position": section.position,
+        "number": section.number,
+        "title": section.title,
+        "level": section.level,
+        "start": start,
+        "end": end,
+    }
+
+
+class DocumentSectionsView(APIView):
+    """The document's section table (no text), with the clauses matched in each section."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            document = Document.objects.only("id", "user").get(pk=pk)
+        except Document.DoesNotExist:
+            return Response({"error": "Document not found"}, status=404)
+
+        if not user_has_access_to_document(request, document):
+            return Response({"error": "Not allowed"}, status=403)
+
+        sections = document_sections(document)
+        clauses = clauses_by_section(document, sections)
+        return Response({
+            "document": document.id,
+            "sections": [
+                {**_section_payload(section, section.start, section.end), "clauses": clauses.get(section.position, [])}
+                for section in sections
+            ],
+        })
+
+
+def _load_section(request, pk, position):
+    """(document, section, start, end) or an error Response; ?subsections=1 extends the range over nested sections."""
+    try:
+        document = Document.objects.only("id", "user").get(pk=pk)
+    except Document.DoesNotExist:
+        return Response({"error": "Document not found"}, status=404)
+
+    if not user_has_access_to_document(request, document):
+        return Response({"error": "Not allowed"}, status=403)
+
+    sections = document_sections(document)
+    bounds = section_range(sections, position, subsections=request.query_params.get("subsections") in ("1", "true"))
+    if bounds is None:
+        return Response({"error": "Section not found"}, status=404)
+
+    section = next(section for section in sections if section.position == position)
+    return document, section, *bounds
+
+
+class DocumentSectionDetailView(APIView):
+    """One section with its text, read on its own. ?subsections=1 includes the sections nested under it."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk, position):
+        loaded = _load_section(request, pk, position)
+        if isinstance(loaded, Response):
+            return loaded
+        document, section, start, end = loaded
+
+        return Response({
+            "document": document.id,
+            **_section_payload(section, start, end),
+            "text": read_range(document, start, end),
+        })
+
+
+class DocumentSectionAnalysisView(APIView):
+    """
+    Clause and entity analysis of one section's text, with offsets into the
+    whole document. Not saved, and no summary, so it does not use the
+    analysis quota.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk, position):
+        loaded = _load_section(request, pk, position)
+        if isinstance(loaded, Response):
+            return loaded
+        document, section, start, end = loaded
+
+        result = process_document(read_range(document, start, end), generate_summary_flag=False, **pipeline_options())
+        result.pop("summary", None)
+        return Response({
+            "document": document.id,
+            **_section_payload(section, start, end),
+            **rebase_result(result, start),
+        })
+
+
+# ============================================================
+#   ENTITIES
+# ============================================================
+class DocumentEntitiesView(APIView):
+    """Entities stored with the document's latest analysis. Optional ?label=ORG."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            document = Document.objects.only("id", "user").get(pk=pk)
+        except Document.DoesNotExist:
+            return Response({"error": "Document not found"}, status=404)
+
+        if not user_has_access_to_document(request, document):
+            return Response({"error": "Not allowed"}, status=403)
+
+        entities = DocumentEntity.objects.filter(document=document).order_by("-count", "label", "normalized")
+        label = request.query_params.get("label")
+        if label:
+            entities = entities.filter(label=label)
+
+        return Response(list(entities.values("label", "text", "count", "offsets")))
+
+
+class EntityLookupView(APIView):
+    """
+    Accessible documents that mention an entity: ?q=Acme Corp[&label=ORG].
+    Matches on the normalized form, so case and surrounding punctuation don't matter.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        normalized = normalize_entity(request.query_params.get("q"))
+        if not normalized:
+            return Response({"error": "q is required"}, status=400)
+
+        try:
+            limit = min(max(int(request.query_params.get("limit", 50)), 1), 500)
+            offset = max(int(request.query_params.get("offset", 0)), 0)
+        except ValueError:
+            return Response({"error": "limit and offset must be integers"}, status=400)
+
+        mentions = DocumentEntity.objects.filter(
+            normalized=normalized,
+            document__in=accessible_documents(request.user),
+        )
+        label = request.query_params.get("label")
+        if label:
+            mentions = mentions.filter(label=label)
+
+        rows = mentions.order_by("-count", "document_id").values(
+            "document_id", "document__title", "document__user", "label", "text", "count"
+        )[offset:offset + limit]
+
+        return Response({
+            "query": normalized,
+            "limit": limit,
+            "offset": offset,
+            "results": [
+                {
+                    "document": row["document_id"],
+                    "title": row["document__title"],
+                    "owner": row["document__user"],
+                    "label": row["label"],
+                    "text": row["text"],
+                    "count": row["count"],
+                }
+                for row in rows
+            ],
+        })
+
+
+# ============================================================
+#   BULK UPLOAD
+# ============================================================
+class BulkUploadView(APIView):
+    """
+    Upload a ZIP (`archive`) or several files (`files`) at once. The response
+    is newline-delimited JSON: an "accepted" event once every file is stored,
+    one "file" event per document as its text is extracted, then "complete".
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        archive = request.FILES.get('archive')
+        files = request.FILES.getlist('files')
+
+        if not archive and not files:
+            return Response({"error": "No files uploaded"}, status=400)
+
+        try:
+            documents, skipped = ingest(request.user, archive=archive, files=files)
+        except BulkUploadError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if not documents:
+            return Response({"error": "No supported files found", "skipped": skipped}, status=400)
+
+        user = request.user
+
+        def line(event):
+            return json.dumps(event, default=str) + "\n"
+
+        def events():
+            failed = 0
+            pending = extract_pending(documents)
+            try:
+                yield line({
+                    "event": "accepted",
+                    "total": len(documents),
+                    "documents": [{"id": doc.id, "name": doc.title} for doc in documents],
+                    "skipped": skipped,
+                })
+                for event in pending:
+                    failed += event["status"] == "failed"
+                    yield line(event)
+            finally:
+                # The client may have gone away (the response closes this
+                # generator); finish and record the upload anyway
+                for event in pending:
+                    failed += event["status"] == "failed"
+                create_notification(user, f"{len(documents)} documents uploaded successfully.")
+                log_activity(user, "Uploaded documents in bulk", {"document_ids": [doc.id for doc in documents]}, activity_type="upload")
+            yield line({"event": "complete", "created": len(documents), "failed": failed, "skipped": len(skipped)})
+
+        response = StreamingHttpResponse(events(), status=201, content_type="application/x-ndjson")
+        return streaming(request, response)
+
+
+# ============================================================
+#   RESUMABLE (CHUNKED) UPLOADS
+# ============================================================
+def upload_error_response(error):
+    return Response({"error": str(error), **error.extra}, status=error.status)
+
+
+class ChunkedUploadInitView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        filename = request.data.get('filename')
+        title = request.data.get('title')
+
+        try:
+            total_size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({"error": "size must be an integer"}, status=400)
+
+        if not filename:
+            return Response({"error": "filename is required"}, status=400)
+
+        file_type = file_type_for(filename)
+        if not file_type:
+            return Response({"error": "Unsupported file type"}, status=400)
+
+        try:
+            session = create_session(request.user, filename, total_size, file_type, title=title)
+        except UploadError as e:
+            return upload_error_response(e)
+
+        return Response(session_state(session), status=201)
+
+
+class ChunkedUploadDetailView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, upload_id):
+        session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+        return Response(session_state(session))
+
+    def delete(self, request, upload_id):
+        session = get_object_or_404(UploadSession, id=upload_id, user=request.user, status="active")
+        discard_session(session)
+        return Response({"message": "Upload cancelled"}, status=200)
+
+
+class ChunkedUploadChunkView(APIView):
+    """PUT the raw bytes of chunk `index` as the request body."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request, upload_id, index):
+        stream = request.stream or io.BytesIO()
+        try:
+            session = write_chunk(upload_id, request.user, index, stream)
+        except UploadError as e:
+            return upload_error_response(e)
+
+        return Response(session_state(session))
+
+
+class ChunkedUploadFinalizeView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, upload_id):
+        try:
+            session, document, created = finalize_session(upload_id, request.user)
+        except UploadError as e:
+            return upload_error_response(e)
+
+        if document is None:
+            return Response({"error": "Document no longer exists"}, status=410)
+
+        if document.extracted_text is None:
+            document.extracted_text = extract_text(document.file.path, document.file_type) or ""
+            document.save(update_fields=["extracted_text"])
+            index_sections([document])
+        elif created:
+            index_sections([document])
+
+        if created:
+            create_notification(request.user, f"Document '{document.title}' uploaded successfully.")
+            log_activity(request.user, "Uploaded document", {"document_id": document.id}, activity_type="upload")
 
         return Response(DocumentSerializer(document).data, status=201)
 
@@ -161,20 +661,20 @@ class DocumentAnalysisView(APIView):
         if not document.extracted_text:
             return Response({"error": "No extracted text available"}, status=400)
 
-        # Subscription
-        try:
-            sub = request.user.subscription
-        except Exception:
-            sub = None
-
-        if sub:
-            sub.reset_if_new_cycle()
-            if sub.plan == "free" and sub.analysis_count >= 3:
-                return Response({"error": "Upgrade required", "remaining": 0}, status=402)
+        # Subscription quota: reserve one analysis up front (atomic, one query)
+        if not reserve_analysis(request.user):
+            return Response({"error": "Upgrade required", "remaining": 0}, status=402)
 
         try:
-            results = process_document(document.extracted_text, generate_summary_flag=True)
+            results = process_document(
+                document.extracted_text,
+                generate_summary_flag=True,
+                n_process=get_batch_settings()["N_PROCESS"],
+                **pipeline_options(),
+            )
         except Exception:
+            # A failed analysis doesn't count against the quota
+            release_analysis(request.user)
             results = {}
 
         # Always ensure clauses_found is a valid object
@@ -188,25 +688,79 @@ class DocumentAnalysisView(APIView):
         document.status = "analyzed"
 
         # Versioning
-        last_version = DocumentVersion.objects.filter(document=document).order_by("-version_number").first()
+        last_version = (
+            DocumentVersion.objects.filter(document=document)
+            .select_related("content_ref")
+            .defer("content")
+            .order_by("-version_number")
+            .first()
+        )
         next_version = last_version.version_number + 1 if last_version else 1
 
-        DocumentVersion.objects.create(
-            document=document,
-            version_number=next_version,
-            content=document.extracted_text or ""
-        )
+        with transaction.atomic():
+            DocumentVersion.objects.create(
+                document=document,
+                version_number=next_version,
+                content_ref=store_content(
+                    document.extracted_text,
+                    base=last_version.content_ref if last_version else None,
+                ),
+            )
 
         document.save()
-
-        # Increment usage
-        if sub and sub.plan == "free":
-            sub.analysis_count += 1
-            sub.save()
+        index_analysis(document, results)
 
         return Response(DocumentSerializer(document).data, status=200)
 
 
+# ============================================================
+#   BATCH ANALYSIS
+# ============================================================
+class BatchDocumentAnalysisView(APIView):
+    """Analyze several of the user's documents in one pass: {"document_ids": [...]}."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        ids = request.data.get("document_ids")
+        if not isinstance(ids, list) or not ids:
+            return Response({"error": "document_ids must be a non-empty list"}, status=400)
+
+        max_documents = get_batch_settings()["MAX_DOCUMENTS"]
+        if len(ids) > max_documents:
+            return Response({"error": f"At most {max_documents} documents per request"}, status=400)
+
+        # Only the owner can analyze their documents, as with the single endpoint
+        documents = {doc.id: doc for doc in Document.objects.filter(pk__in=ids, user=request.user)}
+
+        to_analyze, skipped = [], []
+        for doc_id in dict.fromkeys(ids):
+            doc = documents.get(doc_id)
+            if doc is None:
+                skipped.append({"id": doc_id, "error": "Document not found"})
+            elif not doc.extracted_text:
+                skipped.append({"id": doc_id, "error": "No extracted text available"})
+            else:
+                to_analyze.append(doc)
+
+        if not to_analyze:
+            return Response({"error": "Nothing to analyze", "skipped": skipped}, status=400)
+
+        # One quota reservation covers the whole batch
+        if not reserve_analysis(request.user, len(to_analyze)):
+            return Response({"error": "Upgrade required", "requested": len(to_analyze)}, status=402)
+
+        try:
+            analyze_documents(to_analyze)
+        except Exception:
+            release_analysis(request.user, len(to_analyze))
+            return Response({"error": "Analysis failed"}, status=500)
+
+        return Response({
+            "analyzed": DocumentSerializer(to_analyze, many=True).data,
+            "skipped": skipped,
+        }, status=200)
+
+
 # ============================================================
 #   SUMMARIZE DOCUMENT
 # ============================================================
@@ -246,24 +800,41 @@ class DocumentDownloadView(APIView):
         if not user_has_access_to_document(request, document):
             return Response({"error": "Not allowed"}, status=403)
 
-        report_text = f"""
-DOCUMENT REPORT
-======================
-Title: {document.title}
-Generated: {document.analyzed_at}
-Risk Level: {document.risk_score}
+        # Rendered once per analysis version, then served from disk
+        last_version = document.versions.order_by("-version_number").values_list("version_number", flat=True).first()
+        report = open_report(document, version_number=last_version, entities=report_entities(document))
 
-SUMMARY:
-{document.summary}
+        response = FileResponse(
+            report,
+            as_attachment=True,
+            filename=f"{document.title}_report.pdf",
+            content_type="application/pdf",
+        )
+        return streaming(request, response)
+
+
+# ============================================================
+#   DOWNLOAD ORIGINAL FILE
+# ============================================================
+class DocumentFileView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            document = Document.objects.get(pk=pk)
+        except Document.DoesNotExist:
+            return Response({"error": "Document not found"}, status=404)
 
-CLAUSES:
-{document.clauses_found}
-""".strip()
+        if not user_has_access_to_document(request, document):
+            return Response({"error": "Not allowed"}, status=403)
 
-        response = HttpResponse(report_text, content_type="text/plain")
-        response['Content-Disposition'] = f'attachment; filename="{document.title}_report.txt"'
+        if not document.file or not os.path.exists(document.file.path):
+            return Response({"error": "File not found"}, status=404)
 
-        return response
+        # Blob files are named by hash; offer the document title instead
+        ext = os.path.splitext(document.file.name)[1]
+        filename = document.title if document.title.lower().endswith(ext.lower()) else f"{document.title}{ext}"
+        return serve_file(request, document.file.path, filename)
 
 
 # ============================================================
@@ -281,11 +852,17 @@ class DocumentDeleteView(APIView):
         if not user_has_access_to_document(request, document):
             return Response({"error": "Not allowed"}, status=403)
 
-        if document.file and os.path.exists(document.file.path):
+        blob_id = document.blob_id
+        if not blob_id and document.file and os.path.exists(document.file.path):
             os.remove(document.file.path)
 
+        delete_cached_reports(document.id)
         document.delete()
 
+        # Shared files are only removed with their last document
+        if blob_id:
+            release_blob(blob_id)
+
         return Response({"message": "Document deleted successfully"}, status=204)
 
 
@@ -507,6 +1084,43 @@ class DocumentVersionDetailView(generics.RetrieveAPIView):
         return version
 
 
+class DocumentVersionDiffView(APIView):
+    """
+    GET /documents/<pk>/versions/diff/?from=<version_number>&to=<version_number>
+    `to` defaults to the latest version and `from` to the one before it.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        document = get_object_or_404(Document, pk=pk)
+        if not IsDocumentParticipant().has_object_permission(request, self, document):
+            raise PermissionDenied("Not allowed")
+
+        try:
+            to_number = int(request.query_params["to"]) if "to" in request.query_params else None
+            from_number = int(request.query_params["from"]) if "from" in request.query_params else None
+        except ValueError:
+            return Response({"error": "from and to must be version numbers"}, status=400)
+
+        versions = DocumentVersion.objects.filter(document=document).select_related("content_ref").defer("content")
+        new = versions.filter(version_number=to_number).first() if to_number is not None else versions.order_by("-version_number").first()
+        if new is None:
+            return Response({"error": "Version not found"}, status=404)
+        if from_number is None:
+            old = versions.filter(version_number__lt=new.version_number).order_by("-version_number").first()
+        else:
+            old = versions.filter(version_number=from_number).first()
+        if old is None:
+            return Response({"error": "Version not found"}, status=404)
+
+        return Response({
+            "document_id": document.id,
+            "from": {"id": old.id, "version_number": old.version_number},
+            "to": {"id": new.id, "version_number": new.version_number},
+            **diff_versions(old, new),
+        })
+
+
 # ============================================================
 #   SHARE DOCUMENT
 # ============================================================
@@ -1,2 +1,2 @@
 # ml_models/__init__.py
-from .nlp_pipeline import process_document  # export the main entrypoint
+from .nlp_pipeline import process_document, process_documents  # export the main entrypoints
@@ -8,33 +8,32 @@ HF_API_TOKEN = os.environ.get("HF_API_TOKEN")  # required
 
 HEADERS = {"Authorization": f"Bearer {HF_API_TOKEN}"} if HF_API_TOKEN else {}
 
-# Small helper to call HF Inference API
-def generate_summary(text: str, max_retries: int = 3) -> str:
-    if not HF_API_TOKEN:
-        # Fail gracefully — return short fallback summary
-        return (text[:800] + "...") if len(text) > 800 else text
+def _fallback(text: str) -> str:
+    # Fallback summarization: truncate intelligently
+    text = text.strip()
+    if len(text) <= 1000:
+        return text
+    return text[:1000] + "..."
 
-    payload = {
-        "inputs": text,
-        "parameters": {"max_length": 200, "min_length": 50, "do_sample": False},
-    }
 
+def _summary_text(item):
+    # HF returns a list of dicts for summarization models
+    if isinstance(item, dict) and "summary_text" in item:
+        return item["summary_text"]
+    # If response is plain text
+    if isinstance(item, str):
+        return item
+    # Fallback to str(item)
+    return str(item)
+
+
+def _post(payload: dict, max_retries: int):
+    """POST to the inference API, retrying while the model loads. Returns the JSON body or None."""
     for attempt in range(1, max_retries + 1):
         try:
             resp = requests.post(HF_API_URL, headers=HEADERS, json=payload, timeout=30)
             if resp.status_code == 200:
-                data = resp.json()
-                # HF returns a list of dicts for summarization models
-                if isinstance(data, list) and "summary_text" in data[0]:
-                    return data[0]["summary_text"]
-                # Some models return text directly
-                if isinstance(data, dict) and "summary_text" in data:
-                    return data["summary_text"]
-                # If response is plain text
-                if isinstance(data, str):
-                    return data
-                # Fallback to str(resp.json())
-                return str(data)
+                return resp.json()
             elif resp.status_code in (503, 502) and attempt < max_retries:
                 time.sleep(2 * attempt)
                 continue
@@ -46,9 +45,49 @@ def generate_summary(text: str, max_retries: int = 3) -> str:
                 time.sleep(2 * attempt)
                 continue
             break
+    return None
 
-    # Fallback summarization: truncate intelligently
-    text = text.strip()
-    if len(text) <= 1000:
-        return text
-    return text[:1000] + "..."
+
+# Small helper to call HF Inference API
+def generate_summary(text: str, max_retries: int = 3) -> str:
+    if not HF_API_TOKEN:
+        # Fail gracefully — return short fallback summary
+        return (text[:800] + "...") if len(text) > 800 else text
+
+    payload = {
+        "inputs": text,
+        "parameters": {"max_length": 200, "min_length": 50, "do_sample": False},
+    }
+
+    data = _post(payload, max_retries)
+    if data is None:
+        return _fallback(text)
+    # Some models return text directly, others a one-element list
+    if isinstance(data, list) and data:
+        return _summary_text(data[0])
+    return _summary_text(data)
+
+
+def generate_summaries(texts: list, batch_size: int = 8, max_retries: int = 3) -> list:
+    """
+    Summarize many texts, sending `batch_size` of them per inference request
+    so the model runs them as one batch. Returns one summary per text, in
+    order; a batch that fails falls back to truncation for its texts.
+    """
+    if not HF_API_TOKEN:
+        return [(text[:800] + "...") if len(text) > 800 else text for text in texts]
+
+    summaries = []
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i + batch_size]
+        payload = {
+            "inputs": batch,
+            "parameters": {"max_length": 200, "min_length": 50, "do_sample": False},
+        }
+        data = _post(payload, max_retries)
+        if isinstance(data, list) and len(data) == len(batch):
+            # Each input yields a dict, or a one-element list of dicts
+            summaries += [_summary_text(item[0] if isinstance(item, list) and item else item) for item in data]
+        else:
+            summaries += [_fallback(text) for text in batch]
+    return summaries
@@ -1,6 +1,9 @@
 # ml_models/clause_patterns.py
 import spacy
 from spacy.matcher import PhraseMatcher
+from spacy.util import filter_spans
+
+from .windows import parse_windows
 
 nlp = spacy.load("en_core_web_sm")
 
@@ -24,13 +27,33 @@ for key, phrases in PATTERNS.items():
 def extract_clauses(text: str) -> dict:
     """
     Returns a dictionary like {"confidentiality": True, "termination": False, ...}
+    Long texts are parsed window by window (see ml_models.windows).
+    """
+    found = {k: False for k in PATTERNS}
+    for _, _, doc in parse_windows(nlp, [text or ""]):
+        for k, present in clauses_from_doc(doc).items():
+            found[k] = found[k] or present
+    return found
+
+
+def clauses_from_doc(doc) -> dict:
+    """Same as extract_clauses, for a text already parsed with `nlp`."""
+    return {k: bool(spans) for k, spans in clause_spans_from_doc(doc).items()}
+
+
+def clause_spans_from_doc(doc) -> dict:
+    """
+    Returns the character spans of every match per clause, in text order, e.g.
+    {"confidentiality": [[1042, 1054], [3310, 3325]], "termination": [], ...}
     """
-    doc = nlp(text[:200000])  # safety: limit extremely long text
     matches = matcher(doc)
 
-    found = {k: False for k in PATTERNS.keys()}
+    by_label = {k: [] for k in PATTERNS.keys()}
     for match_id, start, end in matches:
-        label = nlp.vocab.strings[match_id]
-        found[label] = True
+        by_label[nlp.vocab.strings[match_id]].append(doc[start:end])
 
-    return found
+    # Nested phrases ("limitation of liability" / "liability") count once, as the longest
+    return {
+        label: [[span.start_char, span.end_char] for span in sorted(filter_spans(spans), key=lambda s: s.start)]
+        for label, spans in by_label.items()
+    }
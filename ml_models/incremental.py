@@ -0,0 +1,86 @@
+# ml_models/incremental.py
+"""
+Paragraph-level analysis cache.
+
+A text is split into paragraphs at blank lines and each paragraph's clause
+spans and entities are cached under a hash of its exact text, with offsets
+relative to the paragraph. Re-analyzing an edited document parses only the
+paragraphs that are new or changed; cached results are shifted to where
+their paragraph now starts.
+
+`cache` is anything with get_many(keys) -> dict and set_many(mapping,
+timeout), e.g. a Django cache.
+"""
+import hashlib
+import json
+import re
+
+from .clause_patterns import PATTERNS, clause_spans_from_doc, nlp
+from .ner import entities_from_doc
+from .windows import WINDOW_CHARS, merge_into, window_spans
+
+_PARAGRAPH_END_RE = re.compile(r"\n[ \t]*\n\s*")
+
+# Cached results are only valid for the model and patterns that produced them
+ANALYSIS_TAG = hashlib.blake2b(
+    json.dumps([nlp.meta.get("name"), nlp.meta.get("version"), PATTERNS], sort_keys=True).encode("utf-8"),
+    digest_size=8,
+).hexdigest()
+
+
+def split_paragraphs(text):
+    """[(start, end)] of each paragraph, separators included, covering the whole text."""
+    spans, start = [], 0
+    for match in _PARAGRAPH_END_RE.finditer(text):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def _cache_key(paragraph):
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=16).hexdigest()
+    return f"nlp:paragraph:{ANALYSIS_TAG}:{digest}"
+
+
+def _analyze_paragraph(doc):
+    return {"clause_spans": clause_spans_from_doc(doc), "entities": entities_from_doc(doc)}
+
+
+def analyze_paragraphs(texts, cache, timeout=None, window_chars=WINDOW_CHARS, batch_size=32, n_process=1):
+    """
+    Clause spans and entities for each text, as (clause_spans, entities)
+    pairs with offsets into the full text. Paragraphs missing from `cache`
+    go through one nlp.pipe call across all texts and are then cached.
+    Paragraphs longer than `window_chars` are cached window by window.
+    """
+    layouts = []
+    keys = {}
+    for text in texts:
+        layout = []
+        for paragraph_start, paragraph_end in split_paragraphs(text):
+            for start, end in window_spans(text, window_chars, paragraph_start, paragraph_end):
+                paragraph = text[start:end]
+                if paragraph.strip():
+                    key = _cache_key(paragraph)
+                    keys[key] = paragraph
+                    layout.append((start, key))
+        layouts.append(layout)
+
+    known = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in known]
+    if missing:
+        parsed = nlp.pipe((keys[key] for key in missing), batch_size=batch_size, n_process=n_process)
+        fresh = {key: _analyze_paragraph(doc) for key, doc in zip(missing, parsed)}
+        cache.set_many(fresh, timeout)
+        known.update(fresh)
+
+    results = []
+    for layout in layouts:
+        spans = {label: [] for label in PATTERNS}
+        entities = []
+        for offset, key in layout:
+            merge_into(spans, entities, known[key]["clause_spans"], known[key]["entities"], offset)
+        results.append((spans, entities))
+    return results
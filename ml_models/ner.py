@@ -1,9 +1,19 @@
 # ml_models/ner.py
 import spacy
+
+from .windows import drop_duplicates, merge_into, parse_windows
+
 nlp = spacy.load("en_core_web_sm")
 
 def extract_entities(text: str) -> list:
-    doc = nlp(text[:200000])
+    # Long texts are parsed window by window; offsets are into the full text
+    entities = []
+    for _, offset, doc in parse_windows(nlp, [text or ""]):
+        merge_into({}, entities, {}, entities_from_doc(doc), offset)
+    drop_duplicates({}, entities)
+    return entities
+
+def entities_from_doc(doc) -> list:
     entities = []
     for ent in doc.ents:
         entities.append({
@@ -1,28 +1,39 @@
 # ml_models/nlp_pipeline.py
-from .clause_patterns import extract_clauses
-from .ner import extract_entities
-from .ai_summarizer import generate_summary
+from .clause_patterns import PATTERNS, clause_spans_from_doc, nlp
+from .ner import entities_from_doc
+from .ai_summarizer import generate_summary, generate_summaries
 from .risk_engine import score_risk_from_clauses
+from .incremental import analyze_paragraphs
+from .windows import WINDOW_CHARS, drop_duplicates, merge_into, parse_windows
+from .parse_cache import MODEL_TAG, add_window, load_windows, new_docbin, text_sha256
 
-def process_document(text: str, generate_summary_flag: bool = True) -> dict:
+def process_document(text: str, generate_summary_flag: bool = True, paragraph_cache=None,
+                     cache_timeout=None, window_chars: int = WINDOW_CHARS, n_process: int = 1,
+                     parse_store=None) -> dict:
     """
     Main entrypoint called from Django.
     Returns a dict:
       {
         "clauses_found": {...},
+        "clause_offsets": {...},   # first match offset per clause, or None
+        "clause_spans": {...},     # [[start, end], ...] per clause
         "entities": [...],
         "summary": "...",
         "risk_score": "Low|Medium|High"
       }
+    The whole text is analyzed, in windows of at most `window_chars`
+    (see ml_models.windows). A stored parse (`parse_store`, see
+    ml_models.parse_cache) is reused; otherwise, with a `paragraph_cache`
+    (see ml_models.incremental) only paragraphs not analyzed before are parsed.
     """
     text = text or ""
-    # 1. Clause extraction
-    clauses = extract_clauses(text)
+    spans, entities = analyze_texts(
+        [text], paragraph_cache=paragraph_cache, cache_timeout=cache_timeout,
+        window_chars=window_chars, n_process=n_process, parse_store=parse_store,
+    )[0]
+    result = build_result(spans, entities)
 
-    # 2. Entity extraction
-    entities = extract_entities(text)
-
-    # 3. Summarization (call HF)
+    # 4. Summarization (call HF)
     summary = None
     if generate_summary_flag:
         try:
@@ -30,12 +41,119 @@ def process_document(text: str, generate_summary_flag: bool = True) -> dict:
         except Exception:
             summary = (text[:800] + "...") if len(text) > 800 else text
 
-    # 4. Risk scoring
+    result["summary"] = summary
+    return result
+
+
+def analyze_texts(texts: list, paragraph_cache=None, cache_timeout=None, window_chars: int = WINDOW_CHARS,
+                  batch_size: int = 4, n_process: int = 1, parse_store=None) -> list:
+    """
+    (clause_spans, entities) for each text, offsets into the full text.
+    Every window is parsed once and serves both clause matching and NER;
+    at most `batch_size` parsed windows are held at a time.
+
+    With a `parse_store` (see ml_models.parse_cache), texts whose parse is
+    stored are analyzed from it. The rest go through the paragraph cache if
+    one is given (those parses are partial and not stored), otherwise they
+    are parsed in full and their parses saved.
+    """
+    results = [None] * len(texts)
+    if parse_store is not None:
+        for index, text in enumerate(texts):
+            data = parse_store.load(text_sha256(text), MODEL_TAG) if text else None
+            if data is not None:
+                results[index] = _analyze_windows(load_windows(data))
+
+    pending = [index for index, result in enumerate(results) if result is None]
+    if not pending:
+        return _without_duplicates(results)
+    if paragraph_cache is not None:
+        analyzed = analyze_paragraphs(
+            [texts[index] for index in pending], paragraph_cache, timeout=cache_timeout,
+            window_chars=window_chars, batch_size=batch_size, n_process=n_process,
+        )
+        for index, result in zip(pending, analyzed):
+            results[index] = result
+        return _without_duplicates(results)
+
+    for index in pending:
+        results[index] = ({k: [] for k in PATTERNS}, [])
+    docbin, current = None, None
+
+    def save(position):
+        if parse_store is not None and docbin is not None and len(docbin):
+            text = texts[pending[position]]
+            parse_store.save(text_sha256(text), MODEL_TAG, docbin.to_bytes())
+
+    parsed = parse_windows(nlp, [texts[index] for index in pending], window_chars, batch_size=batch_size, n_process=n_process)
+    for position, offset, doc in parsed:
+        spans, entities = results[pending[position]]
+        merge_into(spans, entities, clause_spans_from_doc(doc), entities_from_doc(doc), offset)
+        if parse_store is not None:
+            # Windows arrive in text order; a text's parse is saved once its last window is in
+            if position != current:
+                save(current)
+                docbin, current = new_docbin(), position
+            add_window(docbin, offset, doc)
+    save(current)
+    return _without_duplicates(results)
+
+
+def _without_duplicates(results) -> list:
+    # Overlapping windows see the text around each cut twice
+    for spans, entities in results:
+        drop_duplicates(spans, entities)
+    return results
+
+
+def _analyze_windows(windows) -> tuple:
+    spans, entities = {k: [] for k in PATTERNS}, []
+    for offset, doc in windows:
+        merge_into(spans, entities, clause_spans_from_doc(doc), entities_from_doc(doc), offset)
+    return spans, entities
+
+
+def build_result(spans: dict, entities: list) -> dict:
+    clauses = {k: bool(matches) for k, matches in spans.items()}
+
+    # 3. Risk scoring
     risk = score_risk_from_clauses(clauses)
 
     return {
         "clauses_found": clauses,
+        "clause_offsets": {k: matches[0][0] if matches else None for k, matches in spans.items()},
+        "clause_spans": spans,
         "entities": entities,
-        "summary": summary,
+        "summary": None,
         "risk_score": risk
     }
+
+
+def process_documents(texts: list, generate_summary_flag: bool = True, batch_size: int = 32,
+                      n_process: int = 1, summary_batch_size: int = 8, paragraph_cache=None,
+                      cache_timeout=None, window_chars: int = WINDOW_CHARS, parse_store=None) -> list:
+    """
+    Batch version of process_document: returns one result dict per text, in
+    order. The windows of all texts go through one nlp.pipe call (clauses
+    and entities share the parse), and summaries are requested
+    `summary_batch_size` texts at a time. Stored parses and the paragraph
+    cache are used as in process_document.
+    """
+    texts = [text or "" for text in texts]
+
+    analyzed = analyze_texts(
+        texts, paragraph_cache=paragraph_cache, cache_timeout=cache_timeout,
+        window_chars=window_chars, batch_size=batch_size, n_process=n_process,
+        parse_store=parse_store,
+    )
+    results = [build_result(spans, entities) for spans, entities in analyzed]
+
+    if generate_summary_flag and texts:
+        try:
+            summaries = generate_summaries(texts, batch_size=summary_batch_size)
+        except Exception:
+            summaries = [(text[:800] + "...") if len(text) > 800 else text for text in texts]
+        for result, summary in zip(results, summaries):
+            result["summary"] = summary
+
+    return results
@@ -0,0 +1,39 @@
+# ml_models/parse_cache.py
+"""
+Serialized parses.
+
+A text's windows (see ml_models.windows) are saved as one spaCy DocBin,
+zlib-compressed by DocBin itself, with each window's offset kept in its
+user_data. Loading it yields the same (offset, doc) pairs as parsing, at a
+fraction of the cost.
+
+A `parse_store` is anything with load(text_sha256, model) -> bytes | None
+and save(text_sha256, model, data); documents.parses provides one.
+"""
+import hashlib
+
+from spacy.tokens import DocBin
+
+from .clause_patterns import nlp
+
+# Parses are only reusable with the pipeline that produced them
+MODEL_TAG = f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def new_docbin():
+    return DocBin(store_user_data=True)
+
+
+def add_window(docbin, offset, doc):
+    doc.user_data["window_offset"] = offset
+    docbin.add(doc)
+
+
+def load_windows(data):
+    """Yield (offset, doc) for each window of a serialized parse."""
+    for doc in DocBin().from_bytes(data).get_docs(nlp.vocab):
+        yield doc.user_data.get("window_offset", 0), doc
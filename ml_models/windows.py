@@ -0,0 +1,96 @@
+# ml_models/windows.py
+"""
+Long texts are parsed as a sequence of bounded windows instead of being
+truncated. Windows end at the last paragraph break, sentence end, line
+break or space (in that order of preference) in their second half, and
+each window after the first starts up to OVERLAP_CHARS earlier than the
+previous one ended, so a clause phrase or entity cut by one window's edge
+is whole in the next; drop_duplicates() removes what the overlap finds
+twice. Parsed windows are consumed one batch at a time, which keeps memory
+flat however long the text is.
+"""
+import re
+
+WINDOW_CHARS = 100000
+OVERLAP_CHARS = 200
+
+_BREAKS = [
+    re.compile(r"\n[ \t]*\n\s*"),
+    re.compile(r"[.!?;:][\"')\]]*\s+"),
+    re.compile(r"\n\s*"),
+    re.compile(r"\s+"),
+]
+_SPACE_RE = re.compile(r"\s+")
+
+
+def _cut(text, start, end):
+    lo = start + (end - start) // 2
+    for pattern in _BREAKS:
+        last = None
+        for last in pattern.finditer(text, lo, end):
+            pass
+        if last is not None:
+            return last.end()
+    return end
+
+
+def window_spans(text, size=WINDOW_CHARS, start=0, end=None, overlap=OVERLAP_CHARS):
+    """
+    Yield (start, end) windows of at most `size` characters covering
+    text[start:end], each starting at a word up to `overlap` characters
+    before the previous window's end.
+    """
+    end = len(text) if end is None else end
+    # Cuts fall in a window's second half, so this keeps every window moving forward
+    overlap = min(overlap, size // 4)
+    while end - start > size:
+        cut = _cut(text, start, start + size)
+        yield start, cut
+        space = _SPACE_RE.search(text, cut - overlap, cut)
+        start = space.end() if space else cut
+    if start < end:
+        yield start, end
+
+
+def parse_windows(nlp, texts, size=WINDOW_CHARS, batch_size=4, n_process=1):
+    """Yield (text index, window offset, doc) for every window of every text, in order."""
+    def windows():
+        for index, text in enumerate(texts):
+            for start, end in window_spans(text, size):
+                yield text[start:end], (index, start)
+
+    for doc, (index, offset) in nlp.pipe(windows(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+        yield index, offset, doc
+
+
+def merge_into(spans, entities, part_spans, part_entities, offset):
+    """Add one window's clause spans and entities to the running result, shifted by `offset`."""
+    for label, matches in part_spans.items():
+        spans.setdefault(label, []).extend([start + offset, end + offset] for start, end in matches)
+    entities.extend(
+        {**ent, "start_char": ent["start_char"] + offset, "end_char": ent["end_char"] + offset}
+        for ent in part_entities
+    )
+
+
+def _non_overlapping(items, bounds):
+    """Items in text order, skipping any that overlap one already kept (the longer wins on a shared start)."""
+    kept, reach = [], -1
+    for item in sorted(items, key=lambda item: (bounds(item)[0], -bounds(item)[1])):
+        start, end = bounds(item)
+        if start >= reach:
+            kept.append(item)
+            reach = end
+    return kept
+
+
+def drop_duplicates(spans, entities):
+    """
+    Remove, in place, the clause spans and entities found twice in the overlap
+    of two windows, and the fragments seen where a window edge cut a phrase
+    short, which overlap the whole match from the neighbouring window. Matches
+    of a label never overlap within one window either (see clause_spans_from_doc).
+    """
+    for label, matches in spans.items():
+        spans[label] = _non_overlapping(matches, lambda match: match)
+    entities[:] = _non_overlapping(entities, lambda ent: (ent["start_char"], ent["end_char"]))
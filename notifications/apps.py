@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "notifications"
+
+    def ready(self):
+        from .counters import count_new_notifications
+        from .sink import event_sink
+        from .stream import publish_notifications
+
+        # Once notifications are written, bump unread counters and push them
+        # to connected SSE streams
+        event_sink.connect(count_new_notifications)
+        event_sink.connect(publish_notifications)
@@ -0,0 +1,66 @@
+# notifications/counters.py
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+# Counters expire so any drift from the database (missed update, cache eviction,
+# rows changed outside these helpers) heals itself on the next recount.
+UNREAD_COUNT_TTL = 300
+
+
+def counters_enabled():
+    # A per-process cache would keep one counter per worker, each blind to
+    # the others' updates; without a shared cache every read counts rows.
+    return getattr(settings, "SHARED_CACHE", False)
+
+
+def unread_count_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def _count_unread(user_id):
+    return Notification.objects.filter(user_id=user_id, is_read=False).count()
+
+
+def get_unread_count(user_id):
+    if not counters_enabled():
+        return _count_unread(user_id)
+
+    key = unread_count_key(user_id)
+    count = cache.get(key)
+    if count is None or count < 0:
+        count = _count_unread(user_id)
+        cache.set(key, count, UNREAD_COUNT_TTL)
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    if not delta or not counters_enabled():
+        return
+
+    key = unread_count_key(user_id)
+    try:
+        count = cache.incr(key, delta)
+    except ValueError:
+        # Not cached yet; the next read counts from the database
+        return
+
+    if count < 0:
+        cache.delete(key)
+
+
+def reset_unread_count(user_id, count=0):
+    if counters_enabled():
+        cache.set(unread_count_key(user_id), count, UNREAD_COUNT_TTL)
+
+
+def count_new_notifications(objs):
+    """Event sink listener: bump unread counters for freshly written notifications."""
+    per_user = {}
+    for obj in objs:
+        if isinstance(obj, Notification) and not obj.is_read:
+            per_user[obj.user_id] = per_user.get(obj.user_id, 0) + 1
+
+    for user_id, delta in per_user.items():
+        adjust_unread_count(user_id, delta)
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications import partitioning
+from notifications.retention import apply_retention, get_retention_settings
+
+
+class Command(BaseCommand):
+    help = "Archive old activity logs and notifications, and delete expired read notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop archiving each table after this many batches (default: no limit).",
+        )
+
+    def handle(self, *args, **options):
+        counts = apply_retention(max_batches=options["max_batches"])
+        for key, value in counts.items():
+            self.stdout.write(f"{key}: {value}")
+
+        if partitioning.is_partitioned():
+            partitioning.ensure_partitions()
+            horizon = timezone.now() - timedelta(days=get_retention_settings()["ACTIVITY_LOG_DAYS"])
+            for name in partitioning.drop_empty_partitions(horizon):
+                self.stdout.write(f"dropped partition {name}")
+
+        self.stdout.write(self.style.SUCCESS("Retention applied."))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from notifications import partitioning
+
+
+class Command(BaseCommand):
+    help = "Partition the activity log table by month (PostgreSQL only) and create upcoming partitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Rebuild the existing table as a partitioned table. Locks the table while rows are copied.",
+        )
+        parser.add_argument("--months-ahead", type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            if options["convert"]:
+                if partitioning.convert_to_partitioned(months_ahead=options["months_ahead"]):
+                    self.stdout.write("Activity log converted to a partitioned table.")
+                else:
+                    self.stdout.write("Activity log is already partitioned.")
+            elif not partitioning.is_partitioned():
+                raise CommandError("Activity log is not partitioned yet; run with --convert first.")
+
+            partitioning.ensure_partitions(months_ahead=options["months_ahead"])
+        except partitioning.PartitioningNotSupported as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS("Activity log partitions are up to date."))
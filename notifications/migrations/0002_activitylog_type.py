@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def activity_type_for(action):
+    action = (action or "").lower()
+
+    if "upload" in action:
+        return "upload"
+    if "analy" in action:
+        return "analysis"
+    if "report" in action:
+        return "report"
+    if "download" in action:
+        return "download"
+    if (
+        "login" in action
+        or "logout" in action
+        or "logged in" in action
+        or "logged out" in action
+    ):
+        return "auth"
+
+    return "other"
+
+
+def backfill_activity_types(apps, schema_editor):
+    ActivityLog = apps.get_model("notifications", "ActivityLog")
+
+    last_id = 0
+    while True:
+        batch = list(
+            ActivityLog.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "action")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        ids_by_type = {}
+        for log_id, action in batch:
+            ids_by_type.setdefault(activity_type_for(action), []).append(log_id)
+
+        for activity_type, ids in ids_by_type.items():
+            if activity_type != "other":
+                ActivityLog.objects.filter(id__in=ids).update(type=activity_type)
+
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activitylog",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("upload", "Upload"),
+                    ("analysis", "Analysis"),
+                    ("report", "Report"),
+                    ("download", "Download"),
+                    ("auth", "Auth"),
+                    ("other", "Other"),
+                ],
+                db_index=True,
+                default="other",
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(backfill_activity_types, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="activitylog",
+            index=models.Index(
+                fields=["user", "type", "-timestamp"],
+                name="activitylog_user_type_ts_idx",
+            ),
+        ),
+    ]
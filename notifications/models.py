@@ -1,22 +1,39 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 class Notification(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when the event sink writes it
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     is_read = models.BooleanField(default=False)
 
     def __str__(self):
         return f"Notification for {self.user.username}: {self.message[:30]}"
     
 class ActivityLog(models.Model):
+    TYPE_CHOICES = [
+        ('upload', 'Upload'),
+        ('analysis', 'Analysis'),
+        ('report', 'Report'),
+        ('download', 'Download'),
+        ('auth', 'Auth'),
+        ('other', 'Other'),
+    ]
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     action = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='other', db_index=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     details = models.JSONField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'type', '-timestamp'], name='activitylog_user_type_ts_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.action} at {self.timestamp}"
 
@@ -0,0 +1,181 @@
+# notifications/partitioning.py
+"""
+Monthly range partitioning of the activity log table on PostgreSQL.
+
+Django keeps treating ActivityLog as a normal model; only the physical table
+changes. The primary key becomes (id, timestamp) because PostgreSQL requires
+the partition key in every unique constraint, and ids keep coming from a
+sequence so they stay unique on their own.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ActivityLog
+
+DEFAULT_PARTITION_SUFFIX = "default"
+
+
+class PartitioningNotSupported(Exception):
+    pass
+
+
+def _table():
+    return ActivityLog._meta.db_table
+
+
+def _require_postgres():
+    if connection.vendor != "postgresql":
+        raise PartitioningNotSupported("Activity log partitioning requires PostgreSQL.")
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    month_index = day.month - 1 + months
+    return date(day.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{_table()}_p{month:%Y%m}"
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT 1 FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %s
+            """,
+            [_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    """Return [(partition table name, month start)] for the monthly partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [_table()],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f"{_table()}_p"
+    partitions = []
+    for name in names:
+        suffix = name[len(prefix):] if name.startswith(prefix) else ""
+        if len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def create_month_partition(cursor, month):
+    qn = connection.ops.quote_name
+    cursor.execute(
+        f"CREATE TABLE IF NOT EXISTS {qn(partition_name(month))} "
+        f"PARTITION OF {qn(_table())} FOR VALUES FROM (%s) TO (%s)",
+        [month.isoformat(), add_months(month, 1).isoformat()],
+    )
+
+
+def ensure_partitions(months_ahead=3):
+    """Create monthly partitions from the current month up to `months_ahead` months out."""
+    _require_postgres()
+    this_month = month_start(timezone.now().date())
+
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            create_month_partition(cursor, add_months(this_month, offset))
+
+
+def drop_empty_partitions(older_than):
+    """Drop monthly partitions that end before `older_than` and no longer hold rows."""
+    _require_postgres()
+    qn = connection.ops.quote_name
+    cutoff = month_start(older_than.date())
+
+    dropped = []
+    with connection.cursor() as cursor:
+        for name, month in list_partitions():
+            if add_months(month, 1) > cutoff:
+                continue
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {qn(name)})")
+            if cursor.fetchone()[0]:
+                continue
+            cursor.execute(f"DROP TABLE {qn(name)}")
+            dropped.append(name)
+    return dropped
+
+
+def convert_to_partitioned(months_ahead=3):
+    """
+    Rebuild the activity log as a table partitioned by month on "timestamp".
+
+    Runs in one transaction and holds an exclusive lock on the log while rows
+    are copied, so run it in a maintenance window.
+    """
+    _require_postgres()
+    if is_partitioned():
+        return False
+
+    qn = connection.ops.quote_name
+    table = _table()
+    legacy = f"{table}_unpartitioned"
+    sequence = f"{table}_id_seq_partitioned"
+    user_table = ActivityLog._meta.get_field("user").related_model._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) "
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, "timestamp")')
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval(%s)", [sequence])
+        cursor.execute(f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {qn(legacy)}), 0) + 1, false)", [sequence])
+
+        # Monthly partitions for existing rows, upcoming months, and a default
+        # partition so an unexpected timestamp never makes an insert fail.
+        cursor.execute(f'SELECT MIN("timestamp") FROM {qn(legacy)}')
+        oldest = cursor.fetchone()[0]
+        this_month = month_start(timezone.now().date())
+        month = month_start(oldest.date()) if oldest else this_month
+        while month <= add_months(this_month, months_ahead):
+            create_month_partition(cursor, month)
+            month = add_months(month, 1)
+        cursor.execute(
+            f"CREATE TABLE {qn(table + '_' + DEFAULT_PARTITION_SUFFIX)} PARTITION OF {qn(table)} DEFAULT"
+        )
+
+        cursor.execute(f"INSERT INTO {qn(table)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+
+        # Recreate the indexes and the user foreign key. The Meta index keeps
+        # its name so later migrations can still refer to it.
+        cursor.execute(f"CREATE INDEX {qn(table + '_user_id')} ON {qn(table)} (user_id)")
+        cursor.execute(f"CREATE INDEX {qn(table + '_type')} ON {qn(table)} (type)")
+        cursor.execute(
+            f'CREATE INDEX {qn("activitylog_user_type_ts_idx")} ON {qn(table)} (user_id, type, "timestamp" DESC)'
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_user_id_fk')} "
+            f"FOREIGN KEY (user_id) REFERENCES {qn(user_table)} (id) DEFERRABLE INITIALLY DEFERRED"
+        )
+
+    return True
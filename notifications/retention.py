@@ -0,0 +1,201 @@
+# notifications/retention.py
+import gzip
+import json
+import os
+from datetime import datetime, time as dt_time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .counters import unread_count_key
+from .models import ActivityLog, Notification
+
+DEFAULTS = {
+    "ARCHIVE_DIR": os.path.join(settings.BASE_DIR, "archive"),
+    "ACTIVITY_LOG_DAYS": 90,          # archive activity logs older than this
+    "NOTIFICATION_DAYS": 180,         # archive notifications older than this
+    "READ_NOTIFICATION_TTL_DAYS": 30, # delete read notifications older than this
+    "BATCH_SIZE": 1000,
+}
+
+# model -> (archive sub-directory, timestamp field, fields written to the archive)
+ARCHIVED_MODELS = {
+    ActivityLog: ("activitylog", "timestamp", ["id", "user_id", "action", "type", "timestamp", "details"]),
+    Notification: ("notification", "created_at", ["id", "user_id", "message", "created_at", "is_read"]),
+}
+
+
+def get_retention_settings():
+    return {**DEFAULTS, **getattr(settings, "RETENTION", {})}
+
+
+def archive_dir_for(model):
+    subdir = ARCHIVED_MODELS[model][0]
+    return os.path.join(get_retention_settings()["ARCHIVE_DIR"], subdir)
+
+
+# ============================================================
+#   ARCHIVING
+# ============================================================
+def archive_rows(model, older_than, batch_size=None, max_batches=None):
+    """
+    Move rows of `model` created before `older_than` into gzip'd JSONL files,
+    one file per batch, deleting each batch once its file is on disk.
+
+    Files are named <min date>_<max date>_<first id>-<last id>.jsonl.gz so the
+    admin archive search can skip files outside the requested range. A batch
+    that is archived again after a crash simply overwrites its own file.
+    Returns the number of rows archived.
+    """
+    conf = get_retention_settings()
+    batch_size = batch_size or conf["BATCH_SIZE"]
+    _, ts_field, fields = ARCHIVED_MODELS[model]
+
+    directory = archive_dir_for(model)
+    os.makedirs(directory, exist_ok=True)
+
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = list(
+            model.objects.filter(**{f"{ts_field}__lt": older_than})
+            .order_by("id")
+            .values(*fields)[:batch_size]
+        )
+        if not rows:
+            break
+
+        write_archive_file(directory, rows, ts_field)
+
+        ids = [row["id"] for row in rows]
+        with transaction.atomic():
+            model.objects.filter(id__in=ids).delete()
+
+        if model is Notification:
+            invalidate_unread_counts(row["user_id"] for row in rows if not row["is_read"])
+
+        archived += len(rows)
+        batches += 1
+
+    return archived
+
+
+def write_archive_file(directory, rows, ts_field):
+    timestamps = [row[ts_field] for row in rows]
+    name = "{:%Y%m%d}_{:%Y%m%d}_{}-{}.jsonl.gz".format(
+        min(timestamps), max(timestamps), rows[0]["id"], rows[-1]["id"]
+    )
+    path = os.path.join(directory, name)
+    tmp_path = path + ".tmp"
+
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, cls=DjangoJSONEncoder))
+            f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def purge_read_notifications(older_than, batch_size=None):
+    """Delete read notifications created before `older_than`, in batches."""
+    batch_size = batch_size or get_retention_settings()["BATCH_SIZE"]
+
+    deleted = 0
+    while True:
+        ids = list(
+            Notification.objects.filter(is_read=True, created_at__lt=older_than)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        deleted += Notification.objects.filter(id__in=ids).delete()[0]
+
+    return deleted
+
+
+def invalidate_unread_counts(user_ids):
+    cache.delete_many([unread_count_key(user_id) for user_id in set(user_ids)])
+
+
+def apply_retention(now=None, max_batches=None):
+    """Run every retention rule once. Returns a dict of row counts per rule."""
+    conf = get_retention_settings()
+    now = now or timezone.now()
+
+    return {
+        "activity_logs_archived": archive_rows(
+            ActivityLog, now - timedelta(days=conf["ACTIVITY_LOG_DAYS"]), max_batches=max_batches
+        ),
+        "read_notifications_deleted": purge_read_notifications(
+            now - timedelta(days=conf["READ_NOTIFICATION_TTL_DAYS"])
+        ),
+        "notifications_archived": archive_rows(
+            Notification, now - timedelta(days=conf["NOTIFICATION_DAYS"]), max_batches=max_batches
+        ),
+    }
+
+
+# ============================================================
+#   READING ARCHIVES (slow admin path)
+# ============================================================
+def search_archive(model, date_from=None, date_to=None, user_id=None, activity_type=None, limit=100):
+    """
+    Scan archived rows of `model`, newest files first. `date_from`/`date_to`
+    are dates (inclusive); only files whose date range overlaps them are opened.
+    """
+    directory = archive_dir_for(model)
+    if not os.path.isdir(directory):
+        return []
+
+    _, ts_field, _ = ARCHIVED_MODELS[model]
+    start = timezone.make_aware(datetime.combine(date_from, dt_time.min)) if date_from else None
+    end = timezone.make_aware(datetime.combine(date_to, dt_time.max)) if date_to else None
+
+    results = []
+    for name in sorted(os.listdir(directory), key=archive_file_sort_key, reverse=True):
+        if not name.endswith(".jsonl.gz"):
+            continue
+
+        first_day, last_day = name.split("_")[:2]
+        if date_from and last_day < date_from.strftime("%Y%m%d"):
+            continue
+        if date_to and first_day > date_to.strftime("%Y%m%d"):
+            continue
+
+        with gzip.open(os.path.join(directory, name), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                ts = parse_datetime(row[ts_field])
+
+                if start and ts < start:
+                    continue
+                if end and ts > end:
+                    continue
+                if user_id is not None and row["user_id"] != user_id:
+                    continue
+                if activity_type and row.get("type") != activity_type:
+                    continue
+
+                results.append(row)
+
+        if len(results) >= limit:
+            break
+
+    results.sort(key=lambda row: row[ts_field], reverse=True)
+    return results[:limit]
+
+
+def archive_file_sort_key(name):
+    # <min date>_<max date>_<first id>-<last id>.jsonl.gz -> order by first id
+    try:
+        return int(name.split("_")[2].split("-")[0])
+    except (IndexError, ValueError):
+        return 0
@@ -0,0 +1,7 @@
+from django.urls import path
+from .stream import NotificationStreamConsumer
+
+# HTTP routes served by Channels consumers instead of Django views (see backend/asgi.py)
+http_urlpatterns = [
+    path('api/notifications/stream/', NotificationStreamConsumer.as_asgi(), name='notification-stream'),
+]
@@ -0,0 +1,180 @@
+# notifications/sink.py
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, InterfaceError, OperationalError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MODE": "buffered",     # "buffered" or "sync"
+    "BATCH_SIZE": 100,      # flush once this many rows are waiting
+    "FLUSH_INTERVAL": 2.0,  # ...or once the oldest row has waited this many seconds
+    "MAX_PENDING": 10000,   # rows kept for retry while writes fail; the oldest are dropped beyond this
+}
+
+
+def get_sink_settings():
+    return {**DEFAULTS, **getattr(settings, "EVENT_SINK", {})}
+
+
+class EventSink:
+    """
+    Per-process buffer for Notification and ActivityLog rows.
+
+    Rows are collected in memory and written with one bulk_create per model
+    when BATCH_SIZE rows are waiting or FLUSH_INTERVAL seconds have passed.
+    Rows emitted inside a transaction are only buffered once it commits, so
+    a rolled back request never produces notifications or log entries.
+    Durable rows (and everything in "sync" mode) are written immediately.
+    A batch that fails to write because the database is unavailable goes
+    back into the buffer and is retried; one rejected for its contents
+    (e.g. a user deleted before the flush) is written row by row and the
+    rows the database refuses are logged and dropped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._oldest = None
+        self._timer = None
+        self._flush_listeners = []
+
+    def add(self, obj, durable=False):
+        conf = get_sink_settings()
+
+        if durable or conf["MODE"] == "sync":
+            obj.save()
+            self._notify([obj])
+            return obj
+
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._enqueue(obj, conf))
+        else:
+            self._enqueue(obj, conf)
+        return obj
+
+    def connect(self, listener):
+        """Register listener(objs) to be called with every batch after it is written."""
+        if listener not in self._flush_listeners:
+            self._flush_listeners.append(listener)
+
+    def flush(self):
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+            self._oldest = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not pending:
+            return 0
+
+        by_model = {}
+        for obj in pending:
+            by_model.setdefault(type(obj), []).append(obj)
+
+        written, failed = [], []
+        for model, objs in by_model.items():
+            try:
+                with transaction.atomic():
+                    created = model.objects.bulk_create(objs)
+                written.extend(created)
+            except (OperationalError, InterfaceError):
+                logger.exception("Could not write %d %s row(s); they will be retried", len(objs), model.__name__)
+                failed.extend(_unsaved(objs))
+            except DatabaseError:
+                # Retrying the batch would fail the same way every time
+                written.extend(self._write_each(model, _unsaved(objs), failed))
+
+        if failed:
+            self._requeue(failed)
+        self._notify(written)
+        return len(written)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._buffer)
+
+    # ----------------------------------------------------------
+    #   Internals
+    # ----------------------------------------------------------
+    def _enqueue(self, obj, conf):
+        with self._lock:
+            self._buffer.append(obj)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+            should_flush = (
+                len(self._buffer) >= conf["BATCH_SIZE"]
+                or time.monotonic() - self._oldest >= conf["FLUSH_INTERVAL"]
+            )
+
+            if not should_flush and self._timer is None:
+                self._timer = threading.Timer(conf["FLUSH_INTERVAL"], self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if should_flush:
+            self.flush()
+
+    def _write_each(self, model, objs, failed):
+        written = []
+        for obj in objs:
+            try:
+                with transaction.atomic():
+                    created = model.objects.bulk_create([obj])
+                written.extend(created)
+            except (OperationalError, InterfaceError):
+                logger.exception("Could not write a %s row; it will be retried", model.__name__)
+                failed.extend(_unsaved([obj]))
+            except DatabaseError:
+                logger.exception(
+                    "Dropped a %s row for user %s that the database rejected",
+                    model.__name__, getattr(obj, "user_id", None),
+                )
+        return written
+
+    def _requeue(self, objs):
+        conf = get_sink_settings()
+        with self._lock:
+            self._buffer[:0] = objs
+            overflow = max(len(self._buffer) - conf["MAX_PENDING"], 0)
+            del self._buffer[:overflow]
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            if self._timer is None:
+                self._timer = threading.Timer(conf["FLUSH_INTERVAL"], self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if overflow:
+            logger.error("Event sink buffer is full; dropped the %d oldest row(s)", overflow)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread owns its own DB connection; don't leak it.
+            connection.close()
+
+    def _notify(self, objs):
+        for listener in self._flush_listeners:
+            listener(objs)
+
+
+def _unsaved(objs):
+    # bulk_create may have set ids before the write was rolled back
+    for obj in objs:
+        obj.pk = None
+        obj._state.adding = True
+    return objs
+
+
+event_sink = EventSink()
+
+# Don't lose buffered rows when the worker process shuts down cleanly.
+atexit.register(event_sink.flush)
@@ -0,0 +1,189 @@
+# notifications/stream.py
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.exceptions import StopConsumer
+from channels.generic.http import AsyncHttpConsumer
+from channels.layers import get_channel_layer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+from .models import Notification
+from .serializers import NotificationSerializer
+
+HEARTBEAT_SECONDS = 15
+REPLAY_LIMIT = 100
+
+# The event loop serving this process's stream consumers. Layer calls have to
+# run on it: the in-memory layer's queues only wake receivers on their own loop.
+_consumer_loop = None
+
+
+def notification_group_name(user_id):
+    return f"notifications_user_{user_id}"
+
+
+def publish_notifications(objs):
+    """
+    Event sink listener: fan new Notification rows out to the stream
+    consumers of their users through the channel layer.
+
+    Called from request threads and the sink's flush timer, so the sends are
+    handed to the consumers' event loop rather than run on a loop of our own.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    for obj in objs:
+        # Rows without a primary key can't be resumed from, so don't publish them
+        if not isinstance(obj, Notification) or obj.pk is None:
+            continue
+
+        send_to_group(
+            channel_layer,
+            notification_group_name(obj.user_id),
+            {"type": "notification.created", "id": obj.pk, "data": NotificationSerializer(obj).data},
+        )
+
+
+def send_to_group(channel_layer, group, message):
+    loop = _consumer_loop
+    if loop is not None and loop.is_running():
+        # Fire and forget: never block the caller on a slow or closing loop
+        asyncio.run_coroutine_threadsafe(channel_layer.group_send(group, message), loop)
+    else:
+        # No consumers in this process; a shared layer (channels_redis) can
+        # still reach the ones in other processes.
+        async_to_sync(channel_layer.group_send)(group, message)
+
+
+def format_event(event_id, data, event="notification"):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class NotificationStreamConsumer(AsyncHttpConsumer):
+    """
+    GET /api/notifications/stream/?token=<access token>
+
+    Server-Sent Events stream of the user's new notifications. Each event's id
+    is the notification id, so a reconnecting EventSource resumes from its
+    Last-Event-ID header (or ?last_event_id=) without missing rows.
+    """
+
+    async def http_request(self, message):
+        # Unlike the base class, keep the consumer alive after handle() so it
+        # can keep receiving channel layer messages until the client leaves.
+        if "body" in message:
+            self.body.append(message["body"])
+        if not message.get("more_body"):
+            await self.handle(b"".join(self.body))
+
+    async def handle(self, body):
+        global _consumer_loop
+        _consumer_loop = asyncio.get_running_loop()
+
+        self.group_name = None
+        self.heartbeat = None
+        self.last_sent_id = 0
+
+        user = await self.authenticate()
+        if user is None:
+            await self.send_response(
+                401,
+                json.dumps({"error": "Authentication credentials were not provided or are invalid."}).encode("utf-8"),
+                headers=[(b"Content-Type", b"application/json")],
+            )
+            raise StopConsumer()
+
+        await self.send_headers(headers=[
+            (b"Content-Type", b"text/event-stream"),
+            (b"Cache-Control", b"no-cache"),
+            (b"X-Accel-Buffering", b"no"),
+        ])
+
+        # Join the group before replaying so nothing created in between is lost;
+        # duplicates are dropped by comparing against last_sent_id.
+        self.group_name = notification_group_name(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+        self.last_sent_id = self.get_last_event_id()
+        await self.send_body(b"retry: 3000\n\n", more_body=True)
+        for event_id, data in await self.get_missed_notifications(user, self.last_sent_id):
+            await self.send_event(event_id, data)
+
+        self.heartbeat = asyncio.ensure_future(self.send_heartbeats())
+
+    async def notification_created(self, event):
+        await self.send_event(event["id"], event["data"])
+
+    async def send_event(self, event_id, data):
+        if event_id <= self.last_sent_id:
+            return
+        self.last_sent_id = event_id
+        await self.send_body(format_event(event_id, data), more_body=True)
+
+    async def send_heartbeats(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            await self.send_body(b": keepalive\n\n", more_body=True)
+
+    async def disconnect(self):
+        if getattr(self, "heartbeat", None):
+            self.heartbeat.cancel()
+        if getattr(self, "group_name", None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    # ----------------------------------------------------------
+    #   Request helpers
+    # ----------------------------------------------------------
+    def get_query_param(self, name):
+        params = parse_qs(self.scope.get("query_string", b"").decode("latin-1"))
+        values = params.get(name)
+        return values[0] if values else None
+
+    def get_header(self, name):
+        for key, value in self.scope.get("headers", []):
+            if key.decode("latin-1").lower() == name:
+                return value.decode("latin-1")
+        return None
+
+    def get_last_event_id(self):
+        raw = self.get_header("last-event-id") or self.get_query_param("last_event_id")
+        try:
+            return max(int(raw), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    async def authenticate(self):
+        # EventSource can't set headers, so the access token may come in the query string
+        raw_token = self.get_query_param("token")
+        if raw_token is None:
+            auth = self.get_header("authorization") or ""
+            parts = auth.split()
+            if len(parts) == 2 and parts[0].lower() == "bearer":
+                raw_token = parts[1]
+
+        if not raw_token:
+            return None
+
+        return await database_sync_to_async(self._user_from_token)(raw_token)
+
+    @staticmethod
+    def _user_from_token(raw_token):
+        authenticator = JWTAuthentication()
+        try:
+            return authenticator.get_user(authenticator.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+
+    @database_sync_to_async
+    def get_missed_notifications(self, user, last_id):
+        if not last_id:
+            return []
+
+        missed = Notification.objects.filter(user=user, id__gt=last_id).order_by("id")[:REPLAY_LIMIT]
+        return [(n.id, NotificationSerializer(n).data) for n in missed]
@@ -1,3 +1,380 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+import importlib
+from datetime import date, timedelta
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.testing import ApplicationCommunicator
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.authentication import UserRefreshToken
+from users.models import User
+
+from .counters import unread_count_key
+from .models import ActivityLog, Notification
+from .partitioning import (
+    add_months, convert_to_partitioned, drop_empty_partitions, is_partitioned, list_partitions, month_start,
+    partition_name,
+)
+from .retention import archive_rows
+from .sink import EventSink
+from .stream import NotificationStreamConsumer
+from .utils import create_notification, log_activity
+
+
+@override_settings(EVENT_SINK={"MODE": "sync"})
+class NotificationStreamConsumerTests(TransactionTestCase):
+    def stream(self, query_string=b""):
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/notifications/stream/",
+            "query_string": query_string,
+            "headers": [],
+        }
+        return ApplicationCommunicator(NotificationStreamConsumer.as_asgi(), scope)
+
+    async def open_stream(self, user):
+        token = await database_sync_to_async(lambda: str(UserRefreshToken.for_user(user).access_token))()
+        communicator = self.stream(f"token={token}".encode())
+        await communicator.send_input({"type": "http.request", "body": b""})
+
+        start = await communicator.receive_output(timeout=1)
+        self.assertEqual(start["status"], 200)
+        retry = await communicator.receive_output(timeout=1)
+        self.assertEqual(retry["body"], b"retry: 3000\n\n")
+        return communicator
+
+    async def close_stream(self, communicator):
+        await communicator.send_input({"type": "http.disconnect"})
+        await communicator.wait(timeout=1)
+
+    async def test_notification_from_another_thread_is_pushed_immediately(self):
+        user = await database_sync_to_async(User.objects.create_user)("reader", "reader@example.com", "pw-12345")
+        communicator = await self.open_stream(user)
+
+        def notify():
+            # Like the sink's flush timer: a plain thread with its own connection
+            try:
+                create_notification(user, "Analysis finished")
+            finally:
+                connection.close()
+
+        # Not awaited, so nothing but the publish itself wakes the event loop
+        thread = threading.Thread(target=notify)
+        thread.start()
+
+        # Well inside the heartbeat interval
+        event = await communicator.receive_output(timeout=1)
+        thread.join()
+        notification = await database_sync_to_async(Notification.objects.get)(user=user)
+        self.assertIn(f"id: {notification.pk}\n".encode(), event["body"])
+        self.assertIn(b"Analysis finished", event["body"])
+        await self.close_stream(communicator)
+
+    async def test_reconnect_replays_missed_notifications(self):
+        user = await database_sync_to_async(User.objects.create_user)("reader", "reader@example.com", "pw-12345")
+        first = await database_sync_to_async(Notification.objects.create)(user=user, message="seen")
+        missed = await database_sync_to_async(Notification.objects.create)(user=user, message="missed")
+
+        token = await database_sync_to_async(lambda: str(UserRefreshToken.for_user(user).access_token))()
+        communicator = self.stream(f"token={token}&last_event_id={first.pk}".encode())
+        await communicator.send_input({"type": "http.request", "body": b""})
+        await communicator.receive_output(timeout=1)
+        await communicator.receive_output(timeout=1)
+
+        event = await communicator.receive_output(timeout=1)
+        self.assertIn(f"id: {missed.pk}\n".encode(), event["body"])
+        await self.close_stream(communicator)
+
+    async def test_missing_token_is_refused(self):
+        communicator = self.stream()
+        await communicator.send_input({"type": "http.request", "body": b""})
+        start = await communicator.receive_output(timeout=1)
+        self.assertEqual(start["status"], 401)
+
+
+@override_settings(EVENT_SINK={"MODE": "buffered", "BATCH_SIZE": 100, "FLUSH_INTERVAL": 60})
+class EventSinkTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("reader", "reader@example.com", "pw-12345")
+        self.sink = EventSink()
+        self.addCleanup(self.sink.flush)
+
+    def add(self, obj):
+        # Rows are only buffered once the surrounding transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sink.add(obj)
+
+    def test_failed_write_is_retried(self):
+        self.add(ActivityLog(user=self.user, action="Downloaded report", type="download"))
+        self.add(Notification(user=self.user, message="Shared with you"))
+
+        with mock.patch.object(ActivityLog.objects, "bulk_create", side_effect=OperationalError("gone away")):
+            with self.assertLogs("notifications.sink", "ERROR"):
+                self.assertEqual(self.sink.flush(), 1)
+        self.assertEqual(self.sink.pending_count(), 1)
+        self.assertFalse(ActivityLog.objects.exists())
+
+        self.assertEqual(self.sink.flush(), 1)
+        self.assertEqual(self.sink.pending_count(), 0)
+        self.assertTrue(ActivityLog.objects.filter(user=self.user, type="download").exists())
+
+    def test_retry_buffer_is_bounded(self):
+        with override_settings(EVENT_SINK={"MODE": "buffered", "FLUSH_INTERVAL": 60, "MAX_PENDING": 2}):
+            for n in range(3):
+                self.add(Notification(user=self.user, message=f"n{n}"))
+            with mock.patch.object(Notification.objects, "bulk_create", side_effect=OperationalError("gone away")):
+                with self.assertLogs("notifications.sink", "ERROR"):
+                    self.sink.flush()
+        self.assertEqual(self.sink.pending_count(), 2)
+
+    def test_login_audit_entry_is_written_immediately(self):
+        response = self.client.post("/api/auth/login/", {"email": "reader@example.com", "password": "pw-12345"})
+        self.assertEqual(response.status_code, 200)
+        # Buffered rows would still be waiting on the test transaction's commit
+        self.assertTrue(ActivityLog.objects.filter(user=self.user, type="auth").exists())
+        self.assertFalse(Notification.objects.filter(user=self.user).exists())
+
+
+@override_settings(EVENT_SINK={"MODE": "buffered", "BATCH_SIZE": 100, "FLUSH_INTERVAL": 60})
+class EventSinkRejectedRowTests(TransactionTestCase):
+    # Foreign keys are checked when the write commits, which a TestCase never does
+
+    def test_row_with_deleted_user_is_dropped_alone(self):
+        user = User.objects.create_user("reader", "reader@example.com", "pw-12345")
+        gone = User.objects.create_user("gone", "gone@example.com", "pw-12345")
+        sink = EventSink()
+        sink.add(ActivityLog(user=user, action="Uploaded nda.pdf", type="upload"))
+        sink.add(ActivityLog(user_id=gone.pk, action="Logged out", type="auth"))
+        sink.add(ActivityLog(user=user, action="Analyzed nda.pdf", type="analysis"))
+        gone.delete()
+
+        with self.assertLogs("notifications.sink", "ERROR") as logs:
+            self.assertEqual(sink.flush(), 2)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(sink.pending_count(), 0)
+        self.assertEqual(
+            set(ActivityLog.objects.values_list("type", flat=True)), {"upload", "analysis"},
+        )
+
+
+@override_settings(EVENT_SINK={"MODE": "sync"}, SHARED_CACHE=True)
+class UnreadCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("reader", "reader@example.com", "pw-12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.notifications = [create_notification(self.user, f"Update {n}") for n in range(3)]
+
+    def unread(self):
+        response = self.client.get("/api/notifications/unread-count/")
+        self.assertEqual(response.status_code, 200)
+        return response.data["unread"]
+
+    def test_count_follows_every_change(self):
+        self.assertEqual(self.unread(), 3)
+
+        create_notification(self.user, "Another update")
+        self.assertEqual(self.unread(), 4)
+
+        first, second, third = self.notifications
+        self.client.patch(f"/api/notifications/{first.pk}/read/")
+        self.client.patch(f"/api/notifications/{first.pk}/read/")
+        self.assertEqual(self.unread(), 3)
+
+        self.client.delete(f"/api/notifications/{second.pk}/delete/")
+        self.client.delete(f"/api/notifications/{first.pk}/delete/")
+        self.assertEqual(self.unread(), 2)
+
+        self.client.patch("/api/notifications/mark-all/")
+        self.assertEqual(self.unread(), 0)
+
+    def test_rows_written_outside_the_helpers(self):
+        self.assertEqual(self.unread(), 3)
+        Notification.objects.create(user=self.user, message="Written directly")
+        # The cached counter only catches up on its next recount
+        self.assertEqual(self.unread(), 3)
+
+
+@override_settings(SHARED_CACHE=False)
+class UnsharedCacheUnreadCountTests(UnreadCountTests):
+    def test_rows_written_outside_the_helpers(self):
+        self.assertEqual(self.unread(), 3)
+        Notification.objects.create(user=self.user, message="Written directly")
+        # Counted from the database every time
+        self.assertEqual(self.unread(), 4)
+        self.assertIsNone(cache.get(unread_count_key(self.user.pk)))
+
+
+@override_settings(EVENT_SINK={"MODE": "sync"})
+class ActivityTypeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("client", "client@example.com", "pw-12345")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        start = timezone.now() - timedelta(hours=1)
+        actions = ["Uploaded nda.pdf", "Analyzed nda.pdf", "Logged in", "Renamed nda.pdf", "Uploaded lease.pdf"]
+        for minutes, action in enumerate(actions):
+            log = log_activity(self.user, action)
+            ActivityLog.objects.filter(pk=log.pk).update(timestamp=start + timedelta(minutes=minutes))
+
+        other = User.objects.create_user("other", "other@example.com", "pw-12345")
+        log_activity(other, "Uploaded someone else's file")
+
+    def actions(self, **params):
+        response = self.client.get("/api/notifications/logs/", params)
+        self.assertEqual(response.status_code, 200)
+        return [row["action"] for row in response.data]
+
+    def test_type_is_stored_when_logged(self):
+        types = dict(ActivityLog.objects.filter(user=self.user).values_list("action", "type"))
+        self.assertEqual(types, {
+            "Uploaded nda.pdf": "upload",
+            "Analyzed nda.pdf": "analysis",
+            "Logged in": "auth",
+            "Renamed nda.pdf": "other",
+            "Uploaded lease.pdf": "upload",
+        })
+        self.assertEqual(log_activity(self.user, "Uploaded x", activity_type="report").type, "report")
+
+    def test_type_filter_returns_newest_first(self):
+        self.assertEqual(self.actions(type="upload"), ["Uploaded lease.pdf", "Uploaded nda.pdf"])
+        self.assertEqual(self.actions(type="AUTH"), ["Logged in"])
+
+    def test_other_selects_only_untyped_rows(self):
+        self.assertEqual(self.actions(type="other"), ["Renamed nda.pdf"])
+
+    def test_all_and_unknown_types_are_unfiltered(self):
+        everything = self.actions()
+        self.assertEqual(len(everything), 5)
+        self.assertEqual(self.actions(type="all"), everything)
+        self.assertEqual(self.actions(type="bogus"), everything)
+
+
+class ActivityTypeBackfillTests(TestCase):
+    migration = importlib.import_module("notifications.migrations.0002_activitylog_type")
+
+    def test_existing_rows_are_typed_in_batches(self):
+        user = User.objects.create_user("client", "client@example.com", "pw-12345")
+        actions = ["Uploaded nda.pdf", "Analysis complete", "Generated report", "Downloaded nda.pdf",
+                   "Logged out", "Renamed nda.pdf", ""]
+        # Rows as they were before the column existed
+        ActivityLog.objects.bulk_create(ActivityLog(user=user, action=action) for action in actions)
+
+        with mock.patch.object(self.migration, "BACKFILL_BATCH_SIZE", 2):
+            self.migration.backfill_activity_types(apps, None)
+
+        self.assertEqual(
+            list(ActivityLog.objects.order_by("id").values_list("type", flat=True)),
+            ["upload", "analysis", "report", "download", "auth", "other", "other"],
+        )
+
+
+class ArchivedActivityLogTests(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        retention = override_settings(RETENTION={"ARCHIVE_DIR": archive_dir})
+        retention.enable()
+        self.addCleanup(retention.disable)
+
+        self.admin = User.objects.create_user("admin", "admin@example.com", "pw-12345", role="admin")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+        old = (timezone.now() - timedelta(days=200)).replace(hour=12)
+        self.day = old.date().isoformat()
+        ActivityLog.objects.create(user=self.admin, action="Uploaded nda.pdf", type="upload", timestamp=old)
+        ActivityLog.objects.create(user=self.admin, action="Logged in", type="auth", timestamp=old)
+        archive_rows(ActivityLog, timezone.now() - timedelta(days=90))
+
+    def search(self, **params):
+        return self.client.get("/api/notifications/logs/archive/", params)
+
+    def test_filters_archived_rows(self):
+        response = self.search(**{"from": self.day, "to": self.day, "type": "upload"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["action"] for row in response.data], ["Uploaded nda.pdf"])
+        self.assertEqual(len(self.search(limit=1).data), 1)
+
+    def test_malformed_dates_are_rejected(self):
+        for value in ("yesterday", "2026-13-01"):
+            with self.subTest(value=value):
+                self.assertEqual(self.search(**{"from": value}).status_code, 400)
+                self.assertEqual(self.search(to=value).status_code, 400)
+
+    def test_inverted_range_is_rejected(self):
+        self.assertEqual(self.search(**{"from": "2026-02-01", "to": "2026-01-01"}).status_code, 400)
+
+    def test_non_positive_limit_is_rejected(self):
+        for value in ("0", "-5", "ten"):
+            with self.subTest(value=value):
+                self.assertEqual(self.search(limit=value).status_code, 400)
+
+    def test_admins_only(self):
+        user = User.objects.create_user("client", "client@example.com", "pw-12345")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.search().status_code, 403)
+
+
+class PartitionNamingTests(SimpleTestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(month_start(date(2026, 2, 17)), date(2026, 2, 1))
+        self.assertEqual(add_months(date(2026, 11, 1), 3), date(2027, 2, 1))
+        self.assertEqual(add_months(date(2026, 1, 1), -1), date(2025, 12, 1))
+        self.assertEqual(partition_name(date(2026, 2, 1)), "notifications_activitylog_p202602")
+
+
+@skipIf(connection.vendor == "postgresql", "partitioning is supported on PostgreSQL")
+class PartitioningUnsupportedTests(TestCase):
+    def test_command_refuses_other_databases(self):
+        self.assertFalse(is_partitioned())
+        with self.assertRaisesMessage(CommandError, "requires PostgreSQL"):
+            call_command("partition_activity_log", "--convert")
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning requires PostgreSQL")
+class PartitioningTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("reader", "reader@example.com", "pw-12345")
+        self.old = ActivityLog.objects.create(
+            user=self.user, action="Old entry", timestamp=timezone.now() - timedelta(days=400),
+        )
+        self.old_month = month_start(self.old.timestamp.date())
+        self.this_month = month_start(timezone.now().date())
+
+    def test_conversion_keeps_rows_and_accepts_new_ones(self):
+        self.assertTrue(convert_to_partitioned(months_ahead=1))
+        self.assertTrue(is_partitioned())
+        self.assertFalse(convert_to_partitioned())
+
+        months = [month for _, month in list_partitions()]
+        self.assertEqual(months[0], self.old_month)
+        self.assertEqual(months[-1], add_months(self.this_month, 1))
+
+        new = ActivityLog.objects.create(user=self.user, action="New entry")
+        self.assertGreater(new.pk, self.old.pk)
+        self.assertEqual(ActivityLog.objects.count(), 2)
+
+    def test_only_emptied_old_partitions_are_dropped(self):
+        convert_to_partitioned(months_ahead=1)
+        ActivityLog.objects.create(user=self.user, action="New entry")
+        horizon = timezone.now() - timedelta(days=90)
+
+        self.assertNotIn(partition_name(self.old_month), drop_empty_partitions(horizon))
+
+        ActivityLog.objects.filter(pk=self.old.pk).delete()
+        dropped = drop_empty_partitions(horizon)
+        self.assertIn(partition_name(self.old_month), dropped)
+        self.assertNotIn(partition_name(self.this_month), dropped)
@@ -1,15 +1,19 @@
 from django.urls import path
 from .views import (
     NotificationListView,
+    NotificationUnreadCountView,
     NotificationMarkReadView,
     NotificationMarkAllReadView,
     NotificationDeleteView,
-    ActivityLogListView
+    ActivityLogListView,
+    ArchivedActivityLogListView,
 )
 
 urlpatterns = [
     path('', NotificationListView.as_view(), name='notifications'),
     path('logs/', ActivityLogListView.as_view(), name='activity-logs'),
+    path('logs/archive/', ArchivedActivityLogListView.as_view(), name='activity-logs-archive'),
+    path('unread-count/', NotificationUnreadCountView.as_view(), name='notification-unread-count'),
 
     path('<int:pk>/read/', NotificationMarkReadView.as_view(), name='notification-read'),
     path('mark-all/', NotificationMarkAllReadView.as_view(), name='notification-mark-all'),
@@ -1,10 +1,13 @@
 from django.shortcuts import render
-from django.db import models
+from django.utils.dateparse import parse_date
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from .models import Notification, ActivityLog
 from .serializers import NotificationSerializer, ActivityLogSerializer
+from users.permissions import IsAdmin
+from .retention import search_archive
+from .counters import get_unread_count, adjust_unread_count, reset_unread_count
 
 # Create your views here.
 class NotificationListView(generics.ListAPIView):
@@ -14,17 +17,24 @@ class NotificationListView(generics.ListAPIView):
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by('-created_at')
 
+class NotificationUnreadCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread": get_unread_count(request.user.id)}, status=status.HTTP_200_OK)
+
+
 class NotificationMarkReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request, pk):
-        try:
-            notification = Notification.objects.get(pk=pk, user=request.user)
-        except Notification.DoesNotExist:
+        notifications = Notification.objects.filter(pk=pk, user=request.user)
+        if not notifications.exists():
             return Response({"error": "Notification not found."}, status=status.HTTP_404_NOT_FOUND)
-        
-        notification.is_read = True
-        notification.save()
+
+        # Only the request that actually flips the flag decrements the counter
+        marked = notifications.filter(is_read=False).update(is_read=True)
+        adjust_unread_count(request.user.id, -marked)
 
         return Response({"message": "Notification marked as read."}, status=status.HTTP_200_OK)
     
@@ -34,6 +44,7 @@ class NotificationMarkAllReadView(APIView):
 
     def patch(self, request):
         Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        reset_unread_count(request.user.id)
         return Response({"message": "All notifications marked as read."}, status=status.HTTP_200_OK)
     
 
@@ -46,12 +57,23 @@ class NotificationDeleteView(APIView):
         except Notification.DoesNotExist:
             return Response({"error": "Notification not found."}, status=status.HTTP_404_NOT_FOUND)
         
+        was_unread = not notification.is_read
         notification.delete()
+        if was_unread:
+            adjust_unread_count(request.user.id, -1)
         return Response({"message": "Notification deleted."}, status=status.HTTP_200_OK)
     
 
 
 class ActivityLogListView(generics.ListAPIView):
+    """
+    GET /api/notifications/logs/?type=<type>
+
+    ?type= filters on the stored ActivityLog.type column. Every choice,
+    including "other", now selects only rows of that type; "other" used to
+    fall through to the unfiltered list. "all", an empty value or an
+    unknown type still return everything.
+    """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ActivityLogSerializer
 
@@ -65,18 +87,56 @@ class ActivityLogListView(generics.ListAPIView):
         if filter_type and filter_type != "all":
             filter_type = filter_type.lower()
 
-            if filter_type == "upload":
-                qs = qs.filter(action__icontains="upload")
-            elif filter_type == "analysis":
-                qs = qs.filter(action__icontains="analy")
-            elif filter_type == "report":
-                qs = qs.filter(action__icontains="report")
-            elif filter_type == "download":
-                qs = qs.filter(action__icontains="download")
-            elif filter_type == "auth":
-                qs = qs.filter(
-                    models.Q(action__icontains="login")
-                    | models.Q(action__icontains="logout")
-                )
-
-        return qs.order_by("-timestamp")
\ No newline at end of file
+            if filter_type in dict(ActivityLog.TYPE_CHOICES):
+                qs = qs.filter(type=filter_type)
+
+        return qs.order_by("-timestamp")
+
+
+def _parse_day(value):
+    if not value:
+        return None
+    # parse_date returns None for text that isn't a date at all
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(value)
+    return day
+
+
+class ArchivedActivityLogListView(APIView):
+    """
+    GET /api/notifications/logs/archive/?from=YYYY-MM-DD&to=YYYY-MM-DD&user=<id>&type=<type>&limit=100
+    Admin-only search over activity logs moved to the archive by apply_retention.
+    Reads compressed files from disk, so it is much slower than the live log.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        params = request.query_params
+
+        try:
+            date_from = _parse_day(params.get("from"))
+            date_to = _parse_day(params.get("to"))
+            user_id = int(params["user"]) if params.get("user") else None
+            limit = int(params.get("limit", 100))
+        except ValueError:
+            return Response({"error": "Invalid filter."}, status=status.HTTP_400_BAD_REQUEST)
+        if date_from and date_to and date_from > date_to:
+            return Response({"error": "'from' must not be after 'to'."}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({"error": "'limit' must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, 1000)
+
+        filter_type = params.get("type")
+        if filter_type == "all":
+            filter_type = None
+
+        rows = search_archive(
+            ActivityLog,
+            date_from=date_from,
+            date_to=date_to,
+            user_id=user_id,
+            activity_type=filter_type,
+            limit=limit,
+        )
+        return Response(rows, status=status.HTTP_200_OK)
\ No newline at end of file
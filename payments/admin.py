@@ -1,9 +1,21 @@
 from django.contrib import admin
-from .models import Subscription
+from .models import Subscription, PlanLimit, StripeEvent
 # Register your models here.
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ("user", "plan", "active", "analysis_count", "billing_cycle_start", "current_period_end")
-    search_fields = ("user__username", "user__email", "stripe_customer_id", "stripe_subscription_id")
\ No newline at end of file
+    search_fields = ("user__username", "user__email", "stripe_customer_id", "stripe_subscription_id")
+
+
+@admin.register(PlanLimit)
+class PlanLimitAdmin(admin.ModelAdmin):
+    list_display = ("plan", "analysis_limit")
+
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ("stripe_event_id", "type", "customer_id", "status", "attempts", "next_attempt_at", "created", "processed_at")
+    list_filter = ("status", "type")
+    search_fields = ("stripe_event_id", "customer_id")
\ No newline at end of file
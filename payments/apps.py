@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class PaymentsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "payments"
+
+    def ready(self):
+        from .models import PlanLimit
+        from .quota import plan_limits_changed
+
+        post_save.connect(plan_limits_changed, sender=PlanLimit)
+        post_delete.connect(plan_limits_changed, sender=PlanLimit)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply Stripe webhook events recorded by the webhook endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Events to process per pass.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling for new events.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_events(limit=options["limit"])
+            if processed:
+                self.stdout.write(f"Processed {processed} event(s).")
+
+            if not options["loop"]:
+                break
+            if processed < options["limit"]:
+                time.sleep(options["interval"])
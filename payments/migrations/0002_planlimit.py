@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:08
+
+from django.db import migrations, models
+
+# Limits that used to be hard-coded in the views (None => unlimited)
+DEFAULT_PLAN_LIMITS = {"free": 3, "premium": None, "business": None}
+
+
+def seed_plan_limits(apps, schema_editor):
+    PlanLimit = apps.get_model("payments", "PlanLimit")
+    for plan, limit in DEFAULT_PLAN_LIMITS.items():
+        PlanLimit.objects.get_or_create(plan=plan, defaults={"analysis_limit": limit})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlanLimit",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "plan",
+                    models.CharField(
+                        choices=[
+                            ("free", "Free"),
+                            ("premium", "Premium"),
+                            ("business", "Business"),
+                        ],
+                        max_length=20,
+                        unique=True,
+                    ),
+                ),
+                ("analysis_limit", models.IntegerField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(seed_plan_limits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_stripeevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stripeevent",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -29,22 +29,68 @@ class Subscription(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
-    def reset_if_new_cycle(self):
-        """
-        If billing_cycle_start is more than 30 days ago, reset analysis_count and set billing_cycle_start to now.
-        (Simple monthly reset — adjust for exact billing from Stripe if needed)
-        """
-        from django.utils import timezone
-        if (timezone.now() - self.billing_cycle_start).days >= 30:
-            self.analysis_count = 0
-            self.billing_cycle_start = timezone.now()
-            self.save()
+    def cycle_expired(self, now=None):
+        """True once billing_cycle_start is a full usage cycle in the past (the next reservation resets it)."""
+        from .quota import USAGE_CYCLE_DAYS
+        now = now or timezone.now()
+        return (now - self.billing_cycle_start).days >= USAGE_CYCLE_DAYS
+
+    def current_analysis_count(self):
+        # Cycles are reset lazily by the quota service, so read paths never write
+        return 0 if self.cycle_expired() else self.analysis_count
+
+    def analysis_limit(self):
+        from .quota import get_plan_limit
+        return get_plan_limit(self.plan)
 
     def remaining_analyses(self):
-        if self.plan == 'free':
-            limit = 3
-            return max(limit - self.analysis_count, 0)
-        return -1  # -1 => unlimited
+        limit = self.analysis_limit()
+        if limit is None:
+            return -1  # -1 => unlimited
+        return max(limit - self.current_analysis_count(), 0)
+
+    def __str__(self):
+        return f"{self.user} → {self.plan} (active={self.active})"
+
+
+class PlanLimit(models.Model):
+    """Per-plan usage limits, read by payments.quota. A null limit means unlimited."""
+    plan = models.CharField(max_length=20, choices=PLAN_CHOICES, unique=True)
+    analysis_limit = models.IntegerField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.plan}: {self.analysis_limit if self.analysis_limit is not None else 'unlimited'} analyses"
+
+
+class StripeEvent(models.Model):
+    """
+    A Stripe webhook event, recorded on receipt and processed later by
+    payments.webhooks. The Stripe event id is unique, so replayed deliveries
+    are ignored.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+
+    stripe_event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    customer_id = models.CharField(max_length=255, blank=True, null=True)
+    payload = models.JSONField()
+    created = models.DateTimeField()  # when Stripe created the event
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)  # set after a failure; retried from then on
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'customer_id', 'created'], name='stripeevent_pending_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user} → {self.plan} (active={self.active})"
\ No newline at end of file
+        return f"{self.stripe_event_id} ({self.type}, {self.status})"
\ No newline at end of file
@@ -0,0 +1,82 @@
+# payments/quota.py
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import PlanLimit, Subscription
+
+USAGE_CYCLE_DAYS = 30
+PLAN_LIMITS_CACHE_KEY = "payments:plan_limits"
+PLAN_LIMITS_CACHE_TTL = 300
+
+
+def get_plan_limits():
+    """{plan: analysis_limit} from the PlanLimit table, cached briefly for read paths."""
+    return cache.get_or_set(
+        PLAN_LIMITS_CACHE_KEY,
+        lambda: dict(PlanLimit.objects.values_list("plan", "analysis_limit")),
+        PLAN_LIMITS_CACHE_TTL,
+    )
+
+
+def plan_limits_changed(sender, **kwargs):
+    """
+    post_save/post_delete receiver for PlanLimit (connected in apps.py).
+    The cache is cleared once the change commits, so a concurrent read can't
+    put the old limits back. QuerySet.update() sends no signal; clear
+    PLAN_LIMITS_CACHE_KEY yourself after one.
+    """
+    transaction.on_commit(lambda: cache.delete(PLAN_LIMITS_CACHE_KEY))
+
+
+def get_plan_limit(plan):
+    # Plans without a PlanLimit row are unlimited
+    return get_plan_limits().get(plan)
+
+
+def reserve_analysis(user, count=1):
+    """
+    Atomically take `count` analyses from the user's quota, all or nothing.
+
+    A single conditional UPDATE increments analysis_count only while the
+    result stays within the plan's limit, and restarts the usage cycle in the
+    same statement when the current one has expired. Concurrent requests
+    therefore can't overshoot the limit. Returns True if the units were reserved.
+    """
+    now = timezone.now()
+    cycle_expired = Q(billing_cycle_start__lte=now - timedelta(days=USAGE_CYCLE_DAYS))
+    limit = PlanLimit.objects.filter(plan=OuterRef("plan")).values("analysis_limit")[:1]
+    limited = PlanLimit.objects.filter(plan=OuterRef("plan"), analysis_limit__isnull=False)
+    limit_below_count = PlanLimit.objects.filter(plan=OuterRef("plan"), analysis_limit__lt=count)
+
+    reserved = (
+        Subscription.objects.filter(user=user)
+        .filter(
+            (cycle_expired & ~Exists(limit_below_count))
+            | ~Exists(limited)
+            | Q(analysis_count__lte=Subquery(limit) - count)
+        )
+        .update(
+            analysis_count=Case(When(cycle_expired, then=Value(count)), default=F("analysis_count") + count),
+            billing_cycle_start=Case(When(cycle_expired, then=Value(now)), default=F("billing_cycle_start")),
+        )
+    )
+    if reserved:
+        return True
+
+    # First analysis for a user without a subscription row: start them on free
+    _, created = Subscription.objects.get_or_create(user=user)
+    if created:
+        return reserve_analysis(user, count)
+    return False
+
+
+def release_analysis(user, count=1):
+    """Give back units taken by reserve_analysis when the analysis failed."""
+    Subscription.objects.filter(user=user, analysis_count__gt=0).update(
+        analysis_count=Greatest(F("analysis_count") - count, 0)
+    )
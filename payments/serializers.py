@@ -3,6 +3,7 @@ from rest_framework import serializers
 from .models import Subscription
 
 class SubscriptionSerializer(serializers.ModelSerializer):
+    analysis_count = serializers.SerializerMethodField()
     analyses_remaining = serializers.SerializerMethodField()
     analyses_limit = serializers.SerializerMethodField()
 
@@ -10,10 +11,12 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         model = Subscription
         fields = ["plan", "active", "analysis_count", "billing_cycle_start", "current_period_end", "cancel_at_period_end", "analyses_remaining", "analyses_limit"]
 
+    def get_analysis_count(self, obj):
+        return obj.current_analysis_count()
+
     def get_analyses_remaining(self, obj):
         return obj.remaining_analyses()
 
     def get_analyses_limit(self, obj):
-        if obj.plan == 'free':
-            return 3
-        return -1  # unlimited
+        limit = obj.analysis_limit()
+        return -1 if limit is None else limit  # -1 => unlimited
@@ -1,3 +1,198 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from users.models import User
+
+from .models import PlanLimit, StripeEvent, Subscription
+from .quota import USAGE_CYCLE_DAYS, get_plan_limit, release_analysis, reserve_analysis
+from .webhooks import MAX_ATTEMPTS, process_pending_events, record_event
+
+
+class WebhookProcessingTests(TestCase):
+    def setUp(self):
+        self.applied = []
+        self.failing = set()
+
+        def handler(obj, stripe_client):
+            if obj["id"] in self.failing:
+                raise RuntimeError(f"{obj['id']} failed")
+            self.applied.append(obj["id"])
+
+        patcher = mock.patch.dict("payments.webhooks.EVENT_HANDLERS", {"test.event": handler})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record(self, event_id, customer, created):
+        record_event({
+            "id": event_id,
+            "type": "test.event",
+            "created": created,
+            "data": {"object": {"id": event_id, "customer": customer}},
+        })
+
+    def retry_now(self):
+        StripeEvent.objects.filter(status="pending").update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_replayed_delivery_is_recorded_once(self):
+        self.record("evt_1", "cus_a", 1000)
+        self.record("evt_1", "cus_a", 1000)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_events_apply_oldest_first(self):
+        self.record("evt_2", "cus_a", 2000)
+        self.record("evt_1", "cus_a", 1000)
+
+        self.assertEqual(process_pending_events(), 2)
+        self.assertEqual(self.applied, ["evt_1", "evt_2"])
+
+    def test_failure_blocks_only_that_customers_later_events(self):
+        self.record("evt_1", "cus_a", 1000)
+        self.record("evt_2", "cus_a", 2000)
+        self.record("evt_3", "cus_b", 3000)
+        self.failing.add("evt_1")
+
+        self.assertEqual(process_pending_events(), 1)
+        self.assertEqual(self.applied, ["evt_3"])
+        self.assertEqual(StripeEvent.objects.get(stripe_event_id="evt_2").status, "pending")
+
+        self.failing.clear()
+        self.retry_now()
+        self.assertEqual(process_pending_events(), 2)
+        self.assertEqual(self.applied, ["evt_3", "evt_1", "evt_2"])
+
+    def test_failed_event_backs_off(self):
+        self.record("evt_1", "cus_a", 1000)
+        self.failing.add("evt_1")
+        process_pending_events()
+
+        event = StripeEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+        # Not due yet: no attempt is made
+        self.failing.clear()
+        self.assertEqual(process_pending_events(), 0)
+        self.assertEqual(StripeEvent.objects.get().attempts, 1)
+
+        self.retry_now()
+        self.assertEqual(process_pending_events(), 1)
+
+    def test_backoff_grows_with_attempts(self):
+        self.record("evt_1", "cus_a", 1000)
+        self.failing.add("evt_1")
+
+        delays = []
+        for _ in range(3):
+            before = timezone.now()
+            process_pending_events()
+            delays.append(StripeEvent.objects.get().next_attempt_at - before)
+            self.retry_now()
+        self.assertLess(delays[0], delays[1])
+        self.assertLess(delays[1], delays[2])
+
+    def test_gives_up_after_max_attempts(self):
+        self.record("evt_1", "cus_a", 1000)
+        self.failing.add("evt_1")
+
+        for _ in range(MAX_ATTEMPTS):
+            process_pending_events()
+            self.retry_now()
+
+        event = StripeEvent.objects.get()
+        self.assertEqual(event.status, "failed")
+        self.assertEqual(event.attempts, MAX_ATTEMPTS)
+        self.assertEqual(event.last_error, "evt_1 failed")
+        self.assertEqual(process_pending_events(), 0)
+
+
+class PlanLimitCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.limit, _ = PlanLimit.objects.update_or_create(plan="free", defaults={"analysis_limit": 5})
+
+    def test_saved_limit_is_read_back(self):
+        self.assertEqual(get_plan_limit("free"), 5)
+
+        self.limit.analysis_limit = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            self.limit.save()
+        self.assertEqual(get_plan_limit("free"), 10)
+
+    def test_deleted_limit_means_unlimited(self):
+        self.assertEqual(get_plan_limit("free"), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PlanLimit.objects.filter(plan="free").delete()
+        self.assertIsNone(get_plan_limit("free"))
+
+
+class QuotaTests(TestCase):
+    # The free plan is seeded with a limit of 3 analyses per cycle
+
+    def setUp(self):
+        self.user = User.objects.create_user("client", "client@example.com", "pw-12345")
+
+    def subscription(self, **fields):
+        Subscription.objects.update_or_create(user=self.user, defaults=fields)
+        return Subscription.objects.get(user=self.user)
+
+    def count(self):
+        return Subscription.objects.get(user=self.user).analysis_count
+
+    def test_limit_is_enforced(self):
+        self.subscription(plan="free")
+        self.assertEqual([reserve_analysis(self.user) for _ in range(4)], [True, True, True, False])
+        self.assertEqual(self.count(), 3)
+
+    def test_missing_subscription_starts_on_free(self):
+        self.assertTrue(reserve_analysis(self.user))
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertEqual((subscription.plan, subscription.analysis_count), ("free", 1))
+
+    def test_expired_cycle_is_reset_by_the_reservation(self):
+        started = timezone.now() - timedelta(days=USAGE_CYCLE_DAYS + 1)
+        self.subscription(plan="free", analysis_count=3, billing_cycle_start=started)
+
+        self.assertTrue(reserve_analysis(self.user))
+        subscription = Subscription.objects.get(user=self.user)
+        self.assertEqual(subscription.analysis_count, 1)
+        self.assertGreater(subscription.billing_cycle_start, started + timedelta(days=USAGE_CYCLE_DAYS))
+
+    def test_expired_cycle_still_refuses_more_than_the_limit(self):
+        started = timezone.now() - timedelta(days=USAGE_CYCLE_DAYS + 1)
+        self.subscription(plan="free", analysis_count=3, billing_cycle_start=started)
+
+        self.assertFalse(reserve_analysis(self.user, 4))
+        self.assertEqual(Subscription.objects.get(user=self.user).billing_cycle_start, started)
+
+    def test_multi_unit_reservation_is_all_or_nothing(self):
+        self.subscription(plan="free")
+        self.assertTrue(reserve_analysis(self.user, 2))
+        self.assertFalse(reserve_analysis(self.user, 2))
+        self.assertEqual(self.count(), 2)
+        self.assertTrue(reserve_analysis(self.user, 1))
+
+    def test_release_never_goes_below_zero(self):
+        self.subscription(plan="free")
+        reserve_analysis(self.user, 2)
+
+        release_analysis(self.user)
+        self.assertEqual(self.count(), 1)
+        release_analysis(self.user, 5)
+        self.assertEqual(self.count(), 0)
+        release_analysis(self.user)
+        self.assertEqual(self.count(), 0)
 
-# Create your tests here.
+    def test_plans_without_a_limit_are_unlimited(self):
+        # premium has a null limit; business loses its row entirely
+        PlanLimit.objects.filter(plan="business").delete()
+        for plan in ("premium", "business"):
+            with self.subTest(plan=plan):
+                self.subscription(plan=plan, analysis_count=0)
+                self.assertTrue(all(reserve_analysis(self.user, 10) for _ in range(5)))
+                self.assertEqual(self.count(), 50)
@@ -1,15 +1,16 @@
 # payments/views.py
+import json
 import os
 import stripe
 from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from .models import Subscription
 from .serializers import SubscriptionSerializer
+from .webhooks import record_event
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 
@@ -104,9 +105,9 @@ class SubscriptionStatusView(APIView):
 
     def get(self, request):
         sub_obj = get_or_create_subscription(request.user)
-        sub_obj.reset_if_new_cycle()
 
         serializer = SubscriptionSerializer(sub_obj)
+        limit = sub_obj.analysis_limit()
 
         return Response({
             "plan": sub_obj.plan,
@@ -114,8 +115,8 @@ class SubscriptionStatusView(APIView):
             "current_period_end": sub_obj.current_period_end,
             "cancel_at_period_end": sub_obj.cancel_at_period_end,
             "usage": {
-                "analyses_used": sub_obj.analysis_count,
-                "analyses_limit": -1 if sub_obj.plan != "free" else 3,
+                "analyses_used": sub_obj.current_analysis_count(),
+                "analyses_limit": -1 if limit is None else limit,
             },
             **serializer.data
         })
@@ -134,99 +135,15 @@ def stripe_webhook(request):
 
     # Validate
     try:
-        event = stripe.Webhook.construct_event(
+        stripe.Webhook.construct_event(
             payload, sig_header, webhook_secret
         )
+        event = json.loads(payload)
     except Exception:
         return HttpResponse(status=400)
 
-    # Handle event types
-    try:
-        # -------------------------
-        # CHECKOUT COMPLETED
-        # -------------------------
-        if event["type"] == "checkout.session.completed":
-            session = event["data"]["object"]
-            customer_id = session.get("customer")
-            metadata = session.get("metadata", {})
-            user_id = metadata.get("user_id")
-            plan = metadata.get("plan")
-
-            stripe_sub_id = session.get("subscription")
-
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            user = User.objects.filter(id=user_id).first()
-
-            if user:
-                sub_obj, _ = Subscription.objects.get_or_create(user=user)
-                sub_obj.stripe_customer_id = customer_id
-                sub_obj.stripe_subscription_id = stripe_sub_id
-                sub_obj.plan = plan
-                sub_obj.active = True
-
-                # Subscription period
-                try:
-                    stripe_sub = stripe.Subscription.retrieve(stripe_sub_id)
-                    period_end = stripe_sub["current_period_end"]
-                    sub_obj.current_period_end = timezone.datetime.fromtimestamp(
-                        period_end, tz=timezone.utc
-                    )
-                except Exception:
-                    pass
-
-                sub_obj.save()
-
-        # -------------------------
-        # SUBSCRIPTION UPDATED
-        # -------------------------
-        elif event["type"] == "customer.subscription.updated":
-            sub = event["data"]["object"]
-            stripe_sub_id = sub.get("id")
-            customer_id = sub.get("customer")
-            status = sub.get("status")
-
-            plan_items = sub.get("items", {}).get("data", [])
-            plan_price_id = plan_items[0]["price"]["id"] if plan_items else None
-
-            try:
-                subscription_obj = Subscription.objects.get(stripe_subscription_id=stripe_sub_id)
-            except Subscription.DoesNotExist:
-                subscription_obj = Subscription.objects.filter(stripe_customer_id=customer_id).first()
-
-            if subscription_obj:
-                subscription_obj.active = status in ("active", "trialing")
-                subscription_obj.current_period_end = timezone.datetime.fromtimestamp(
-                    sub.get("current_period_end"), tz=timezone.utc
-                )
-
-                # Map Stripe price → plan label
-                if plan_price_id == os.environ.get("STRIPE_PRICE_ID_PREMIUM"):
-                    subscription_obj.plan = "premium"
-                elif plan_price_id == os.environ.get("STRIPE_PRICE_ID_BUSINESS"):
-                    subscription_obj.plan = "business"
-
-                subscription_obj.cancel_at_period_end = sub.get("cancel_at_period_end", False)
-                subscription_obj.save()
-
-        # -------------------------
-        # SUBSCRIPTION DELETED
-        # -------------------------
-        elif event["type"] == "customer.subscription.deleted":
-            sub = event["data"]["object"]
-            stripe_sub_id = sub.get("id")
-
-            try:
-                subscription_obj = Subscription.objects.get(stripe_subscription_id=stripe_sub_id)
-                subscription_obj.active = False
-                subscription_obj.plan = "free"
-                subscription_obj.analysis_count = 0
-                subscription_obj.stripe_subscription_id = None
-                subscription_obj.save()
-            except Subscription.DoesNotExist:
-                pass
-
-    except Exception:
-        return HttpResponse(status=500)
+    # Record and acknowledge right away; payments.webhooks.process_pending_events
+    # applies it (run via `manage.py process_stripe_events`).
+    record_event(event)
 
     return HttpResponse(status=200)
@@ -0,0 +1,186 @@
+# payments/webhooks.py
+import os
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import stripe
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StripeEvent, Subscription
+
+MAX_ATTEMPTS = 5
+# Failed events wait RETRY_BASE_SECONDS, doubling with each attempt up to RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+
+def record_event(payload):
+    """
+    Store a verified webhook payload for the processor. An event id that was
+    seen before (a Stripe retry or replay) is silently ignored.
+    """
+    data_object = payload.get("data", {}).get("object", {}) or {}
+    event = StripeEvent(
+        stripe_event_id=payload["id"],
+        type=payload.get("type", ""),
+        customer_id=data_object.get("customer"),
+        payload=payload,
+        created=_from_timestamp(payload.get("created")) or timezone.now(),
+    )
+    # INSERT ... ON CONFLICT DO NOTHING: one round trip, no race between duplicates
+    StripeEvent.objects.bulk_create([event], ignore_conflicts=True)
+
+
+# ============================================================
+#   PROCESSOR
+# ============================================================
+def process_pending_events(limit=100, stripe_client=None):
+    """
+    Apply pending webhook events, oldest first and in order per customer.
+
+    If an event fails, it is retried with exponential backoff and later
+    events for the same customer wait until it has gone through, so a
+    subscription update never overtakes the checkout that created it. Events
+    are given up on (status 'failed') after MAX_ATTEMPTS. Returns the number
+    of events processed.
+    """
+    stripe_client = stripe_client or stripe
+    processed = 0
+    blocked_customers = set()
+    now = timezone.now()
+
+    pending = StripeEvent.objects.filter(status="pending").order_by("created", "id")[:limit]
+    for event in pending:
+        if event.customer_id and event.customer_id in blocked_customers:
+            continue
+        if event.next_attempt_at and event.next_attempt_at > now:
+            # Backing off; its customer's later events keep waiting behind it
+            blocked_customers.add(event.customer_id)
+            continue
+
+        with transaction.atomic():
+            locked = (
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(pk=event.pk, status="pending")
+                .first()
+            )
+            if locked is None:
+                # Taken by another worker; keep its customer's later events in order
+                blocked_customers.add(event.customer_id)
+                continue
+
+            try:
+                with transaction.atomic():
+                    apply_event(locked.payload, stripe_client)
+            except Exception as e:
+                locked.attempts += 1
+                locked.last_error = str(e)
+                if locked.attempts >= MAX_ATTEMPTS:
+                    locked.status = "failed"
+                else:
+                    locked.next_attempt_at = timezone.now() + retry_delay(locked.attempts)
+                locked.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+                blocked_customers.add(locked.customer_id)
+                continue
+
+            locked.status = "processed"
+            locked.attempts += 1
+            locked.processed_at = timezone.now()
+            locked.save(update_fields=["status", "attempts", "processed_at"])
+            processed += 1
+
+    return processed
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def apply_event(payload, stripe_client):
+    handler = EVENT_HANDLERS.get(payload.get("type"))
+    if handler:
+        handler(payload["data"]["object"], stripe_client)
+
+
+def _from_timestamp(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value else None
+
+
+# ============================================================
+#   EVENT HANDLERS
+# ============================================================
+def handle_checkout_completed(session, stripe_client):
+    customer_id = session.get("customer")
+    metadata = session.get("metadata", {})
+    user_id = metadata.get("user_id")
+    plan = metadata.get("plan")
+
+    stripe_sub_id = session.get("subscription")
+
+    User = get_user_model()
+    user = User.objects.filter(id=user_id).first()
+
+    if user:
+        sub_obj, _ = Subscription.objects.get_or_create(user=user)
+        sub_obj.stripe_customer_id = customer_id
+        sub_obj.stripe_subscription_id = stripe_sub_id
+        sub_obj.plan = plan
+        sub_obj.active = True
+
+        # Subscription period
+        try:
+            stripe_sub = stripe_client.Subscription.retrieve(stripe_sub_id)
+            sub_obj.current_period_end = _from_timestamp(stripe_sub["current_period_end"])
+        except Exception:
+            pass
+
+        sub_obj.save()
+
+
+def handle_subscription_updated(sub, stripe_client):
+    stripe_sub_id = sub.get("id")
+    customer_id = sub.get("customer")
+    status = sub.get("status")
+
+    plan_items = sub.get("items", {}).get("data", [])
+    plan_price_id = plan_items[0]["price"]["id"] if plan_items else None
+
+    try:
+        subscription_obj = Subscription.objects.get(stripe_subscription_id=stripe_sub_id)
+    except Subscription.DoesNotExist:
+        subscription_obj = Subscription.objects.filter(stripe_customer_id=customer_id).first()
+
+    if subscription_obj:
+        subscription_obj.active = status in ("active", "trialing")
+        subscription_obj.current_period_end = _from_timestamp(sub.get("current_period_end"))
+
+        # Map Stripe price → plan label
+        if plan_price_id == os.environ.get("STRIPE_PRICE_ID_PREMIUM"):
+            subscription_obj.plan = "premium"
+        elif plan_price_id == os.environ.get("STRIPE_PRICE_ID_BUSINESS"):
+            subscription_obj.plan = "business"
+
+        subscription_obj.cancel_at_period_end = sub.get("cancel_at_period_end", False)
+        subscription_obj.save()
+
+
+def handle_subscription_deleted(sub, stripe_client):
+    stripe_sub_id = sub.get("id")
+
+    try:
+        subscription_obj = Subscription.objects.get(stripe_subscription_id=stripe_sub_id)
+        subscription_obj.active = False
+        subscription_obj.plan = "free"
+        subscription_obj.analysis_count = 0
+        subscription_obj.stripe_subscription_id = None
+        subscription_obj.save()
+    except Subscription.DoesNotExist:
+        pass
+
+
+EVENT_HANDLERS = {
+    "checkout.session.completed": handle_checkout_completed,
+    "customer.subscription.updated": handle_subscription_updated,
+    "customer.subscription.deleted": handle_subscription_deleted,
+}
@@ -0,0 +1,121 @@
+# users/authentication.py
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+
+AUTH_VERSION_CLAIM = "auth_version"
+
+# User fields carried inside tokens so requests don't have to load the user row
+USER_CLAIMS = ("username", "email", "role", "is_staff", "is_superuser")
+
+# How long a user's auth_version is trusted from the cache before re-reading it
+AUTH_VERSION_CACHE_TTL = getattr(settings, "AUTH_VERSION_CACHE_TTL", 60)
+
+
+def auth_version_key(user_id):
+    return f"users:auth_version:{user_id}"
+
+
+def get_auth_version(user_id):
+    """
+    Current auth_version of an active user (None if missing or inactive).
+
+    Cached briefly only when settings.SHARED_CACHE is set: forget_auth_version
+    clears the cache of the process that changed the user, and a per-process
+    cache elsewhere would keep trusting stale claims until the TTL ran out.
+    """
+    User = get_user_model()
+    active_version = (
+        User.objects.filter(pk=user_id, is_active=True)
+        .values_list("auth_version", flat=True)
+    )
+    if not getattr(settings, "SHARED_CACHE", False):
+        return active_version.first()
+
+    key = auth_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = active_version.first()
+        # Cache "no such active user" too, as -1
+        cache.set(key, -1 if version is None else version, AUTH_VERSION_CACHE_TTL)
+    return None if version == -1 else version
+
+
+def forget_auth_version(user_id):
+    cache.delete(auth_version_key(user_id))
+
+
+def stamp_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[AUTH_VERSION_CLAIM] = user.auth_version
+    return token
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token whose access tokens also carry the user's role and identity."""
+
+    @classmethod
+    def for_user(cls, user):
+        return stamp_user_claims(super().for_user(user), user)
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-stamps user claims on refresh so tokens catch up with role changes."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+
+        access = AccessToken(data["access"])
+        user = get_user_model().objects.filter(pk=access.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None:
+            return data
+
+        data["access"] = str(stamp_user_claims(access, user))
+        if "refresh" in data:
+            data["refresh"] = str(stamp_user_claims(RefreshToken(data["refresh"]), user))
+        return data
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token's claims
+    instead of loading the user row on every request.
+
+    The claims are only trusted while their auth_version matches the user's
+    current one. With a shared cache that version is cached for
+    AUTH_VERSION_CACHE_TTL seconds; without one it is read from the database
+    (a single column, by primary key) on every request. Changing a user's
+    role, password or active flag, through save() or QuerySet.update(),
+    bumps auth_version, and then the user is loaded from the database as
+    before.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        claims_version = validated_token.get(AUTH_VERSION_CLAIM)
+
+        if (
+            user_id is None
+            or claims_version is None
+            or any(claim not in validated_token for claim in USER_CLAIMS)
+            or get_auth_version(user_id) != claims_version
+        ):
+            return super().get_user(validated_token)
+
+        User = get_user_model()
+        user = User(
+            # simplejwt stores the id as a string; compare like a loaded user
+            pk=User._meta.pk.to_python(user_id),
+            is_active=True,
+            auth_version=claims_version,
+            **{claim: validated_token[claim] for claim in USER_CLAIMS},
+        )
+        user._state.adding = False
+        user._state.db = "default"
+        user._built_from_token = True
+        return user
@@ -0,0 +1,172 @@
+# users/google_auth.py
+import base64
+import json
+import re
+import threading
+import time
+
+from google.auth.transport import requests as google_requests
+from google.oauth2 import id_token
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"  # what verify_oauth2_token reads
+
+DEFAULT_MAX_AGE = 3600      # used when Google sends no usable Cache-Control
+REFRESH_AHEAD = 300         # refresh in the background this long before expiry
+MIN_REFETCH_INTERVAL = 60   # never force a refetch more often than this
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class CachedResponse:
+    """The parts of a google.auth.transport.Response that id_token reads."""
+
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data
+
+
+class CachingCertsTransport:
+    """
+    A google.auth transport for fetching signing certificates that caches
+    each response for as long as its Cache-Control / Age headers allow.
+
+    One instance is shared by all threads. Expired entries are fetched again
+    under a lock. Entries close to expiry are refreshed by a background thread
+    while the cached copy is still served. If a fetch fails, the last good copy
+    is served so a Google outage does not block logins.
+
+    `fetch` is the transport used for the real HTTP request; tests can pass a
+    local stand-in that serves their own key set.
+    """
+
+    def __init__(self, fetch=None):
+        self._fetch = fetch or google_requests.Request()
+        self._lock = threading.Lock()
+        self._entries = {}       # url -> (CachedResponse, fetched_at, expires_at)
+        self._refreshing = set()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET":
+            return self._fetch(url, method=method, body=body, headers=headers, timeout=timeout, **kwargs)
+
+        entry = self._entries.get(url)
+        now = time.monotonic()
+
+        if entry is None or now >= entry[2]:
+            with self._lock:
+                entry = self._entries.get(url)
+                if entry is None or time.monotonic() >= entry[2]:
+                    entry = self._refresh(url, fallback=entry)
+        elif now >= entry[2] - REFRESH_AHEAD:
+            self._refresh_in_background(url)
+
+        return entry[0]
+
+    def invalidate(self, url=None):
+        """Drop cached certificates (all of them without `url`), at most once per MIN_REFETCH_INTERVAL."""
+        dropped = False
+        with self._lock:
+            now = time.monotonic()
+            for key in [url] if url else list(self._entries):
+                entry = self._entries.get(key)
+                if entry and now - entry[1] >= MIN_REFETCH_INTERVAL:
+                    del self._entries[key]
+                    dropped = True
+        return dropped
+
+    # ----------------------------------------------------------
+    #   Internals
+    # ----------------------------------------------------------
+    def _refresh(self, url, fallback=None):
+        try:
+            response = self._fetch(url, method="GET")
+        except Exception:
+            if fallback is None:
+                raise
+            return self._serve_stale(url, fallback)
+
+        if response.status != 200:
+            if fallback is not None:
+                return self._serve_stale(url, fallback)
+            return (CachedResponse(response.status, dict(response.headers), response.data), 0, 0)
+
+        now = time.monotonic()
+        entry = (
+            CachedResponse(response.status, dict(response.headers), response.data),
+            now,
+            now + self._max_age(response.headers),
+        )
+        self._entries[url] = entry
+        return entry
+
+    def _serve_stale(self, url, entry):
+        # Keep the last good copy a little longer rather than retrying on every login
+        entry = (entry[0], entry[1], time.monotonic() + MIN_REFETCH_INTERVAL)
+        self._entries[url] = entry
+        return entry
+
+    def _refresh_in_background(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def run():
+            try:
+                with self._lock:
+                    self._refresh(url, fallback=self._entries.get(url))
+            finally:
+                self._refreshing.discard(url)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @staticmethod
+    def _max_age(headers):
+        headers = {k.lower(): v for k, v in dict(headers).items()}
+        match = _MAX_AGE_RE.search(headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE
+        try:
+            max_age -= int(headers.get("age", 0))
+        except ValueError:
+            pass
+        return max(max_age, 0)
+
+
+google_certs_transport = CachingCertsTransport()
+
+
+def verify_google_id_token(credential, audience, transport=None):
+    """
+    Verify a Google Sign-In ID token against cached signing certificates.
+
+    If the token is signed with a key the cached certificates don't have
+    (Google rotated its keys since the last fetch), they are refetched once
+    and verification is retried. Other failures, such as an expired token or
+    a wrong audience, are raised straight away.
+    """
+    transport = transport or google_certs_transport
+    try:
+        return id_token.verify_oauth2_token(credential, transport, audience)
+    except ValueError:
+        key_id = token_key_id(credential)
+        if key_id is None or key_id in cached_key_ids(transport) or not transport.invalidate(GOOGLE_CERTS_URL):
+            raise
+        return id_token.verify_oauth2_token(credential, transport, audience)
+
+
+def token_key_id(credential):
+    """The `kid` from a JWT's (unverified) header, or None if it can't be read."""
+    try:
+        header = credential.split(".", 1)[0]
+        return json.loads(base64.urlsafe_b64decode(header + "=" * (-len(header) % 4))).get("kid")
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def cached_key_ids(transport):
+    response = transport(GOOGLE_CERTS_URL)
+    try:
+        return set(json.loads(response.data)) if response.status == 200 else set()
+    except (TypeError, ValueError):
+        return set()
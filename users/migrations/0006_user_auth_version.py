@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_assignmentrequest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="auth_version",
+            field=models.IntegerField(default=0),
+        ),
+    ]
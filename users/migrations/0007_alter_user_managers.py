@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:26
+
+import users.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_user_auth_version"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", users.models.UserManager()),
+            ],
+        ),
+    ]
@@ -1,5 +1,27 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
 from django.db import models
+from django.db.models import F
+
+
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # QuerySet.update (and bulk_update) skip User.save, so bump
+        # auth_version here too or tokens would keep the old claims
+        if "auth_version" in kwargs or not set(kwargs) & set(self.model.AUTH_STATE_FIELDS):
+            return super().update(**kwargs)
+
+        user_ids = list(self.values_list("pk", flat=True))
+        rows = super().update(auth_version=F("auth_version") + 1, **kwargs)
+
+        from .authentication import forget_auth_version
+        for user_id in user_ids:
+            forget_auth_version(user_id)
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
 
 # Create your models here.
 class User(AbstractUser):
@@ -11,6 +33,51 @@ class User(AbstractUser):
 
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='individual')
 
+    # Bumped whenever the claims carried in access tokens go stale
+    # (see users/authentication.py)
+    auth_version = models.IntegerField(default=0)
+
+    objects = UserManager()
+
+    # Changes to these fields invalidate claims in tokens already issued
+    AUTH_STATE_FIELDS = ('role', 'password', 'is_active', 'is_staff', 'is_superuser', 'username', 'email')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user._loaded_auth_state = user._auth_state()
+        return user
+
+    def _auth_state(self):
+        return tuple(getattr(self, f, None) for f in self.AUTH_STATE_FIELDS)
+
+    def save(self, *args, **kwargs):
+        if getattr(self, "_built_from_token", False):
+            # Users rebuilt from token claims have no password etc. to save
+            raise ValueError("Reload this user from the database before saving it.")
+
+        loaded = getattr(self, "_loaded_auth_state", None)
+        auth_changed = loaded is not None and loaded != self._auth_state()
+        if auth_changed:
+            self.auth_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "auth_version"}
+
+        super().save(*args, **kwargs)
+        self._loaded_auth_state = self._auth_state()
+
+        if auth_changed:
+            from .authentication import forget_auth_version
+            forget_auth_version(self.pk)
+
+    def delete(self, *args, **kwargs):
+        from .authentication import forget_auth_version
+        user_id = self.pk
+        result = super().delete(*args, **kwargs)
+        forget_auth_version(user_id)
+        return result
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
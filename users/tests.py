@@ -1,3 +1,201 @@
-from django.test import TestCase
+import datetime
+import json
+import time
+from unittest import mock
 
-# Create your tests here.
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from google.auth import crypt, jwt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from .authentication import CachedJWTAuthentication, UserRefreshToken
+from .google_auth import CachedResponse, CachingCertsTransport, verify_google_id_token
+from .models import User
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        # Cached auth versions outlive the rolled-back users of earlier tests
+        cache.clear()
+        self.user = User.objects.create_user("owner", "owner@example.com", "pw-12345")
+        self.client = APIClient()
+
+    def login(self, user, password="pw-12345"):
+        response = self.client.post("/api/auth/login/", {"email": user.email, "password": password})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_user_from_token_matches_loaded_user(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        user = CachedJWTAuthentication().get_user(token)
+
+        self.assertTrue(user._built_from_token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsInstance(user.pk, int)
+        self.assertEqual(user, self.user)
+
+    def test_owner_can_use_owner_only_endpoints(self):
+        self.login(self.user)
+        upload = self.client.post(
+            "/api/documents/upload/",
+            {"file": SimpleUploadedFile("nda.txt", b"1. Definitions\nTerms.\n"), "title": "NDA"},
+        )
+        self.assertEqual(upload.status_code, 201)
+        self.assertEqual(upload.data["user"], self.user.pk)
+        pk = upload.data["id"]
+
+        self.assertEqual(self.client.get(f"/api/documents/{pk}/sections/").status_code, 200)
+        self.assertEqual(self.client.get(f"/api/documents/{pk}/file/").status_code, 200)
+        self.assertEqual(self.client.get(f"/api/documents/{pk}/").status_code, 200)
+
+    def test_other_user_is_refused(self):
+        other = User.objects.create_user("other", "other@example.com", "pw-12345")
+        self.login(self.user)
+        pk = self.client.post(
+            "/api/documents/upload/",
+            {"file": SimpleUploadedFile("nda.txt", b"Terms."), "title": "NDA"},
+        ).data["id"]
+
+        self.login(other)
+        self.assertEqual(self.client.get(f"/api/documents/{pk}/sections/").status_code, 403)
+
+    def test_role_change_invalidates_token_claims(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.user.role = "lawyer"
+        self.user.save()
+
+        user = CachedJWTAuthentication().get_user(token)
+        self.assertFalse(getattr(user, "_built_from_token", False))
+        self.assertEqual(user.role, "lawyer")
+
+    def test_queryset_update_invalidates_token_claims(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        # Prime the cached version the token was issued with
+        self.assertTrue(CachedJWTAuthentication().get_user(token)._built_from_token)
+
+        User.objects.filter(pk=self.user.pk).update(role="lawyer")
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.auth_version, 1)
+        user = CachedJWTAuthentication().get_user(token)
+        self.assertFalse(getattr(user, "_built_from_token", False))
+        self.assertEqual(user.role, "lawyer")
+
+    def test_unrelated_update_keeps_token_claims(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        User.objects.filter(pk=self.user.pk).update(first_name="Ada")
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.auth_version, 0)
+        self.assertTrue(CachedJWTAuthentication().get_user(token)._built_from_token)
+
+
+@override_settings(SHARED_CACHE=False)
+class UnsharedCacheJWTAuthenticationTests(CachedJWTAuthenticationTests):
+    """Without a shared cache every request reads auth_version from the database."""
+
+    def test_deactivation_in_another_process_is_seen_at_once(self):
+        token = UserRefreshToken.for_user(self.user).access_token
+        self.assertTrue(CachedJWTAuthentication().get_user(token)._built_from_token)
+
+        # Another worker's change clears its own cache, never this one's
+        with mock.patch("users.authentication.forget_auth_version"):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().get_user(token)
+
+
+def signing_key(key_id):
+    """A (signer, PEM certificate) pair standing in for one of Google's signing keys."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, key_id)])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return crypt.RSASigner.from_string(pem, key_id=key_id), cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class LocalCerts:
+    """Serves a key set in place of Google's certificate endpoint and counts the requests."""
+
+    def __init__(self, certs):
+        self.certs = certs
+        self.requests = 0
+
+    def __call__(self, url, method="GET", **kwargs):
+        self.requests += 1
+        return CachedResponse(200, {"Cache-Control": "public, max-age=3600"}, json.dumps(self.certs).encode())
+
+
+class GoogleIdTokenTests(SimpleTestCase):
+    audience = "client-id.apps.googleusercontent.com"
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.old_signer, cls.old_cert = signing_key("old-key")
+        cls.new_signer, cls.new_cert = signing_key("new-key")
+
+    def token(self, signer, **claims):
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com",
+            "aud": self.audience,
+            "sub": "1234567890",
+            "email": "owner@example.com",
+            "iat": now,
+            "exp": now + 600,
+            **claims,
+        }
+        return jwt.encode(signer, payload).decode()
+
+    def test_valid_token_uses_cached_certs(self):
+        certs = LocalCerts({"old-key": self.old_cert})
+        transport = CachingCertsTransport(fetch=certs)
+
+        for _ in range(2):
+            info = verify_google_id_token(self.token(self.old_signer), self.audience, transport=transport)
+            self.assertEqual(info["email"], "owner@example.com")
+        self.assertEqual(certs.requests, 1)
+
+    @mock.patch("users.google_auth.MIN_REFETCH_INTERVAL", 0)
+    def test_unknown_key_refetches_certs(self):
+        certs = LocalCerts({"old-key": self.old_cert})
+        transport = CachingCertsTransport(fetch=certs)
+        verify_google_id_token(self.token(self.old_signer), self.audience, transport=transport)
+
+        # Google rotates its keys
+        certs.certs = {"new-key": self.new_cert}
+        info = verify_google_id_token(self.token(self.new_signer), self.audience, transport=transport)
+        self.assertEqual(info["sub"], "1234567890")
+        self.assertEqual(certs.requests, 2)
+
+    @mock.patch("users.google_auth.MIN_REFETCH_INTERVAL", 0)
+    def test_invalid_token_with_known_key_does_not_refetch(self):
+        certs = LocalCerts({"old-key": self.old_cert})
+        transport = CachingCertsTransport(fetch=certs)
+
+        with self.assertRaises(ValueError):
+            verify_google_id_token(self.token(self.old_signer, aud="someone-else"), self.audience, transport=transport)
+        with self.assertRaises(ValueError):
+            verify_google_id_token(self.token(self.old_signer, exp=int(time.time()) - 3600), self.audience, transport=transport)
+        with self.assertRaises(ValueError):
+            verify_google_id_token("not-a-token", self.audience, transport=transport)
+        self.assertEqual(certs.requests, 1)
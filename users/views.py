@@ -6,7 +6,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.views import APIView  # <= needed
 from django.contrib.auth import get_user_model, authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import UserRefreshToken
 from .models import ClientAssignment, User, AssignmentRequest
 from .serializers import (
     RegisterSerializer,
@@ -22,8 +22,7 @@ from notifications.utils import create_notification, log_activity
 from django.core.mail import send_mail
 from .permissions import IsLawyer
 from rest_framework.exceptions import NotFound
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from .google_auth import verify_google_id_token
 
 # Utilities for password reset
 from django.contrib.auth.tokens import PasswordResetTokenGenerator  # <= needed
@@ -44,7 +43,7 @@ class RegisterView(generics.CreateAPIView):
         serializer.is_valid(raise_exception=True)
 
         user = serializer.save()
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
 
         response_data = {
             "user": UserSerializer(user).data,
@@ -85,9 +84,10 @@ class LoginView(generics.GenericAPIView):
             user.save()
         
         create_notification(user, "Login successful")
-        log_activity(user, "User logged in", {"email": user.email})
+        # Audit records: written before responding rather than from the sink's buffer
+        log_activity(user, "User logged in", {"email": user.email}, activity_type="auth", durable=True)
 
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
 
         return Response({
             "user": UserSerializer(user).data,
@@ -102,7 +102,7 @@ class LogoutView(generics.GenericAPIView):
     def post(self, request):
         user = request.user
         create_notification(user, "Logout successful")
-        log_activity(user, "User logged out", None)
+        log_activity(user, "User logged out", None, activity_type="auth", durable=True)
         
         return Response({"detail": "Logged out successfully"}, status=200)
     
@@ -250,9 +250,8 @@ class GoogleLoginView(APIView):
 
         try:
             # verify token
-            idinfo = id_token.verify_oauth2_token(
+            idinfo = verify_google_id_token(
                 credential,
-                google_requests.Request(),
                 os.environ.get("GOOGLE_OAUTH_CLIENT_ID")
             )
 
@@ -274,7 +273,7 @@ class GoogleLoginView(APIView):
                     user.username = f"{username}_{user.id}"
                     user.save()
 
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
 
             return Response({
                 "user": UserSerializer(user).data,